@@ -1,1053 +1,1490 @@
 import os
-from flask import Flask, request, jsonify
+import io
+import csv
+import json
+import re
+import time
+import zlib
+import atexit
+import signal
+import threading
+import uuid
+from contextlib import contextmanager
+from flask import Flask, Response, request, jsonify, stream_with_context
+import click
 from flask_cors import CORS
 import psycopg
-from datetime import datetime, timedelta
-import hashlib
+from psycopg import sql
+from psycopg_pool import ConnectionPool, PoolTimeout, TooManyRequests
+from datetime import date, datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+from migrate import run_migrations, MigrationError, DatabaseUnavailable
+from passwords import hash_password, verify_password, HashingBusy
+from tokens import issue_token, verify_token, bearer_token
+from ratelimit import RateLimiter, client_address
+from static_pages import StaticPage
+from listener import NotificationListener
+from health import DatabaseProbe
+from occupancy import OccupancyIndex
+from cache import make_cache
+from employees import EmployeeDirectory, NOT_FOUND
+from checkin_queue import CheckInQueue, BUSY, UNKNOWN
+from sweeper import SweepPolicies, DEFAULT_POLICY, MAX_SESSION, SESSIONS_AUTO_CLOSED
+from logs import get_logger
+from metrics import (
+    render as render_metrics, record_error, CONTENT_TYPE as METRICS_CONTENT_TYPE, GaugeCallback,
+    HTTP_REQUEST_SECONDS, DB_ACQUIRE_SECONDS, TimedConnection, TimedCursor
+)
 app = Flask(__name__)
 app.secret_key = os.getenv('SECRET_KEY', 'change-this-in-production')
 CORS(app)
+log = get_logger('app')
+def log_error(where, exc):
+    """Hatayı say (app_errors_total) ve yapılandırılmış log satırı yaz"""
+    record_error(where, exc)
+    log.error('%s error: %s', where, exc, extra={'where': where, 'error_type': type(exc).__name__})
 # ==================== DATABASE CONFIG ====================
+# Havuz ayarları worker başına geçerlidir (gunicorn -w 4 → en fazla 4 * DB_POOL_MAX_SIZE bağlantı)
+POOL_MIN_SIZE = int(os.getenv('DB_POOL_MIN_SIZE', 1))
+POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', 10))
+POOL_MAX_IDLE = float(os.getenv('DB_POOL_MAX_IDLE', 300))
+POOL_MAX_WAITING = int(os.getenv('DB_POOL_MAX_WAITING', 50))
+POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 5))
+
+DB_CONNECT_KWARGS = {
+    'sslmode': os.getenv('DB_SSLMODE', 'require'),
+    'connect_timeout': 20,
+    'keepalives': 1,
+    'keepalives_idle': 30
+}
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+_checkout_stats = {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0}
+_checkout_lock = threading.Lock()
+
+
+def get_pool():
+    """Süreç başına bağlantı havuzunu döndür (fork sonrası tembel oluşturulur)"""
+    global _pool, _pool_pid
+    if _pool is not None and _pool_pid == os.getpid():
+        return _pool
+
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            conn_string = os.getenv('DATABASE_URL')
+
+            if not conn_string:
+                raise Exception("DATABASE_URL ortam değişkeni tanımlı değil! Render Environment'ta eklediğinden emin ol.")
+
+            # gunicorn master'dan miras kalan havuz kullanılmaz, her worker kendi havuzunu açar
+            _pool = ConnectionPool(
+                conn_string,
+                min_size=POOL_MIN_SIZE,
+                max_size=POOL_MAX_SIZE,
+                max_idle=POOL_MAX_IDLE,
+                max_waiting=POOL_MAX_WAITING,
+                timeout=POOL_TIMEOUT,
+                check=ConnectionPool.check_connection,
+                # Her SQL ifadesi ve commit süresi metrics.py'ye yazılır
+                connection_class=TimedConnection,
+                kwargs=dict(DB_CONNECT_KWARGS, cursor_factory=TimedCursor),
+                name=f'prospando-{os.getpid()}',
+                open=True
+            )
+            _pool_pid = os.getpid()
+    return _pool
+
+
+@contextmanager
 def get_conn():
-    """Veritabanı bağlantısı oluştur"""
+    """Havuzdan bağlantı al; with bloğu bitince bağlantı havuza geri döner"""
+    started = time.perf_counter()
     try:
-        conn_string = os.getenv('DATABASE_URL')
-       
-        if not conn_string:
-            raise Exception("DATABASE_URL ortam değişkeni tanımlı değil! Render Environment'ta eklediğinden emin ol.")
-       
-        conn = psycopg.connect(
-            conn_string,
-            sslmode="require",
-            connect_timeout=20,
-            keepalives=1,
-            keepalives_idle=30
-        )
-        return conn
-    except Exception as e:
-        print(f"❌ Database connection error: {str(e)}")
+        with get_pool().connection() as conn:
+            elapsed = time.perf_counter() - started
+            DB_ACQUIRE_SECONDS.observe(elapsed)
+            elapsed_ms = elapsed * 1000
+            with _checkout_lock:
+                _checkout_stats['count'] += 1
+                _checkout_stats['total_ms'] += elapsed_ms
+                _checkout_stats['max_ms'] = max(_checkout_stats['max_ms'], elapsed_ms)
+            yield conn
+    except (PoolTimeout, TooManyRequests) as e:
+        log_error('pool', e)
         raise
-def hash_password(password):
-    """Şifreyi hash'le"""
-    return hashlib.sha256(password.encode()).hexdigest()
-def calculate_duration(start_str, end_str):
-    """Başlangıç ve bitiş saati arasındaki süreyi hesapla"""
-    try:
-        start = datetime.strptime(start_str, "%H:%M")
-        end = datetime.strptime(end_str, "%H:%M")
-        if end < start:
-            end += timedelta(days=1)
-        total_minutes = int((end - start).total_seconds() / 60)
-        hours = total_minutes // 60
-        minutes = total_minutes % 60
-        return f"{hours}h {minutes}m"
-    except:
-        return "Hesaplanamadı"
+
+
+def pool_stats():
+    """Havuz istatistikleri: kullanımda, boşta, bekleyen ve bağlantı alma süreleri"""
+    if _pool is None or _pool_pid != os.getpid():
+        return {'pool_size': 0, 'in_use': 0, 'idle': 0, 'waiting': 0}
+
+    stats = _pool.get_stats()
+    with _checkout_lock:
+        checkout = dict(_checkout_stats)
+    return {
+        'pool_min': stats.get('pool_min', POOL_MIN_SIZE),
+        'pool_max': stats.get('pool_max', POOL_MAX_SIZE),
+        'pool_size': stats.get('pool_size', 0),
+        'in_use': stats.get('pool_size', 0) - stats.get('pool_available', 0),
+        'idle': stats.get('pool_available', 0),
+        'waiting': stats.get('requests_waiting', 0),
+        'max_waiting': POOL_MAX_WAITING,
+        'requests': stats.get('requests_num', 0),
+        'requests_queued': stats.get('requests_queued', 0),
+        'requests_errors': stats.get('requests_errors', 0),
+        'requests_wait_ms': stats.get('requests_wait_ms', 0),
+        'checkouts': checkout['count'],
+        'checkout_avg_ms': round(checkout['total_ms'] / checkout['count'], 2) if checkout['count'] else 0.0,
+        'checkout_max_ms': round(checkout['max_ms'], 2)
+    }
+
+
+SERVER_BUSY = ({
+    'success': False,
+    'message': '⏳ Sunucu şu anda çok yoğun.\nLütfen birkaç saniye sonra tekrar deneyin.',
+    'type': 'error'
+}, 503)
+def server_busy_response():
+    """Havuz/şifre hash kuyruğu doluysa 503 döndür"""
+    return jsonify(SERVER_BUSY[0]), SERVER_BUSY[1]
+
+
+@atexit.register
+def close_pool():
+    if _pool is not None and _pool_pid == os.getpid():
+        _pool.close()
+# Site saati: günler/saatler bu dilimde tutulur (bulut sunucusunun saati UTC'dir)
+SITE_TIMEZONE = os.getenv('SITE_TIMEZONE', 'Europe/Berlin')
+SITE_TZ = ZoneInfo(SITE_TIMEZONE)
+def site_now():
+    """İstek başına tek saat okuması: site diliminde, dakikaya yuvarlanmış (aware) an"""
+    return datetime.now(SITE_TZ).replace(second=0, microsecond=0)
+def site_today():
+    return datetime.now(SITE_TZ).date()
+def session_minutes(day, start, end_at):
+    """Oturum süresi (tam dakika) gerçek zaman damgalarından: oturumun günü + giriş saati → çıkış anı"""
+    opened = datetime.combine(day, start, tzinfo=end_at.tzinfo)
+    if end_at.tzinfo is not None:
+        # Aynı tzinfo'lu aware farkı duvar saatiyle hesaplanır; yaz saati geçişi için UTC'ye çevir
+        opened, end_at = opened.astimezone(timezone.utc), end_at.astimezone(timezone.utc)
+    return int((end_at - opened).total_seconds() // 60)
+def format_duration(minutes):
+    """Dakikayı '7h 30m' biçiminde göster; yalnızca yanıt/çıktı üretilirken kullanılır"""
+    if minutes is None:
+        return None
+    return f"{minutes // 60}h {minutes % 60}m"
 # ==================== DATABASE INITIALIZATION ====================
+# Son init_db() sonucu; migration'lar tamamlanmadıysa /readyz ve /health hazır değil döner
+MIGRATION_STATE = {'ok': None, 'error': None, 'retrying': False}
+MIGRATION_RETRY_INTERVAL = float(os.getenv('MIGRATION_RETRY_INTERVAL', 30))
+_migration_retry_pid = None
+_migration_retry_lock = threading.Lock()
 def init_db():
-    """Veritabanı tablolarını oluştur/kontrol et"""
+    """
+    Bekleyen şema migration'larını uygula (bkz. migrate.py, migrations/).
+    Veritabanına bağlanılamıyorsa False döner (süreç açılır, hazırlık kontrolü başarısız,
+    migration'lar arka planda yeniden denenir); bir migration adımı hata verdiyse (kilit zaman
+    aşımı, deadlock ve iptal dahil) yarım kalmış şemayla çalışılmaz, MigrationError fırlatılır.
+    """
     try:
-        conn = get_conn()
-        cur = conn.cursor()
-
-        # Employees tablosu - senin şemana tam uygun
-        cur.execute('''
-            CREATE TABLE IF NOT EXISTS employees (
-                id INTEGER PRIMARY KEY,
-                name TEXT NOT NULL UNIQUE,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-
-        # Attendance tablosu
-        cur.execute('''
-            CREATE TABLE IF NOT EXISTS attendance (
-                id BIGSERIAL PRIMARY KEY,
-                employee_id INTEGER REFERENCES employees(id),
-                employee_name TEXT,
-                date TEXT,
-                start_time TEXT,
-                end_time TEXT,
-                location TEXT,
-                duration TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-
-        # Users tablosu
-        cur.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id SERIAL PRIMARY KEY,
-                email VARCHAR(255) UNIQUE NOT NULL,
-                password VARCHAR(255) NOT NULL,
-                name VARCHAR(255) NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-
-        conn.commit()
-        cur.close()
-        conn.close()
-        print("✅ Tablolar başarıyla oluşturuldu/kontrol edildi")
+        applied = run_migrations(os.getenv('DATABASE_URL'), **DB_CONNECT_KWARGS)
+        if applied:
+            log.info('%d migration uygulandı', len(applied), extra={'migrations': applied})
+        else:
+            log.info('Şema güncel')
+        MIGRATION_STATE.update(ok=True, error=None, retrying=False)
         return True
 
-    except Exception as e:
-        print(f"❌ Tablo oluşturma hatası: {str(e)}")
+    except DatabaseUnavailable as e:
+        # Hiçbir adım çalışmadı: bağlantı gelince start_migration_retry() tekrar dener
+        MIGRATION_STATE.update(ok=False, error=str(e), retrying=True)
+        log_error('init_db', e)
         return False
+    except MigrationError as e:
+        # Değiştirilmiş migration dosyası: sessizce devam etmek şemayı bozar
+        MIGRATION_STATE.update(ok=False, error=str(e), retrying=False)
+        log_error('migration', e)
+        raise
+    except Exception as e:
+        MIGRATION_STATE.update(ok=False, error=str(e), retrying=False)
+        log_error('migration', e)
+        raise MigrationError(f"Migration tamamlanamadı: {e}") from e
+def retry_migrations():
+    """Bağlantı kurulamadığı için bekleyen migration'ları başarılı olana kadar dene"""
+    while MIGRATION_STATE['retrying']:
+        time.sleep(MIGRATION_RETRY_INTERVAL)
+        try:
+            init_db()
+        except MigrationError:
+            # Açılışta fırlatılacak hatanın aynısı: worker durur, yeniden açılışta init_db() hata verir
+            log.error('Migration adımı başarısız, worker durduruluyor')
+            os.kill(os.getpid(), signal.SIGTERM)
+            return
+def start_migration_retry():
+    """Bu süreçte migration'lar yeniden denenecekse retry thread'ini bir kez başlat"""
+    global _migration_retry_pid
+    if not MIGRATION_STATE['retrying'] or _migration_retry_pid == os.getpid():
+        return
+    with _migration_retry_lock:
+        if _migration_retry_pid == os.getpid():
+            return
+        _migration_retry_pid = os.getpid()
+        threading.Thread(target=retry_migrations, name='migration-retry', daemon=True).start()
+# gunicorn __main__ bloğunu çalıştırmaz; worker'lar import sırasında migration'ları uygular
+# (advisory lock sayesinde yalnızca ilk worker iş yapar, diğerleri bekleyip geçer)
+if __name__ != '__main__' and os.getenv('AUTO_MIGRATE', 'true').lower() == 'true' and os.getenv('DATABASE_URL'):
+    init_db()
 # ==================== AUTH ROUTES ====================
+# Sayfalar başlangıçta bir kez okunup sıkıştırılır (bkz. static_pages.py, pages/)
+LOGIN_PAGE = StaticPage('login.html')
+DASHBOARD_PAGE = StaticPage('dashboard.html')
 @app.route('/')
 def index():
-    return """<!DOCTYPE html>
-<html lang="tr">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>🎯 PROSPANDO - Giriş</title>
-    <style>
-        * {
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }
-       
-        body {
-            font-family: 'Segoe UI', system-ui, -apple-system, sans-serif;
-            background: #0f172a;
-            min-height: 100vh;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            padding: 20px;
-            position: relative;
-            overflow: hidden;
-        }
-        body::before {
-            content: '';
-            position: absolute;
-            top: 0; left: 0; right: 0; bottom: 0;
-            background:
-                radial-gradient(circle at 20% 80%, #7c3aed 0%, transparent 50%),
-                radial-gradient(circle at 80% 20%, #ec4899 0%, transparent 50%),
-                radial-gradient(circle at 50% 50%, #3b82f6 0%, transparent 40%);
-            opacity: 0.5;
-            z-index: -1;
-            animation: pulse 18s ease infinite;
-        }
-        @keyframes pulse {
-            0%, 100% { opacity: 0.5; }
-            50% { opacity: 0.7; }
-        }
-        .container {
-            background: rgba(15, 23, 42, 0.75);
-            backdrop-filter: blur(20px);
-            -webkit-backdrop-filter: blur(20px);
-            border-radius: 32px;
-            box-shadow:
-                0 0 50px rgba(124, 58, 237, 0.4),
-                0 25px 80px rgba(0, 0, 0, 0.5),
-                inset 0 0 30px rgba(255, 255, 255, 0.05);
-            max-width: 460px;
-            width: 100%;
-            overflow: hidden;
-            border: 1px solid rgba(124, 58, 237, 0.3);
-            position: relative;
-        }
-        .header {
-            background: linear-gradient(135deg, #7c3aed, #ec4899);
-            padding: 60px 30px;
-            text-align: center;
-            color: white;
-            position: relative;
-            overflow: hidden;
-        }
-        .header::before {
-            content: '';
-            position: absolute;
-            inset: 0;
-            background: linear-gradient(135deg, rgba(124,58,237,0.3), rgba(236,72,153,0.3));
-            animation: neonShift 8s ease infinite;
-        }
-        @keyframes neonShift {
-            0% { transform: translateX(-100%); }
-            100% { transform: translateX(100%); }
-        }
-        .header h1 {
-            font-size: 56px;
-            font-weight: 900;
-            margin-bottom: 12px;
-            text-shadow:
-                0 0 20px rgba(255,255,255,0.8),
-                0 0 40px rgba(124,58,237,0.8);
-            letter-spacing: 3px;
-            position: relative;
-            z-index: 2;
-            animation: neonGlow 2s ease-in-out infinite alternate;
-        }
-        @keyframes neonGlow {
-            from { text-shadow: 0 0 20px rgba(255,255,255,0.8), 0 0 40px rgba(124,58,237,0.8); }
-            to { text-shadow: 0 0 30px rgba(255,255,255,1), 0 0 60px rgba(236,72,153,0.9); }
-        }
-        .header p {
-            font-size: 20px;
-            opacity: 0.95;
-            position: relative;
-            z-index: 2;
-            letter-spacing: 1px;
-            text-shadow: 0 0 10px rgba(0,0,0,0.5);
-        }
-        .form-container {
-            padding: 50px 40px;
-        }
-        h2 {
-            text-align: center;
-            margin-bottom: 40px;
-            color: #e2e8f0;
-            font-size: 28px;
-            font-weight: 700;
-            text-shadow: 0 0 15px rgba(124, 58, 237, 0.4);
-        }
-        .form-group {
-            margin-bottom: 28px;
-        }
-        label {
-            display: block;
-            margin-bottom: 10px;
-            color: #e2e8f0;
-            font-weight: 600;
-            font-size: 16px;
-            text-shadow: 0 0 8px rgba(124, 58, 237, 0.3);
-        }
-        input {
-            width: 100%;
-            padding: 18px 20px;
-            border: 3px solid #7c3aed;
-            border-radius: 16px;
-            font-size: 16px;
-            background: rgba(30, 41, 59, 0.8);
-            color: #e2e8f0;
-            transition: all 0.4s ease;
-            box-shadow:
-                0 0 20px rgba(124, 58, 237, 0.3),
-                inset 0 0 15px rgba(0, 0, 0, 0.3);
-        }
-        input:focus {
-            outline: none;
-            border-color: #ec4899;
-            background: rgba(51, 65, 85, 0.9);
-            box-shadow:
-                0 0 40px rgba(236, 72, 153, 0.6),
-                0 0 60px rgba(124, 58, 237, 0.4);
-            transform: translateY(-3px);
-        }
-        input::placeholder {
-            color: rgba(226, 232, 240, 0.6);
-        }
-        button {
-            width: 100%;
-            padding: 20px;
-            background: linear-gradient(135deg, #7c3aed, #ec4899);
-            color: white;
-            border: none;
-            border-radius: 16px;
-            font-weight: 700;
-            font-size: 18px;
-            cursor: pointer;
-            transition: all 0.5s ease;
-            margin-bottom: 20px;
-            box-shadow:
-                0 0 40px rgba(124, 58, 237, 0.6),
-                0 10px 30px rgba(0, 0, 0, 0.4);
-            letter-spacing: 2px;
-            position: relative;
-            overflow: hidden;
-        }
-        button::before {
-            content: '';
-            position: absolute;
-            top: 0; left: -100%;
-            width: 100%;
-            height: 100%;
-            background: linear-gradient(90deg, transparent, rgba(255,255,255,0.3), transparent);
-            transition: 0.7s;
-        }
-        button:hover {
-            transform: translateY(-6px);
-            box-shadow:
-                0 0 80px rgba(236, 72, 153, 0.8),
-                0 20px 50px rgba(124, 58, 237, 0.5);
-        }
-        button:hover::before {
-            left: 100%;
-        }
-        button:active {
-            transform: translateY(-2px);
-        }
-        .toggle-link {
-            text-align: center;
-            color: #94a3b8;
-            font-size: 16px;
-            margin-top: 10px;
-        }
-        .toggle-link a {
-            color: #ec4899;
-            cursor: pointer;
-            text-decoration: none;
-            font-weight: 700;
-            text-shadow: 0 0 10px rgba(236, 72, 153, 0.4);
-            transition: all 0.3s;
-        }
-        .toggle-link a:hover {
-            color: #f472b6;
-            text-shadow: 0 0 20px rgba(236, 72, 153, 0.7);
-        }
-        .error {
-            color: #fca5a5;
-            font-size: 15px;
-            margin-top: 15px;
-            text-align: center;
-            padding: 16px;
-            background: rgba(239, 68, 68, 0.15);
-            border-radius: 12px;
-            border: 2px solid rgba(239, 68, 68, 0.4);
-            box-shadow: 0 0 20px rgba(239, 68, 68, 0.3);
-            backdrop-filter: blur(8px);
-        }
-        .hidden {
-            display: none;
-        }
-        .form-section {
-            display: none;
-            opacity: 0;
-            transition: opacity 0.4s ease;
-        }
-        .form-section.active {
-            display: block;
-            opacity: 1;
-            animation: fadeIn 0.5s ease-in;
-        }
-        @keyframes fadeIn {
-            from { opacity: 0; transform: translateY(20px); }
-            to { opacity: 1; transform: translateY(0); }
-        }
-        @media (max-width: 480px) {
-            .container {
-                margin: 20px;
-                border-radius: 24px;
-            }
-            .header {
-                padding: 50px 20px;
-            }
-            .header h1 {
-                font-size: 44px;
-            }
-            .header p {
-                font-size: 18px;
-            }
-            .form-container {
-                padding: 40px 30px;
-            }
-            h2 {
-                font-size: 24px;
-            }
-            button {
-                padding: 18px;
-                font-size: 17px;
-            }
-        }
-    </style>
-</head>
-<body>
-    <div class="container">
-        <div class="header">
-            <h1>🎯 PROSPANDO</h1>
-            <p>Personel Yoklama Sistemi</p>
-        </div>
-        <div class="form-container">
-            <div id="login-section" class="form-section active">
-                <h2>Giriş Yap</h2>
-               
-                <div class="form-group">
-                    <label for="login-email">📧 Email:</label>
-                    <input type="email" id="login-email" placeholder="Email adresiniz...">
-                </div>
-                <div class="form-group">
-                    <label for="login-password">🔐 Şifre:</label>
-                    <input type="password" id="login-password" placeholder="Şifreniz...">
-                </div>
-                <button onclick="handleLogin()">Giriş Yap</button>
-                <div id="login-error" class="error hidden"></div>
-                <div class="toggle-link">
-                    Hesabınız yok mu? <a onclick="toggleForm()">Kayıt Ol</a>
-                </div>
-            </div>
-            <div id="signup-section" class="form-section">
-                <h2>Kayıt Ol</h2>
-               
-                <div class="form-group">
-                    <label for="signup-name">👤 Ad Soyad:</label>
-                    <input type="text" id="signup-name" placeholder="Ad Soyadınız...">
-                </div>
-                <div class="form-group">
-                    <label for="signup-email">📧 Email:</label>
-                    <input type="email" id="signup-email" placeholder="Email adresiniz...">
-                </div>
-                <div class="form-group">
-                    <label for="signup-password">🔐 Şifre:</label>
-                    <input type="password" id="signup-password" placeholder="Şifreniz...">
-                </div>
-                <div class="form-group">
-                    <label for="signup-confirm">🔐 Şifreyi Onayla:</label>
-                    <input type="password" id="signup-confirm" placeholder="Şifreyi tekrar giriniz...">
-                </div>
-                <button onclick="handleSignup()">Kayıt Ol</button>
-                <div id="signup-error" class="error hidden"></div>
-                <div class="toggle-link">
-                    Zaten hesabınız var mı? <a onclick="toggleForm()">Giriş Yap</a>
-                </div>
-            </div>
-        </div>
-    </div>
-    <script>
-        function toggleForm() {
-            document.getElementById('login-section').classList.toggle('active');
-            document.getElementById('signup-section').classList.toggle('active');
-            document.getElementById('login-error').classList.add('hidden');
-            document.getElementById('signup-error').classList.add('hidden');
-        }
-        async function handleLogin() {
-            const email = document.getElementById('login-email').value.trim();
-            const password = document.getElementById('login-password').value;
-            const errorDiv = document.getElementById('login-error');
-            if (!email || !password) {
-                errorDiv.classList.remove('hidden');
-                errorDiv.textContent = '❌ Lütfen tüm alanları doldurunuz!';
-                return;
-            }
-            try {
-                const response = await fetch('/api/login', {
-                    method: 'POST',
-                    headers: {'Content-Type': 'application/json'},
-                    body: JSON.stringify({email, password})
-                });
-                const data = await response.json();
-                if (data.success) {
-                    localStorage.setItem('user_id', data.user_id);
-                    localStorage.setItem('user_name', data.user_name);
-                    localStorage.setItem('employee_id', data.employee_id);
-                    window.location.href = '/dashboard';
-                } else {
-                    errorDiv.classList.remove('hidden');
-                    errorDiv.textContent = '❌ ' + data.message;
-                }
-            } catch (error) {
-                errorDiv.classList.remove('hidden');
-                errorDiv.textContent = '❌ Hata: ' + error.message;
-            }
-        }
-        async function handleSignup() {
-            const name = document.getElementById('signup-name').value.trim();
-            const email = document.getElementById('signup-email').value.trim();
-            const password = document.getElementById('signup-password').value;
-            const confirm = document.getElementById('signup-confirm').value;
-            const errorDiv = document.getElementById('signup-error');
-            if (!name || !email || !password || !confirm) {
-                errorDiv.classList.remove('hidden');
-                errorDiv.textContent = '❌ Lütfen tüm alanları doldurunuz!';
-                return;
-            }
-            if (password !== confirm) {
-                errorDiv.classList.remove('hidden');
-                errorDiv.textContent = '❌ Şifreler eşleşmiyor!';
-                return;
-            }
-            if (password.length < 6) {
-                errorDiv.classList.remove('hidden');
-                errorDiv.textContent = '❌ Şifre en az 6 karakter olmalıdır!';
-                return;
-            }
-            try {
-                const response = await fetch('/api/signup', {
-                    method: 'POST',
-                    headers: {'Content-Type': 'application/json'},
-                    body: JSON.stringify({name, email, password})
-                });
-                const data = await response.json();
-                if (data.success) {
-                    localStorage.setItem('user_id', data.user_id);
-                    localStorage.setItem('user_name', data.user_name);
-                    localStorage.setItem('employee_id', data.employee_id);
-                    window.location.href = '/dashboard';
-                } else {
-                    errorDiv.classList.remove('hidden');
-                    errorDiv.textContent = '❌ ' + data.message;
-                }
-            } catch (error) {
-                errorDiv.classList.remove('hidden');
-                errorDiv.textContent = '❌ Hata: ' + error.message;
-            }
-        }
-        document.getElementById('login-password').addEventListener('keypress', (e) => {
-            if (e.key === 'Enter') handleLogin();
-        });
-        document.getElementById('signup-confirm').addEventListener('keypress', (e) => {
-            if (e.key === 'Enter') handleSignup();
-        });
-    </script>
-</body>
-</html>"""
+    return LOGIN_PAGE.response()
+# Sync (Flask) ve async (asgi.py) giriş noktaları aynı doğrulama, SQL ve yanıtları paylaşır
+SIGNUP_EMPLOYEE_SQL = """
+    INSERT INTO employees (name) VALUES (%s)
+    ON CONFLICT (name) DO UPDATE SET name = EXCLUDED.name
+    RETURNING id
+"""
+SIGNUP_USER_SQL = """
+    INSERT INTO users (email, password, name) VALUES (%s, %s, %s)
+    ON CONFLICT (email) DO NOTHING
+    RETURNING id
+"""
+LOGIN_SQL = """
+    SELECT u.id, u.name, u.password, e.id
+    FROM users u
+    LEFT JOIN employees e ON e.name = u.name
+    WHERE u.email = %s
+"""
+REHASH_SQL = "UPDATE users SET password = %s WHERE id = %s AND password = %s"
+def validate_signup(data):
+    """(name, email, password) ya da hata yanıtı döndür"""
+    name = data.get('name', '').strip()
+    email = data.get('email', '').strip().lower()
+    password = data.get('password', '')
+
+    if not name or not email or not password:
+        return None, ({'success': False, 'message': 'Lütfen tüm alanları doldurunuz!'}, 400)
+
+    if len(password) < 6:
+        return None, ({'success': False, 'message': 'Şifre en az 6 karakter olmalıdır!'}, 400)
+
+    if '@' not in email:
+        return None, ({'success': False, 'message': 'Geçerli bir email giriniz!'}, 400)
+
+    return (name, email, password), None
+def signup_result(user_id, name, emp_id):
+    if user_id is None:
+        return {'success': False, 'message': 'Bu email zaten kayıtlı!'}, 400
+    return {
+        'success': True,
+        'message': 'Kayıt başarılı!',
+        'user_id': user_id,
+        'user_name': name,
+        'employee_id': emp_id,
+        'token': issue_token(emp_id, name, user_id)
+    }, 201
+def validate_login(data):
+    """(email, password) ya da hata yanıtı döndür"""
+    email = data.get('email', '').strip()
+    password = data.get('password', '')
+   
+    if not email or not password:
+        return None, ({'success': False, 'message': 'Email ve şifre gerekli!'}, 400)
+    return (email, password), None
+def login_result(user_id, name, emp_id):
+    # Bağlı personel kaydı yoksa token personel id'si taşımaz (check-in'de kullanılamaz);
+    # kullanıcı id'si personel id'si yerine geçmez
+    return {
+        'success': True,
+        'message': 'Giriş başarılı!',
+        'user_id': user_id,
+        'user_name': name,
+        'employee_id': emp_id,
+        'token': issue_token(emp_id, name, user_id)
+    }, 200
+LOGIN_FAILED = ({'success': False, 'message': 'Email veya şifre yanlış!'}, 401)
+# Kaba kuvvet koruması: IP ve email başına kayan pencere (bkz. ratelimit.py); ofis ağı tek IP'den çıkar
+LOGIN_LIMITER = RateLimiter('login', os.getenv('RATE_LIMIT_LOGIN_IP', '60/60'), os.getenv('RATE_LIMIT_LOGIN_EMAIL', '10/300'))
+SIGNUP_LIMITER = RateLimiter('signup', os.getenv('RATE_LIMIT_SIGNUP_IP', '20/3600'), os.getenv('RATE_LIMIT_SIGNUP_EMAIL', '5/3600'))
+def rate_limited(retry_after):
+    return {
+        'success': False,
+        'message': f'Çok fazla deneme yapıldı.\nLütfen {retry_after} saniye sonra tekrar deneyin.',
+        'type': 'error',
+        'retry_after': retry_after
+    }, 429
+def rate_limited_response(retry_after):
+    """429 + Retry-After; bağlantı alınmadan ve hash hesaplanmadan döner"""
+    payload, status_code = rate_limited(retry_after)
+    response = jsonify(payload)
+    response.headers['Retry-After'] = str(retry_after)
+    return response, status_code
+def request_ip():
+    return client_address(request.remote_addr, request.headers.get('X-Forwarded-For'))
 @app.route('/api/signup', methods=['POST'])
 def signup():
     try:
-        data = request.json
-        name = data.get('name', '').strip()
-        email = data.get('email', '').strip().lower()
-        password = data.get('password', '')
-
-        if not name or not email or not password:
-            return jsonify({'success': False, 'message': 'Lütfen tüm alanları doldurunuz!'}), 400
-
-        if len(password) < 6:
-            return jsonify({'success': False, 'message': 'Şifre en az 6 karakter olmalıdır!'}), 400
+        fields, error = validate_signup(request.json)
+        if error:
+            return jsonify(error[0]), error[1]
+        name, email, password = fields
 
-        if '@' not in email:
-            return jsonify({'success': False, 'message': 'Geçerli bir email giriniz!'}), 400
+        retry_after = SIGNUP_LIMITER.check(request_ip(), email)
+        if retry_after:
+            return rate_limited_response(retry_after)
 
-        conn = get_conn()
-        cur = conn.cursor()
+        # Hash bağlantı alınmadan önce hesaplanır, havuzdaki bağlantı boşuna beklemez
+        hashed_password = hash_password(password)
 
-        # 1. Email zaten kayıtlı mı?
-        cur.execute("SELECT 1 FROM users WHERE email = %s", (email,))
-        if cur.fetchone():
-            cur.close()
-            conn.close()
-            return jsonify({'success': False, 'message': 'Bu email zaten kayıtlı!'}), 400
+        with get_conn() as conn:
+            cur = conn.cursor()
 
-        # 2. Bu isimde bir employee var mı?
-        cur.execute("SELECT id FROM employees WHERE name = %s", (name,))
-        existing_emp = cur.fetchone()
+            # 1. Employee'yi isimle bul ya da oluştur (tek komut, id sequence'ten gelir)
+            cur.execute(SIGNUP_EMPLOYEE_SQL, (name,))
+            emp_id = cur.fetchone()[0]
 
-        if existing_emp:
-            # Aynı isim var → mevcut employee'yi kullan
-            emp_id = existing_emp[0]
-        else:
-            # Yeni employee oluştur: ID'yi kendimiz hesapla (max id + 1)
-            cur.execute("SELECT MAX(id) FROM employees")
-            max_id_result = cur.fetchone()
-            new_id = (max_id_result[0] or 0) + 1
-
-            # Yeni employee ekle
-            cur.execute(
-                "INSERT INTO employees (id, name) VALUES (%s, %s)",
-                (new_id, name)
-            )
-            emp_id = new_id
+            # 2. User'ı kaydet; email zaten kayıtlıysa satır dönmez ve employee de geri alınır
+            cur.execute(SIGNUP_USER_SQL, (email, hashed_password, name))
+            user = cur.fetchone()
 
-        # 3. User'ı kaydet (employee_id şimdilik eklemiyoruz, sadece name ile bağlıyoruz)
-        hashed_password = hash_password(password)
-        cur.execute(
-            "INSERT INTO users (email, password, name) VALUES (%s, %s, %s) RETURNING id",
-            (email, hashed_password, name)
-        )
-        user_id = cur.fetchone()[0]
+            if user:
+                conn.commit()
+            else:
+                conn.rollback()
+            cur.close()
 
-        conn.commit()
-        cur.close()
-        conn.close()
+        if user:
+            # Bu worker hemen; diğerleri employees_changed bildirimiyle güncellenir
+            EMPLOYEES.forget(emp_id)
 
-        return jsonify({
-            'success': True,
-            'message': 'Kayıt başarılı!',
-            'user_id': user_id,
-            'user_name': name,
-            'employee_id': emp_id
-        }), 201
+        payload, status_code = signup_result(user[0] if user else None, name, emp_id)
+        return jsonify(payload), status_code
 
+    except (PoolTimeout, TooManyRequests, HashingBusy):
+        return server_busy_response()
     except Exception as e:
-        print(f"❌ Signup error: {str(e)}")
+        log_error('signup', e)
         return jsonify({'success': False, 'message': 'Kayıt sırasında bir hata oluştu.'}), 500
 @app.route('/api/login', methods=['POST'])
 def login():
     try:
-        data = request.json
-        email = data.get('email', '').strip()
-        password = data.get('password', '')
-       
-        if not email or not password:
-            return jsonify({'success': False, 'message': 'Email ve şifre gerekli!'}), 400
+        fields, error = validate_login(request.json)
+        if error:
+            return jsonify(error[0]), error[1]
+        email, password = fields
+
+        retry_after = LOGIN_LIMITER.check(request_ip(), email)
+        if retry_after:
+            return rate_limited_response(retry_after)
        
-        conn = get_conn()
-        cur = conn.cursor()
-        cur.execute("SELECT id, name, password FROM users WHERE email = %s", (email,))
-        user = cur.fetchone()
+        with get_conn() as conn:
+            # Kullanıcı ve personel ID'si tek sorguda; bağlantı şifre doğrulanırken tutulmaz
+            user = conn.execute(LOGIN_SQL, (email,)).fetchone()
        
         if not user:
-            cur.close()
-            conn.close()
-            return jsonify({'success': False, 'message': 'Email veya şifre yanlış!'}), 401
-       
-        user_id, name, hashed_password = user
-        if hash_password(password) != hashed_password:
-            cur.close()
-            conn.close()
-            return jsonify({'success': False, 'message': 'Email veya şifre yanlış!'}), 401
+            return jsonify(LOGIN_FAILED[0]), LOGIN_FAILED[1]
        
-        # Personelin ID'sini employees tablosundan al
-        cur.execute("SELECT id FROM employees WHERE name = %s", (name,))
-        emp_result = cur.fetchone()
-        employee_id = emp_result[0] if emp_result else user_id
+        user_id, name, hashed_password, emp_id = user
+        valid, new_hash = verify_password(password, hashed_password)
+        if not valid:
+            return jsonify(LOGIN_FAILED[0]), LOGIN_FAILED[1]
        
-        cur.close()
-        conn.close()
+        if new_hash:
+            # Eski SHA-256 veya eski maliyetli hash → yeni şemaya yükselt (toplu migration gerekmez)
+            with get_conn() as conn:
+                conn.execute(REHASH_SQL, (new_hash, user_id, hashed_password))
+                conn.commit()
        
-        return jsonify({
-            'success': True,
-            'message': 'Giriş başarılı!',
-            'user_id': user_id,
-            'user_name': name,
-            'employee_id': employee_id
-        }), 200
+        payload, status_code = login_result(user_id, name, emp_id)
+        return jsonify(payload), status_code
+    except (PoolTimeout, TooManyRequests, HashingBusy):
+        return server_busy_response()
     except Exception as e:
-        print(f"❌ Login error: {str(e)}")
+        log_error('login', e)
         return jsonify({'success': False, 'message': f'Hata: {str(e)}'}), 500
 # ==================== DASHBOARD PAGE ====================
 @app.route('/dashboard')
 def dashboard():
-    return """<!DOCTYPE html>
-<html lang="tr">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>🎯 PROSPANDO YOKLAMA</title>
-    <style>
-        * { margin: 0; padding: 0; box-sizing: border-box; }
-        body {
-            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-            background: #0f172a;
-            min-height: 100vh;
-            display: flex;
-            flex-direction: column;
-            align-items: center;
-            justify-content: center;
-            padding: 20px;
-            padding-top: 100px;
-            position: relative;
-            overflow: hidden;
-        }
-        body::before {
-            content: '';
-            position: absolute;
-            top: 0; left: 0; right: 0; bottom: 0;
-            background:
-                radial-gradient(circle at 20% 80%, #7c3aed 0%, transparent 50%),
-                radial-gradient(circle at 80% 20%, #ec4899 0%, transparent 50%),
-                radial-gradient(circle at 50% 50%, #3b82f6 0%, transparent 40%);
-            opacity: 0.4;
-            z-index: -1;
-            animation: pulse 15s ease infinite;
-        }
-        @keyframes pulse {
-            0%, 100% { opacity: 0.4; }
-            50% { opacity: 0.6; }
-        }
-        .navbar {
-            position: fixed;
-            top: 0;
-            left: 0;
-            right: 0;
-            background: rgba(15, 23, 42, 0.9);
-            backdrop-filter: blur(20px);
-            color: white;
-            padding: 20px 30px;
-            display: flex;
-            justify-content: space-between;
-            align-items: center;
-            z-index: 1000;
-            border-bottom: 2px solid rgba(124, 58, 237, 0.3);
-        }
-        .navbar h1 {
-            font-size: 28px;
-            font-weight: 900;
-            text-shadow: 0 0 15px rgba(124, 58, 237, 0.6);
-        }
-        .navbar button {
-            background: linear-gradient(135deg, #ef4444, #dc2626);
-            color: white;
-            border: none;
-            padding: 12px 28px;
-            border-radius: 10px;
-            cursor: pointer;
-            font-weight: 600;
-            transition: all 0.3s;
-            box-shadow: 0 0 20px rgba(239, 68, 68, 0.4);
-        }
-        .navbar button:hover {
-            transform: translateY(-3px);
-            box-shadow: 0 0 40px rgba(239, 68, 68, 0.6);
-        }
-        .container {
-            background: rgba(15, 23, 42, 0.7);
-            backdrop-filter: blur(20px);
-            border-radius: 32px;
-            padding: 60px 80px;
-            max-width: 900px;
-            width: 100%;
-            box-shadow:
-                0 0 40px rgba(124, 58, 237, 0.4),
-                0 20px 60px rgba(0, 0, 0, 0.3),
-                inset 0 0 20px rgba(255, 255, 255, 0.05);
-            border: 1px solid rgba(124, 58, 237, 0.3);
-        }
-        .welcome {
-            background: rgba(124, 58, 237, 0.2);
-            color: white;
-            padding: 30px;
-            border-radius: 20px;
-            text-align: center;
-            margin-bottom: 40px;
-            font-size: 32px;
-            font-weight: bold;
-            border: 2px solid rgba(124, 58, 237, 0.4);
-            box-shadow: 0 0 30px rgba(124, 58, 237, 0.3);
-        }
-        .title {
-            color: white;
-            text-align: center;
-            font-size: 40px;
-            font-weight: 900;
-            margin-bottom: 40px;
-            text-shadow: 0 0 20px rgba(124, 58, 237, 0.6);
-            letter-spacing: 2px;
-        }
-        .form-group { margin-bottom: 30px; }
-        label {
-            color: white;
-            font-size: 24px;
-            font-weight: bold;
-            display: flex;
-            align-items: center;
-            margin-bottom: 15px;
-            background: rgba(124, 58, 237, 0.2);
-            padding: 18px 25px;
-            border-radius: 15px;
-            border: 3px solid rgba(124, 58, 237, 0.4);
-            width: fit-content;
-            min-width: 200px;
-            box-shadow: 0 0 15px rgba(124, 58, 237, 0.2);
-        }
-        select, input {
-            width: 100%;
-            padding: 20px;
-            font-size: 20px;
-            border: 3px solid #7c3aed;
-            border-radius: 15px;
-            background: rgba(30, 41, 59, 0.8);
-            color: #e2e8f0;
-            transition: all 0.3s;
-        }
-        select:focus, input:focus {
-            outline: none;
-            border-color: #ec4899;
-            background: rgba(51, 65, 85, 0.9);
-            box-shadow: 0 0 30px rgba(236, 72, 153, 0.5);
-        }
-        .input-row {
-            display: flex;
-            gap: 25px;
-            align-items: flex-start;
-        }
-        .input-row label { margin-bottom: 0; flex-shrink: 0; }
-        .input-row input, .input-row select { flex: 1; }
-        button.check-btn {
-            width: 100%;
-            padding: 35px;
-            font-size: 36px;
-            font-weight: bold;
-            background: linear-gradient(135deg, #48bb78 0%, #38a169 100%);
-            color: white;
-            border: none;
-            border-radius: 20px;
-            cursor: pointer;
-            margin-top: 20px;
-            transition: all 0.5s ease;
-            box-shadow: 0 0 40px rgba(72, 187, 120, 0.4);
-            position: relative;
-            overflow: hidden;
-        }
-        button.check-btn::before {
-            content: '';
-            position: absolute;
-            top: 0; left: -100%;
-            width: 100%;
-            height: 100%;
-            background: linear-gradient(90deg, transparent, rgba(255,255,255,0.3), transparent);
-            transition: 0.7s;
-        }
-        button.check-btn:hover {
-            transform: translateY(-5px);
-            box-shadow: 0 0 80px rgba(72, 187, 120, 0.6);
-        }
-        button.check-btn:hover::before {
-            left: 100%;
-        }
-        .result {
-            margin-top: 30px;
-            padding: 35px;
-            border-radius: 20px;
-            text-align: center;
-            font-size: 26px;
-            font-weight: bold;
-            color: white;
-            min-height: 130px;
-            display: none;
-            align-items: center;
-            justify-content: center;
-            border: 4px solid rgba(255, 255, 255, 0.3);
-            white-space: pre-wrap;
-            opacity: 0;
-            transform: scale(0.9);
-            transition: all 0.6s ease;
-        }
-        .result.show {
-    opacity: 1;
-    transform: scale(1);
-    display: flex;
+    return DASHBOARD_PAGE.response()
+# Gün ve saat veritabanında an + site diliminden üretilir (bkz. migrations/0015)
+CHECK_IN_SQL = "SELECT * FROM attendance_check_in(%s, %s, %s::TIMESTAMPTZ, %s::TEXT, %s)"
+# id → isim; olmayan id'ler de kısa süre hatırlanır (employees_changed NOTIFY ile geçersiz kılınır)
+EMPLOYEES = EmployeeDirectory()
+def known_missing(emp_id):
+    """Personel yok olarak biliniyorsa True (yalnızca geçersiz kılma bildirimleri gelirken güvenilir)"""
+    ensure_listener()
+    return pg_listener.connected and EMPLOYEES.lookup(emp_id) == NOT_FOUND
+def validate_check_in(data, emp_id=None):
+    """(emp_id, location) ya da hata yanıtı döndür; emp_id token'dan geldiyse gövdedeki yok sayılır"""
+    # Hem 'id' hem 'employee_id' kabul et
+    emp_id_input = emp_id or data.get('employee_id') or data.get('id')
+   
+    if not emp_id_input:
+        return None, ({
+            'success': False,
+            'message': '❌ HATA!\nKimlik numarası gerekli.',
+            'type': 'error'
+        }, 400)
+   
+    try:
+        emp_id = int(emp_id_input)
+    except (ValueError, TypeError):
+        return None, ({
+            'success': False,
+            'message': '❌ HATA!\nGeçersiz ID formatı.',
+            'type': 'error'
+        }, 400)
+   
+    location = data.get('location', '').strip()
+   
+    if not location:
+        return None, ({
+            'success': False,
+            'message': '❌ HATA!\nLütfen bölge seçiniz.',
+            'type': 'error'
+        }, 400)
+   
+    return (emp_id, location), None
+# Açıkken token'sız (ham id ile) check-in reddedilir; kiosk'lar id yazarak kullanıyorsa kapalı kalmalı
+CHECKIN_REQUIRE_TOKEN = os.getenv('CHECKIN_REQUIRE_TOKEN', 'false').lower() == 'true'
+TOKEN_ERRORS = {
+    'missing': ({'success': False, 'message': '❌ Oturum gerekli!\nLütfen giriş yapın.', 'type': 'error'}, 401),
+    'expired': ({'success': False, 'message': '❌ Oturum süresi doldu!\nLütfen tekrar giriş yapın.', 'type': 'error'}, 401),
+    'invalid': ({'success': False, 'message': '❌ Geçersiz oturum!\nLütfen tekrar giriş yapın.', 'type': 'error'}, 401),
+    'no_employee': ({'success': False, 'message': '❌ HATA!\nHesabınıza bağlı personel kaydı yok.', 'type': 'error'}, 403)
 }
-        .result.success {
-            background: linear-gradient(135deg, #48bb78 0%, #38a169 100%);
-            border-color: #48bb78;
-            box-shadow: 0 0 60px rgba(72, 187, 120, 0.7);
-        }
-        .result.error {
-            background: linear-gradient(135deg, #f56565 0%, #e53e3e 100%);
-            border-color: #f56565;
-            box-shadow: 0 0 60px rgba(245, 101, 101, 0.7);
-        }
-        .result.warning {
-            background: linear-gradient(135deg, #ed8936 0%, #dd6b20 100%);
-            border-color: #ed8936;
-            box-shadow: 0 0 60px rgba(237, 137, 54, 0.7);
-        }
-        @media (max-width: 768px) {
-            .container { padding: 30px 20px; }
-            .welcome { font-size: 24px; }
-            button.check-btn { padding: 20px; font-size: 24px; }
-            .input-row { flex-direction: column; }
-            label { font-size: 18px; width: 100%; }
-            select, input { font-size: 16px; padding: 15px; }
-        }
-    </style>
-</head>
-<body>
-    <div class="navbar">
-        <div><h1>🎯 PROSPANDO</h1></div>
-        <div><button onclick="logout()">Çıkış Yap</button></div>
-    </div>
-    <div class="container">
-        <div class="welcome">
-            👋 Hoş geldiniz, <span id="user-name"></span>!
-        </div>
-        <div class="title">PERSONEL YOKLAMA SİSTEMİ</div>
-        <div class="form-group input-row">
-            <label for="location">📍 BÖLGE:</label>
-            <select id="location">
-                <option value="">Bölge seçiniz...</option>
-                <option value="Mitte">🏢 Mitte</option>
-                <option value="Spandau">🏭 Spandau</option>
-                <option value="Steglitz">🏪 Steglitz</option>
-                <option value="Neukölln">🗽️ Neukölln</option>
-                <option value="Charlottenburg">🛖️ Charlottenburg</option>
-            </select>
-        </div>
-        <button class="check-btn" onclick="checkIn()">▶ GİRİŞ / ÇIKIŞ</button>
-        <div id="result" class="result"></div>
-    </div>
-    <script>
-        window.addEventListener('load', () => {
-            const userName = localStorage.getItem('user_name');
-            const userId = localStorage.getItem('user_id');
-            const employeeId = localStorage.getItem('employee_id');
-            if (!userName || !userId || !employeeId) {
-                window.location.href = '/';
-                return;
-            }
-            document.getElementById('user-name').textContent = userName;
-            document.getElementById('location').focus();
-        });
-        async function checkIn() {
-            const location = document.getElementById('location').value;
-            const employeeId = localStorage.getItem('employee_id');
-            if (!location) {
-                showResult('❌ HATA!\\nLütfen bölge seçiniz.', 'error');
-                return;
-            }
-            try {
-                const response = await fetch('/api/checkin', {
-                    method: 'POST',
-                    headers: {'Content-Type': 'application/json'},
-                    body: JSON.stringify({
-                        employee_id: parseInt(employeeId),
-                        location: location
-                    })
-                });
-                const data = await response.json();
-                showResult(data.message, data.type);
-                if (data.success) {
-                    document.getElementById('location').value = '';
-                    document.getElementById('location').focus();
-                }
-            } catch (error) {
-                showResult('❌ HATA!\\nBağlantı hatası: ' + error.message, 'error');
-            }
-        }
-        function showResult(message, type) {
-            const resultDiv = document.getElementById('result');
-            resultDiv.textContent = message;
-            resultDiv.className = `result ${type} show`;
-            setTimeout(() => { resultDiv.className = 'result'; }, 6000);
-        }
-        function logout() {
-            localStorage.removeItem('user_id');
-            localStorage.removeItem('user_name');
-            localStorage.removeItem('employee_id');
-            window.location.href = '/';
-        }
-    </script>
-</body>
-</html>"""
+def check_in_identity(authorization):
+    """Bearer token'ı doğrula (yalnızca HMAC, veritabanı yok): (claims, None), (None, None) ya da (None, hata yanıtı)"""
+    token = bearer_token(authorization)
+    if token is None:
+        return None, TOKEN_ERRORS['missing'] if CHECKIN_REQUIRE_TOKEN else None
+    claims, reason = verify_token(token)
+    if claims is None:
+        return None, TOKEN_ERRORS[reason]
+    if claims['employee_id'] is None:
+        return None, TOKEN_ERRORS['no_employee']
+    return claims, None
+def note_check_in(status, emp_id, location, emp_name=None, start=None):
+    """Bu worker'ın doluluk indeksi ve personel önbelleği hemen güncellenir; diğerlerine NOTIFY ile ulaşır"""
+    if status == 'not_found':
+        EMPLOYEES.put_missing(emp_id)
+    elif emp_name is not None:
+        EMPLOYEES.put(emp_id, emp_name)
+    if status == 'entry':
+        OCCUPANCY.open(emp_id, location, start=start)
+    elif status == 'exit':
+        OCCUPANCY.close(emp_id)
+def check_in_result(status, emp_id, emp_name, location, session_location, time_str, minutes):
+    """Giriş/çıkış kararını (attendance_check_in durumu) JSON yanıtına ve HTTP koduna çevir"""
+    if status == 'not_found':
+        return {
+            'success': False,
+            'message': f'❌ HATA!\nID {emp_id} numaralı personel bulunamadı!',
+            'type': 'error'
+        }, 404
+   
+    if status == 'elsewhere':
+        return {
+            'success': False,
+            'message': f'⚠️ DİKKAT!\n{emp_name}\n{session_location} bölgesinde\naçık girişiniz var!\nÖnce oradan çıkış yapınız.',
+            'type': 'warning'
+        }, 409
+   
+    if status == 'out_of_order':
+        return {
+            'success': False,
+            'message': f'⚠️ DİKKAT!\n{emp_name}\n{time_str} dokunuşu daha sonra açılmış bir oturumdan önce;\nolay uygulanmadı.',
+            'type': 'warning'
+        }, 409
+   
+    if status == 'exit':
+        # ÇIKIŞ
+        message = f'👋 GÖRÜŞÜRÜZ!\n{emp_name}\n🕐 Çıkış: {time_str}\n⏱️ Çalışma Süresi: {format_duration(minutes)}\n📍 {location}'
+    else:
+        # GİRİŞ
+        message = f'✅ HOŞ GELDİN!\n{emp_name}\n🕐 Giriş: {time_str}\n📍 {location}'
+   
+    return {
+        'success': True,
+        'message': message,
+        'type': 'success'
+    }, 200
+# Çift dokunma koruması: aynı personel + bölge (ya da aynı Idempotency-Key) için pencere
+# içindeki tekrar istek veritabanına gitmeden önceki yanıtı alır
+CHECKIN_DEBOUNCE_SECONDS = float(os.getenv('CHECKIN_DEBOUNCE_SECONDS', 30))
+CHECKIN_PENDING_SECONDS = float(os.getenv('CHECKIN_PENDING_SECONDS', 5))
+CHECK_IN_CACHE = make_cache(maxsize=int(os.getenv('CHECKIN_CACHE_SIZE', 10000)), prefix='prospando:checkin:')
+CHECK_IN_PENDING = 'pending'
+def check_in_cache_key(emp_id, location, request_key=None):
+    if request_key:
+        return f'{emp_id}:key:{request_key}'
+    return f'{emp_id}:{location}'
+def claim_check_in(key):
+    """Önbellekte yanıt varsa (payload, status) döndür; yoksa anahtarı bu isteğe ayırıp None döndür"""
+    if CHECKIN_DEBOUNCE_SECONDS <= 0:
+        return None
+    deadline = time.monotonic() + CHECKIN_PENDING_SECONDS
+    while True:
+        try:
+            if CHECK_IN_CACHE.add(key, CHECK_IN_PENDING, CHECKIN_PENDING_SECONDS):
+                return None
+            cached = CHECK_IN_CACHE.get(key)
+        except Exception as e:
+            # Önbellek erişilemezse istek korumasız ama doğru şekilde işlenir
+            log_error('checkin_cache', e)
+            return None
+        if cached is not None and cached != CHECK_IN_PENDING:
+            return cached[0], cached[1]
+        # Aynı anahtarla başka bir istek şu an işleniyor; sonucunu bekle
+        if time.monotonic() >= deadline:
+            return None
+        time.sleep(0.05)
+def remember_check_in(key, payload, status_code):
+    """Başarılı yanıtı pencere boyunca sakla; diğer sonuçlarda anahtarı serbest bırak"""
+    if CHECKIN_DEBOUNCE_SECONDS <= 0:
+        return
+    try:
+        if status_code == 200:
+            CHECK_IN_CACHE.set(key, [payload, status_code], CHECKIN_DEBOUNCE_SECONDS)
+        else:
+            CHECK_IN_CACHE.delete(key)
+    except Exception as e:
+        log_error('checkin_cache', e)
 @app.route('/api/checkin', methods=['POST'])
 def check_in():
     try:
-        data = request.json
+        claims, error = check_in_identity(request.headers.get('Authorization'))
+        if error:
+            return jsonify(error[0]), error[1]
+        fields, error = validate_check_in(request.json, claims['employee_id'] if claims else None)
+        if error:
+            return jsonify(error[0]), error[1]
+        emp_id, location = fields
+        token_name = claims['name'] if claims else None
        
-        # Hem 'id' hem 'employee_id' kabul et
-        emp_id_input = data.get('employee_id') or data.get('id')
-       
-        if not emp_id_input:
-            return jsonify({
-                'success': False,
-                'message': '❌ HATA!\nKimlik numarası gerekli.',
-                'type': 'error'
-            }), 400
+        if token_name is None and known_missing(emp_id):
+            payload, status_code = check_in_result('not_found', emp_id, None, location, None, None, None)
+            return jsonify(payload), status_code
        
-        try:
-            emp_id = int(emp_id_input)
-        except (ValueError, TypeError):
-            return jsonify({
-                'success': False,
-                'message': '❌ HATA!\nGeçersiz ID formatı.',
-                'type': 'error'
-            }), 400
+        cache_key = check_in_cache_key(emp_id, location, request.headers.get('Idempotency-Key'))
+        cached = claim_check_in(cache_key)
+        if cached is not None:
+            return jsonify(cached[0]), cached[1]
        
-        location = data.get('location', '').strip()
+        now = site_now()
+        now_time = now.strftime("%H:%M")
        
-        if not location:
-            return jsonify({
-                'success': False,
-                'message': '❌ HATA!\nLütfen bölge seçiniz.',
-                'type': 'error'
-            }), 400
+        if CHECKIN_QUEUE is not None:
+            queued = queue_check_in(emp_id, location, now, token_name, request.headers.get('Idempotency-Key'))
+            if queued is not None:
+                remember_check_in(cache_key, *queued)
+                return jsonify(queued[0]), queued[1]
        
-        conn = get_conn()
-        cur = conn.cursor()
+        # Tek ağ turu: karar + INSERT/UPDATE sunucuda, autocommit ile kendi transaction'ında
+        try:
+            with get_conn() as conn:
+                conn.autocommit = True
+                try:
+                    status, emp_name, session_location, session_start, minutes = conn.execute(
+                        CHECK_IN_SQL, (emp_id, location, now, SITE_TIMEZONE, token_name)
+                    ).fetchone()
+                except psycopg.errors.ForeignKeyViolation:
+                    # Token geçerli ama personel o arada silinmiş
+                    status, emp_name, session_location, session_start, minutes = 'not_found', None, None, None, None
+                finally:
+                    conn.autocommit = False
+        except Exception:
+            remember_check_in(cache_key, None, None)
+            raise
        
-        # Personeli bul
-        cur.execute("SELECT id, name FROM employees WHERE id = %s", (emp_id,))
-        employee = cur.fetchone()
+        note_check_in(status, emp_id, location, emp_name, now.time())
+        payload, status_code = check_in_result(status, emp_id, emp_name, location, session_location, now_time, minutes)
+        remember_check_in(cache_key, payload, status_code)
+        return jsonify(payload), status_code
        
-        if not employee:
-            cur.close()
-            conn.close()
+    except (PoolTimeout, TooManyRequests):
+        return server_busy_response()
+    except Exception as e:
+        log_error('checkin', e)
+        return jsonify({
+            'success': False,
+            'message': '❌ Sunucu Hatası!\nLütfen tekrar deneyin.',
+            'type': 'error'
+        }), 500
+# ==================== KIOSK BATCH SYNC ====================
+CHECKIN_BATCH_MAX = int(os.getenv('CHECKIN_BATCH_MAX', 1000))
+# Kabul edilen olay zamanı: [şimdi - MAX_AGE, şimdi + MAX_SKEW]. Saati bozuk kiosk'un olayı
+# açılmamış (ya da ayrılmış) bir aylık bölüme düşüp tüm toplu yazımı bozmasın
+CHECKIN_EVENT_MAX_AGE = float(os.getenv('CHECKIN_EVENT_MAX_AGE', 7 * 24 * 3600))
+CHECKIN_EVENT_MAX_SKEW = float(os.getenv('CHECKIN_EVENT_MAX_SKEW', 300))
+def parse_checkin_event(raw):
+    """Kiosk olayını doğrula; (olay, None) ya da (None, hata mesajı) döndür"""
+    if not isinstance(raw, dict):
+        return None, '❌ HATA!\nGeçersiz olay.'
+
+    key = str(raw.get('idempotency_key') or '').strip()
+    if not key or len(key) > 200:
+        return None, '❌ HATA!\nidempotency_key gerekli.'
+
+    try:
+        emp_id = int(raw.get('employee_id') or raw.get('id'))
+    except (ValueError, TypeError):
+        return None, '❌ HATA!\nGeçersiz ID formatı.'
+
+    location = str(raw.get('location') or '').strip()
+    if not location:
+        return None, '❌ HATA!\nLütfen bölge seçiniz.'
+
+    try:
+        at = datetime.fromisoformat(str(raw.get('timestamp')))
+    except ValueError:
+        return None, '❌ HATA!\nGeçersiz zaman damgası.'
+    # Dilimsiz zaman damgası kiosk'un (site) saatidir; dilimli olanlar site saatine çevrilir
+    at = at.replace(tzinfo=SITE_TZ) if at.tzinfo is None else at.astimezone(SITE_TZ)
+    now = datetime.now(SITE_TZ)
+    if at > now + timedelta(seconds=CHECKIN_EVENT_MAX_SKEW):
+        return None, '❌ HATA!\nZaman damgası ileri tarihli (kiosk saatini kontrol edin).'
+    if at < now - timedelta(seconds=CHECKIN_EVENT_MAX_AGE):
+        return None, '❌ HATA!\nZaman damgası çok eski.'
+
+    return {
+        'key': key,
+        'employee_id': emp_id,
+        'location': location,
+        'at': at.replace(second=0, microsecond=0)
+    }, None
+def open_session_at(sessions, location, at):
+    """attendance_check_in() ile aynı seçim: `at` anından önceki MAX_SESSION içinde açılmış
+    oturumlardan önce bu bölgedeki, sonra en yenisi. Olaydan sonra açılmış oturumlar aday değildir."""
+    candidates = [s for s in sessions if at - MAX_SESSION < s['started_at'] <= at]
+    return max(candidates, key=lambda s: (s['location'] == location, s['started_at']), default=None)
+def apply_checkin_events(conn, events):
+    """
+    Olayları personel başına zaman sırasıyla, check_in() ile aynı giriş/çıkış
+    kurallarıyla tek transaction'da uygula. Her olay 'seq' taşır; seq → sonuç döner.
+    Commit çağırana aittir.
+    """
+    cur = conn.cursor()
+    emp_ids = sorted({event['employee_id'] for event in events})
+
+    # attendance_check_in() ile aynı kilit; artan sırayla alındığı için kilitlenme olmaz
+    cur.execute(
+        "SELECT pg_advisory_xact_lock(hashtext('attendance_check_in'), id) FROM unnest(%s::INTEGER[]) AS id",
+        (emp_ids,)
+    )
+
+    cur.execute(
+        "SELECT idempotency_key, status, attendance_id FROM checkin_events WHERE idempotency_key = ANY(%s)",
+        ([event['key'] for event in events],)
+    )
+    seen = {key: (status, attendance_id) for key, status, attendance_id in cur.fetchall()}
+
+    names = EMPLOYEES.names(cur, emp_ids)
+
+    # Gece yarısını geçen oturumlar için olayların ilk gününden bir gün öncesi de okunur
+    days = sorted({event['at'].date() for event in events})
+    cur.execute("""
+        SELECT id, employee_id, date, location, start_time,
+               COALESCE(started_at, (date + start_time) AT TIME ZONE %s)
+        FROM attendance
+        WHERE employee_id = ANY(%s) AND date BETWEEN %s AND %s AND end_time IS NULL
+    """, (SITE_TIMEZONE, emp_ids, days[0] - timedelta(days=1), days[-1]))
+    open_sessions = {}
+    for att_id, employee_id, day, location, start, started_at in cur.fetchall():
+        open_sessions.setdefault(employee_id, []).append(
+            {'id': att_id, 'date': day, 'location': location, 'start': start, 'started_at': started_at}
+        )
+
+    results = {}
+    new_sessions = []
+    closed = []
+    for event in sorted(events, key=lambda e: (e['employee_id'], e['at'], e['seq'])):
+        key, emp_id, location, at = event['key'], event['employee_id'], event['location'], event['at']
+        time_str = at.strftime("%H:%M")
+
+        if key in seen:
+            status, attendance_id = seen[key]
+            results[event['seq']] = {'idempotency_key': key, 'status': 'duplicate', 'http_status': 200,
+                                     'success': True, 'message': '✅ Bu olay zaten işlendi.', 'type': 'success',
+                                     'original_status': status, 'attendance_id': attendance_id}
+            continue
+
+        emp_name = names.get(emp_id)
+        sessions = open_sessions.setdefault(emp_id, [])
+        session = open_session_at(sessions, location, at)
+        session_location, minutes = None, None
+        if emp_name is None:
+            status = 'not_found'
+        elif any(s['started_at'] > at for s in sessions):
+            # Olay, sonradan açılmış bir oturumdan önce: onu kapatmak negatif süre, giriş saymak
+            # ikinci açık oturum yazardı. Olay işlenmeden kaydedilir, düzeltme elle yapılır
+            status = 'out_of_order'
+            session = None
+        elif session is None:
+            # GİRİŞ
+            status = 'entry'
+            session = {'id': None, 'date': at.date(), 'location': location, 'start': at.time(), 'started_at': at,
+                       'row': {'employee_id': emp_id, 'employee_name': emp_name, 'date': at.date(),
+                               'start_time': at.time(), 'end_time': None, 'started_at': at, 'ended_at': None,
+                               'location': location, 'duration_minutes': None}}
+            new_sessions.append(session)
+            sessions.append(session)
+        elif session['location'] != location:
+            status = 'elsewhere'
+            session_location = session['location']
+        else:
+            # ÇIKIŞ
+            status = 'exit'
+            minutes = session_minutes(session['date'], session['start'], at)
+            if session['id'] is None:
+                session['row'].update(end_time=at.time(), ended_at=at, duration_minutes=minutes)
+            else:
+                # Güncelleme oturumun kendi gününe (bölüm anahtarı) gider
+                closed.append((session['id'], session['date'], at.time(), at, minutes))
+            sessions.remove(session)
+
+        payload, http_status = check_in_result(status, emp_id, emp_name, location, session_location, time_str, minutes)
+        results[event['seq']] = dict(payload, idempotency_key=key, status=status, http_status=http_status,
+                                     session=session if status in ('entry', 'exit') else None)
+        seen[key] = (status, None)
+
+    if new_sessions:
+        # id'ler önceden alınır, böylece COPY ile yazılan satırlar olaylarla eşleşir
+        cur.execute(
+            "SELECT nextval(pg_get_serial_sequence('attendance', 'id')) FROM generate_series(1, %s)",
+            (len(new_sessions),)
+        )
+        for session, (att_id,) in zip(new_sessions, cur.fetchall()):
+            session['id'] = att_id
+        with cur.copy("""
+            COPY attendance (id, employee_id, employee_name, date, start_time, end_time, started_at, ended_at,
+                             location, duration_minutes)
+            FROM STDIN
+        """) as copy:
+            for session in new_sessions:
+                row = session['row']
+                copy.write_row((session['id'], row['employee_id'], row['employee_name'], row['date'],
+                                row['start_time'], row['end_time'], row['started_at'], row['ended_at'],
+                                row['location'], row['duration_minutes']))
+
+    if closed:
+        cur.execute("""
+            UPDATE attendance a
+            SET end_time = v.end_time, ended_at = v.ended_at, duration_minutes = v.duration_minutes
+            FROM unnest(%s::BIGINT[], %s::DATE[], %s::TIME[], %s::TIMESTAMPTZ[], %s::INTEGER[])
+                AS v(id, date, end_time, ended_at, duration_minutes)
+            WHERE a.id = v.id AND a.date = v.date
+        """, tuple(list(column) for column in zip(*closed)))
+
+    logged = []
+    for event in events:
+        result = results[event['seq']]
+        session = result.pop('session', None)
+        if session is not None:
+            result['attendance_id'] = session['id']
+        if result['status'] != 'duplicate':
+            # occurred_at site duvar saatidir (TIMESTAMP)
+            logged.append((event['key'], event['employee_id'], event['location'], event['at'].replace(tzinfo=None),
+                           result['status'], result.get('attendance_id')))
+
+    if logged:
+        cur.execute("""
+            INSERT INTO checkin_events (idempotency_key, employee_id, location, occurred_at, status, attendance_id)
+            SELECT * FROM unnest(%s::TEXT[], %s::INTEGER[], %s::TEXT[], %s::TIMESTAMP[], %s::TEXT[], %s::BIGINT[])
+            ON CONFLICT (idempotency_key) DO NOTHING
+        """, tuple(list(column) for column in zip(*logged)))
+
+    cur.close()
+    return results
+@app.route('/api/checkin/batch', methods=['POST'])
+def check_in_batch():
+    """Bağlantısı kopan kiosk'ların biriktirdiği dokunuşları toplu uygula"""
+    try:
+        data = request.json or {}
+        raw_events = data.get('events')
+
+        if not isinstance(raw_events, list) or not raw_events:
+            return jsonify({'success': False, 'message': '❌ HATA!\nOlay listesi gerekli.', 'type': 'error'}), 400
+
+        if len(raw_events) > CHECKIN_BATCH_MAX:
             return jsonify({
                 'success': False,
-                'message': f'❌ HATA!\nID {emp_id} numaralı personel bulunamadı!',
+                'message': f'❌ HATA!\nTek seferde en fazla {CHECKIN_BATCH_MAX} olay gönderilebilir.',
                 'type': 'error'
-            }), 404
-       
-        emp_db_id, emp_name = employee
-        today = datetime.now().strftime("%Y-%m-%d")
-        now_time = datetime.now().strftime("%H:%M")
-       
-        # Aynı bölgede açık kayıt var mı?
-        cur.execute("""
-            SELECT id, start_time FROM attendance
-            WHERE employee_id = %s AND date = %s AND location = %s AND end_time IS NULL
-        """, (emp_db_id, today, location))
-        open_record = cur.fetchone()
-       
-        if open_record:
-            # ÇIKIŞ
-            att_id, start_time = open_record
-            start_str = str(start_time)[:5] if len(str(start_time)) > 5 else str(start_time)
-            duration = calculate_duration(start_str, now_time)
-           
-            cur.execute("""
-                UPDATE attendance
-                SET end_time = %s, duration = %s
-                WHERE id = %s
-            """, (now_time, duration, att_id))
-           
-            message = f'👋 GÖRÜŞÜRÜZ!\n{emp_name}\n🕐 Çıkış: {now_time}\n⏱️ Çalışma Süresi: {duration}\n📍 {location}'
-            response_type = 'success'
-        else:
-            # Başka bölgede açık oturum var mı?
-            cur.execute("""
-                SELECT location FROM attendance
-                WHERE employee_id = %s AND date = %s AND end_time IS NULL
-            """, (emp_db_id, today))
-            elsewhere = cur.fetchone()
-           
-            if elsewhere:
-                cur.close()
-                conn.close()
-                return jsonify({
-                    'success': False,
-                    'message': f'⚠️ DİKKAT!\n{emp_name}\n{elsewhere[0]} bölgesinde\naçık girişiniz var!\nÖnce oradan çıkış yapınız.',
-                    'type': 'warning'
-                }), 409
-           
-            # GİRİŞ
-            cur.execute("""
-                INSERT INTO attendance
-                (employee_id, employee_name, date, start_time, location)
-                VALUES (%s, %s, %s, %s, %s)
-            """, (emp_db_id, emp_name, today, now_time, location))
-           
-            message = f'✅ HOŞ GELDİN!\n{emp_name}\n🕐 Giriş: {now_time}\n📍 {location}'
-            response_type = 'success'
-       
-        conn.commit()
-        cur.close()
-        conn.close()
-       
-        return jsonify({
-            'success': True,
-            'message': message,
-            'type': response_type
-        }), 200
-       
+            }), 413
+
+        results = [None] * len(raw_events)
+        events = []
+        for seq, raw in enumerate(raw_events):
+            event, error = parse_checkin_event(raw)
+            if error:
+                key = raw.get('idempotency_key') if isinstance(raw, dict) else None
+                results[seq] = {'idempotency_key': key, 'status': 'invalid', 'http_status': 400,
+                                'success': False, 'message': error, 'type': 'error'}
+            else:
+                event['seq'] = seq
+                events.append(event)
+
+        if events:
+            with get_conn() as conn:
+                applied = apply_checkin_events(conn, events)
+                conn.commit()
+            for seq, result in applied.items():
+                results[seq] = result
+
+        counts = {}
+        for result in results:
+            counts[result['status']] = counts.get(result['status'], 0) + 1
+
+        return jsonify({'success': True, 'results': results, 'counts': counts}), 200
+
+    except (PoolTimeout, TooManyRequests):
+        return server_busy_response()
     except Exception as e:
-        print(f"❌ Check-in error: {str(e)}")
+        log_error('checkin_batch', e)
         return jsonify({
             'success': False,
             'message': '❌ Sunucu Hatası!\nLütfen tekrar deneyin.',
             'type': 'error'
         }), 500
+# ==================== WRITE-BEHIND QUEUE ====================
+# İsteğe bağlı: dokunuşlar yerel SQLite kuyruğuna yazılıp hemen yanıtlanır, arka planda
+# toplu transaction'larla attendance'a aktarılır (bkz. checkin_queue.py)
+CHECKIN_WRITE_BEHIND = os.getenv('CHECKIN_WRITE_BEHIND', 'false').lower() == 'true'
+def flush_queued_check_ins(events):
+    """Kuyruktan okunan olayları toplu senkronla aynı yoldan tek transaction'da yaz"""
+    with get_conn() as conn:
+        results = apply_checkin_events(conn, events)
+        conn.commit()
+    return results
+CHECKIN_QUEUE = CheckInQueue(
+    os.getenv('CHECKIN_QUEUE_PATH', 'checkin_queue.sqlite3'),
+    flush_queued_check_ins,
+    batch_size=int(os.getenv('CHECKIN_QUEUE_BATCH_SIZE', 500)),
+    interval=float(os.getenv('CHECKIN_QUEUE_FLUSH_INTERVAL', 0.5)),
+    max_lag=float(os.getenv('CHECKIN_QUEUE_MAX_LAG', 30)),
+    max_depth=int(os.getenv('CHECKIN_QUEUE_MAX_DEPTH', 10000)),
+    retain=float(os.getenv('CHECKIN_QUEUE_RETAIN', 120))
+) if CHECKIN_WRITE_BEHIND else None
+@app.before_request
+def start_checkin_queue():
+    # Yeniden başlatmadan önce kuyrukta kalanlar ilk istekle birlikte yazılmaya başlar
+    if CHECKIN_QUEUE is not None and os.getenv('DATABASE_URL'):
+        CHECKIN_QUEUE.start()
+def queued_base_session(emp_id):
+    """Kuyrukta satırı olmayan personelin açık oturumu (bildirimler gelmiyorsa bilinmez)"""
+    if not pg_listener.connected:
+        return UNKNOWN
+    return OCCUPANCY.session(emp_id)
+def queue_check_in(emp_id, location, now, token_name=None, request_key=None):
+    """Kararı kuyruktan/doluluk indeksinden ver ve dokunuşu kuyruğa yaz; (payload, status) ya da None (senkron yol)"""
+    CHECKIN_QUEUE.start()
+    ensure_listener()
+    name = token_name or EMPLOYEES.lookup(emp_id) or None
+    queued = CHECKIN_QUEUE.enqueue(
+        request_key or f'queue-{uuid.uuid4().hex}', emp_id, name, location, now,
+        lambda: queued_base_session(emp_id)
+    )
+    if queued is None:
+        return None
+    if queued == BUSY:
+        return SERVER_BUSY
+    status, emp_name, session_location, start, day = queued
+    time_str = now.strftime("%H:%M")
+    minutes = session_minutes(day, start, now) if status == 'exit' else None
+    note_check_in(status, emp_id, location, emp_name, start)
+    return check_in_result(status, emp_id, emp_name, location, session_location, time_str, minutes)
+# ==================== OCCUPANCY ====================
+OCCUPANCY_RECONCILE_SECONDS = float(os.getenv('OCCUPANCY_RECONCILE_SECONDS', 60))
+OCCUPANCY_SSE_KEEPALIVE = float(os.getenv('OCCUPANCY_SSE_KEEPALIVE', 15))
+OCCUPANCY = OccupancyIndex(today=site_today)
+# Worker başına havuz dışı tek LISTEN bağlantısı (worker açılışında başlar, bkz. start_background)
+pg_listener = NotificationListener(
+    lambda: psycopg.connect(os.getenv('DATABASE_URL'), autocommit=True, **DB_CONNECT_KWARGS)
+)
+def reconcile_occupancy():
+    """Doluluk indeksini dünün ve bugünün açık oturumlarıyla tam eşitle (kısmi açık oturum indeksi kullanılır)"""
+    today = site_today()
+    with get_conn() as conn:
+        rows = conn.execute("""
+            SELECT employee_id, location, start_time, date FROM attendance
+            WHERE end_time IS NULL AND date BETWEEN %s AND %s
+            ORDER BY date, start_time
+        """, (today - timedelta(days=1), today)).fetchall()
+    OCCUPANCY.replace(rows, today)
+pg_listener.subscribe('attendance_occupancy', OCCUPANCY.apply_notification, on_reconnect=reconcile_occupancy)
+pg_listener.every(OCCUPANCY_RECONCILE_SECONDS, reconcile_occupancy)
+pg_listener.subscribe('employees_changed', EMPLOYEES.apply_notification, on_reconnect=EMPLOYEES.clear)
+def ensure_listener():
+    if os.getenv('DATABASE_URL'):
+        pg_listener.start()
+@app.route('/api/occupancy', methods=['GET'])
+def occupancy():
+    """Bölge başına açık oturum sayısı; veritabanına gitmeden bellekten"""
+    ensure_listener()
+    return jsonify(dict(OCCUPANCY.snapshot(), success=True, live=pg_listener.connected)), 200
+@app.route('/api/occupancy/stream', methods=['GET'])
+def occupancy_stream():
+    """
+    Server-Sent Events: her değişiklikte güncel doluluk itilir.
+    Her bağlı ekran bir istek thread'i tutar; sync worker yerine gthread worker önerilir.
+    """
+    ensure_listener()
+
+    def events():
+        version = -1
+        while True:
+            current = OCCUPANCY.wait_for_change(version, OCCUPANCY_SSE_KEEPALIVE)
+            if current == version:
+                yield ': keepalive\n\n'
+                continue
+            version = current
+            snapshot = OCCUPANCY.snapshot()
+            yield f"event: occupancy\nid: {snapshot['version']}\ndata: {json.dumps(snapshot, ensure_ascii=False)}\n\n"
+
+    return Response(events(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+# ==================== REPORTS ====================
+REPORT_GROUPS = ('day', 'week', 'month')
+REPORT_MAX_DAYS = int(os.getenv('REPORT_MAX_DAYS', 366))
+REPORT_PAGE_MAX = int(os.getenv('REPORT_PAGE_MAX', 5000))
+# Tüm personelin süre/bordro verisini görebilen kullanıcılar (users.id, virgülle); diğerleri yalnızca kendi raporunu
+REPORT_ADMIN_USER_IDS = {int(value) for value in os.getenv('REPORT_ADMIN_USER_IDS', '').split(',') if value.strip()}
+REPORT_FORBIDDEN = ({'success': False, 'message': 'Bu veriye erişim yetkiniz yok!'}, 403)
+def report_identity(authorization):
+    """Rapor/dışa aktarım uçları için Bearer token: (claims, yönetici mi, None) ya da (None, False, hata yanıtı)"""
+    token = bearer_token(authorization)
+    if token is None:
+        return None, False, TOKEN_ERRORS['missing']
+    claims, reason = verify_token(token)
+    if claims is None:
+        return None, False, TOKEN_ERRORS[reason]
+    is_admin = claims['user_id'] in REPORT_ADMIN_USER_IDS
+    if not is_admin and claims['employee_id'] is None:
+        return None, False, REPORT_FORBIDDEN
+    return claims, is_admin, None
+def next_period(period, group):
+    """Bir gün/hafta/ay döneminin ardından gelen dönemin ilk günü"""
+    if group == 'day':
+        return period + timedelta(days=1)
+    if group == 'week':
+        return period + timedelta(days=7)
+    return (period.replace(day=28) + timedelta(days=4)).replace(day=1)
+@app.route('/api/reports/attendance', methods=['GET'])
+def attendance_report():
+    """Personel başına gün/hafta/ay çalışma dakikası toplamları (employee_id, dönem) keyset sayfalı.
+    Ham attendance yerine günlük özetten (daily_attendance_rollup) okunur. Token gerekir;
+    yönetici olmayan kullanıcı yalnızca kendi personel id'sinin raporunu alır."""
+    claims, is_admin, error = report_identity(request.headers.get('Authorization'))
+    if error:
+        return jsonify(error[0]), error[1]
+    try:
+        args = request.args
+        try:
+            date_from = date.fromisoformat(args.get('from', ''))
+            date_to = date.fromisoformat(args.get('to', ''))
+        except ValueError:
+            return jsonify({'success': False, 'message': 'from ve to YYYY-MM-DD biçiminde olmalıdır!'}), 400
+
+        if date_to < date_from or (date_to - date_from).days > REPORT_MAX_DAYS:
+            return jsonify({'success': False, 'message': f'Tarih aralığı en fazla {REPORT_MAX_DAYS} gün olabilir!'}), 400
+
+        group = args.get('group', 'day')
+        if group not in REPORT_GROUPS:
+            return jsonify({'success': False, 'message': 'group day, week veya month olmalıdır!'}), 400
+
+        limit = max(1, min(args.get('limit', 1000, type=int), REPORT_PAGE_MAX))
+        params = {'group': group, 'from': date_from, 'to': date_to, 'limit': limit + 1}
+        filters = []
+
+        employee_id = args.get('employee_id', type=int)
+        if not is_admin:
+            if employee_id not in (None, claims['employee_id']):
+                return jsonify(REPORT_FORBIDDEN[0]), REPORT_FORBIDDEN[1]
+            employee_id = claims['employee_id']
+        if employee_id is not None:
+            filters.append("AND employee_id = %(employee_id)s")
+            params['employee_id'] = employee_id
+
+        location = (args.get('location') or '').strip()
+        if location:
+            filters.append("AND location = %(location)s")
+            params['location'] = location
+
+        cursor = args.get('cursor')
+        if cursor:
+            # İmleç: son satırın "employee_id:dönem"i; sonraki sayfa bir sonraki dönemden başlar
+            try:
+                after_emp, after_period = cursor.split(':', 1)
+                params['after_emp'] = int(after_emp)
+                params['after_date'] = next_period(date.fromisoformat(after_period), group)
+            except ValueError:
+                return jsonify({'success': False, 'message': 'Geçersiz cursor!'}), 400
+            filters.append("AND (employee_id, day) >= (%(after_emp)s, %(after_date)s)")
+
+        with get_conn() as conn:
+            rows = conn.execute(f"""
+                SELECT r.employee_id, e.name, r.period, r.minutes, r.sessions
+                FROM (
+                    SELECT employee_id,
+                           date_trunc(%(group)s, day::TIMESTAMP)::DATE AS period,
+                           SUM(total_minutes)::INTEGER AS minutes,
+                           SUM(session_count)::INTEGER AS sessions
+                    FROM daily_attendance_rollup
+                    WHERE day BETWEEN %(from)s AND %(to)s
+                      AND session_count > 0
+                      {' '.join(filters)}
+                    GROUP BY employee_id, period
+                    ORDER BY employee_id, period
+                    LIMIT %(limit)s
+                ) r
+                LEFT JOIN employees e ON e.id = r.employee_id
+                ORDER BY r.employee_id, r.period
+            """, params).fetchall()
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = f'{rows[-1][0]}:{rows[-1][2].isoformat()}' if has_more else None
+
+        return jsonify({
+            'success': True,
+            'group': group,
+            'from': date_from.isoformat(),
+            'to': date_to.isoformat(),
+            'rows': [
+                {
+                    'employee_id': emp_id,
+                    'employee_name': name,
+                    'period': period.isoformat(),
+                    'minutes': minutes,
+                    'sessions': sessions
+                }
+                for emp_id, name, period, minutes, sessions in rows
+            ],
+            'next_cursor': next_cursor
+        }), 200
+
+    except (PoolTimeout, TooManyRequests):
+        return server_busy_response()
+    except Exception as e:
+        log_error('report', e)
+        return jsonify({'success': False, 'message': 'Rapor oluşturulamadı.'}), 500
+@app.cli.command('rollup-attendance')
+@click.option('--from', 'date_from', help='Başlangıç tarihi (YYYY-MM-DD); varsayılan: --days gün önce')
+@click.option('--to', 'date_to', help='Bitiş tarihi (YYYY-MM-DD); varsayılan: bugün')
+@click.option('--days', default=2, show_default=True, help='--from verilmezse geriye dönük gün sayısı')
+@click.option('--all', 'rebuild_all', is_flag=True, help='Tüm geçmişi yeniden hesapla')
+def rollup_attendance_command(date_from, date_to, days, rebuild_all):
+    """Günlük özeti attendance'tan gün gün yeniden hesapla (gece cron'u / onarım): flask --app app rollup-attendance"""
+    if rebuild_all:
+        date_from = date_to = None
+    else:
+        try:
+            date_to = date.fromisoformat(date_to) if date_to else site_today()
+            date_from = date.fromisoformat(date_from) if date_from else date_to - timedelta(days=days - 1)
+        except ValueError:
+            raise click.BadParameter('Tarihler YYYY-MM-DD biçiminde olmalıdır')
+    started = time.perf_counter()
+    # Prosedür her günü ayrı transaction'da commit eder; transaction bloğu dışında çağrılmalı
+    with psycopg.connect(os.getenv('DATABASE_URL'), autocommit=True, **DB_CONNECT_KWARGS) as conn:
+        conn.execute("CALL attendance_rollup_rebuild(%s, %s)", (date_from, date_to))
+    log.info('Günlük özet yeniden hesaplandı', extra={
+        'from': date_from, 'to': date_to, 'elapsed_ms': int((time.perf_counter() - started) * 1000)
+    })
+# ==================== STALE SESSION SWEEPER ====================
+SESSION_SWEEP_INTERVAL = float(os.getenv('SESSION_SWEEP_INTERVAL', 300))
+SESSION_SWEEP_BATCH = int(os.getenv('SESSION_SWEEP_BATCH', 500))
+SESSION_SWEEP_LOCK_KEY = 72_420_002
+SWEEP_POLICIES = SweepPolicies(os.getenv('SESSION_AUTOCLOSE', DEFAULT_POLICY))
+def close_stale_batch(conn, due):
+    """Vakti geçmiş oturumları tek transaction'da kapat; kapatılan satır sayısı döner. Commit çağırana aittir."""
+    cur = conn.cursor()
+    # attendance_check_in() ile aynı kilit; artan sırayla alındığı için kilitlenme olmaz
+    cur.execute(
+        "SELECT pg_advisory_xact_lock(hashtext('attendance_check_in'), id) FROM unnest(%s::INTEGER[]) AS id",
+        (sorted({employee_id for _, employee_id, _, _, _, _ in due}),)
+    )
+    # Kilit beklenirken personel kendisi çıkış yapmış olabilir: yalnızca hâlâ açık olanlar
+    cur.execute("""
+        UPDATE attendance a
+        SET end_time = v.end_time, duration_minutes = v.duration_minutes,
+            ended_at = COALESCE(a.started_at, (a.date + a.start_time) AT TIME ZONE %s)
+                       + make_interval(mins => v.duration_minutes),
+            auto_closed_at = now(), auto_close_policy = v.policy
+        FROM unnest(%s::BIGINT[], %s::DATE[], %s::TIME[], %s::INTEGER[], %s::TEXT[])
+            AS v(id, date, end_time, duration_minutes, policy)
+        WHERE a.id = v.id AND a.date = v.date AND a.end_time IS NULL
+        RETURNING v.policy
+    """, (SITE_TIMEZONE, *(list(column) for column in zip(*[
+        (att_id, day, end, minutes, rule) for att_id, _, day, end, minutes, rule in due
+    ]))))
+    closed = [policy for policy, in cur.fetchall()]
+    for policy in set(closed):
+        SESSIONS_AUTO_CLOSED.inc(policy, amount=closed.count(policy))
+    return len(closed)
+def sweep_stale_sessions(now=None, batch_size=SESSION_SWEEP_BATCH, dry_run=False):
+    """
+    Açık oturumları id sırasıyla batch_size'lık sayfalarla gez, kuralı gelmiş
+    olanları sayfa başına bir transaction'da kapat. Advisory lock ile aynı anda
+    tek worker çalışır; kilit başkasındaysa None, yoksa kapatılan (dry_run'da
+    kapatılacak) oturum sayısı döner.
+    """
+    # Kurallar site duvar saatiyle karşılaştırılır (date + start_time da öyle)
+    now = now or site_now().replace(tzinfo=None)
+    started = time.perf_counter()
+    total = 0
+    with get_conn() as conn:
+        if not conn.execute("SELECT pg_try_advisory_lock(%s)", (SESSION_SWEEP_LOCK_KEY,)).fetchone()[0]:
+            conn.rollback()
+            return None
+        try:
+            conn.commit()
+            last_id = 0
+            while True:
+                rows = conn.execute("""
+                    SELECT id, employee_id, location, date, start_time FROM attendance
+                    WHERE end_time IS NULL AND id > %s
+                    ORDER BY id LIMIT %s
+                """, (last_id, batch_size)).fetchall()
+                if not rows:
+                    break
+                last_id = rows[-1][0]
+                due = SWEEP_POLICIES.due(rows, now)
+                if due and not dry_run:
+                    total += close_stale_batch(conn, due)
+                else:
+                    total += len(due)
+                conn.commit()
+                if len(rows) < batch_size:
+                    break
+        finally:
+            conn.rollback()
+            conn.execute("SELECT pg_advisory_unlock(%s)", (SESSION_SWEEP_LOCK_KEY,))
+            conn.commit()
+    if total and not dry_run:
+        log.info('Açık oturumlar otomatik kapatıldı', extra={
+            'closed': total, 'elapsed_ms': int((time.perf_counter() - started) * 1000)
+        })
+    return total
+# Dinleyici thread'inde, her worker'da (bkz. start_background); advisory lock ile tek worker çalışır
+if SESSION_SWEEP_INTERVAL > 0:
+    pg_listener.every(SESSION_SWEEP_INTERVAL, sweep_stale_sessions)
+@app.cli.command('sweep-sessions')
+@click.option('--dry-run', is_flag=True, help='Kapatmadan yalnızca vakti geçmiş oturumları say')
+@click.option('--batch-size', default=SESSION_SWEEP_BATCH, show_default=True, help='Transaction başına en fazla oturum')
+def sweep_sessions_command(dry_run, batch_size):
+    """Unutulmuş açık oturumları SESSION_AUTOCLOSE kurallarına göre kapat: flask --app app sweep-sessions"""
+    count = sweep_stale_sessions(batch_size=batch_size, dry_run=dry_run)
+    if count is None:
+        raise click.ClickException('Süpürücü başka bir süreçte çalışıyor')
+    click.echo(f"{count} oturum {'kapatılacak' if dry_run else 'kapatıldı'}")
+# ==================== PARTITIONS ====================
+# attendance aylık RANGE (date) bölümlüdür (migrations/0016); gelecek ayların bölümleri önceden açılır
+# En az 1: ay sonunda CHECKIN_EVENT_MAX_SKEW kadar ileri tarihli olay gelecek ayın bölümüne düşer
+PARTITION_MONTHS_AHEAD = max(1, int(os.getenv('PARTITION_MONTHS_AHEAD', 3)))
+PARTITION_MAINTENANCE_INTERVAL = float(os.getenv('PARTITION_MAINTENANCE_INTERVAL', 3600))
+_PARTITION_BOUND = re.compile(r"FROM \((.+?)\) TO \((.+?)\)")
+def partition_bounds(expr):
+    """"FOR VALUES FROM ('2026-10-01') TO ('2026-11-01')" → (date, date); MINVALUE/MAXVALUE → None"""
+    match = _PARTITION_BOUND.search(expr or '')
+    if match is None:
+        return None, None
+    return tuple(
+        None if value in ('MINVALUE', 'MAXVALUE') else date.fromisoformat(value.strip("'"))
+        for value in match.groups()
+    )
+def attendance_partitions(conn):
+    """(bölüm adı, alt sınır, üst sınır) listesi, alt sınıra göre sıralı"""
+    rows = conn.execute("""
+        SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+        FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'attendance'::regclass
+    """).fetchall()
+    partitions = [(name, *partition_bounds(bound)) for name, bound in rows]
+    return sorted(partitions, key=lambda p: p[1] or date.min)
+def maintain_partitions(months_ahead=PARTITION_MONTHS_AHEAD):
+    """Bu aydan months_ahead ay sonrasına kadar eksik bölümleri aç; açılanların adları döner"""
+    with get_conn() as conn:
+        # Bölüm açmak üst tabloyu kısa süre kilitler; uzun bir sorgunun arkasında check-in'leri bekletmesin
+        conn.execute("SET LOCAL lock_timeout = '5s'")
+        created = [name for name, in conn.execute(
+            "SELECT * FROM attendance_ensure_partitions(%s)", (months_ahead,)
+        ).fetchall()]
+        conn.commit()
+    if created:
+        log.info('attendance bölümleri oluşturuldu', extra={'partitions': created})
+    return created
+# Dinleyici worker açılışında başlar (bkz. start_background); ilk kontrol bağlanır bağlanmaz yapılır,
+# aksi halde uzun süre kapalı kalmış bir kurulumda gelecek ayların bölümü olmadan INSERT'ler hata verir
+if PARTITION_MAINTENANCE_INTERVAL > 0:
+    pg_listener.every(PARTITION_MAINTENANCE_INTERVAL, maintain_partitions, delay=0)
+@app.cli.command('attendance-partitions')
+@click.option('--ahead', default=PARTITION_MONTHS_AHEAD, show_default=True, help='Önceden açılacak ay sayısı')
+@click.option('--detach-before', help='Üst sınırı bu aydan (YYYY-MM) sonra olmayan bölümleri ayır (arşiv)')
+def attendance_partitions_command(ahead, detach_before):
+    """
+    Aylık bölümleri aç ve listele; istenirse eski bölümleri ayır: flask --app app attendance-partitions
+
+    Ayrılan bölüm ayrı bir tablo olarak kalır (pg_dump ile arşivlenip silinebilir). Ayırma satır
+    silmediği için günlük özet (daily_attendance_rollup) ve raporlar etkilenmez; ancak o aylar için
+    rollup-attendance ile yeniden hesaplama yapılmamalıdır.
+    """
+    cutoff = None
+    if detach_before:
+        try:
+            cutoff = datetime.strptime(detach_before, '%Y-%m').date()
+        except ValueError:
+            raise click.BadParameter('--detach-before YYYY-MM biçiminde olmalıdır')
+        # Kiosk'ların hâlâ gönderebileceği olayların ayı yerinde kalmalı (CHECKIN_EVENT_MAX_AGE)
+        oldest_event = (site_now() - timedelta(seconds=CHECKIN_EVENT_MAX_AGE)).date()
+        if cutoff > oldest_event.replace(day=1):
+            raise click.BadParameter(f'{oldest_event:%Y-%m} ayı ya da sonrası ayrılamaz (toplu senkron olayları)')
+    for name in maintain_partitions(ahead):
+        click.echo(f"oluşturuldu: {name}")
+    # DETACH ... CONCURRENTLY transaction bloğu dışında çalışır ve check-in'leri kilitlemez
+    with psycopg.connect(os.getenv('DATABASE_URL'), autocommit=True, **DB_CONNECT_KWARGS) as conn:
+        for name, lower, upper in attendance_partitions(conn):
+            if cutoff is not None and upper is not None and upper <= cutoff:
+                # Yarıda kalırsa bölüm "detach pending" kalır: ALTER TABLE attendance DETACH PARTITION ... FINALIZE
+                conn.execute(sql.SQL('ALTER TABLE attendance DETACH PARTITION {} CONCURRENTLY').format(sql.Identifier(name)))
+                log.info('attendance bölümü ayrıldı', extra={'partition': name})
+                click.echo(f"ayrıldı: {name}")
+            else:
+                click.echo(f"{name}: {lower or 'MINVALUE'} – {upper or 'MAXVALUE'}")
+# ==================== EXPORTS ====================
+EXPORT_FORMATS = {'csv': 'text/csv; charset=utf-8', 'ndjson': 'application/x-ndjson'}
+EXPORT_COLUMNS = ('id', 'employee_id', 'employee_name', 'date', 'start_time', 'end_time',
+                  'location', 'duration', 'duration_minutes')
+# 'duration' metni dakikadan üretilir (eski metin kolonu okunmaz)
+EXPORT_SELECT = ', '.join('duration_minutes AS duration' if column == 'duration' else column for column in EXPORT_COLUMNS)
+EXPORT_DURATION_INDEX = EXPORT_COLUMNS.index('duration')
+# Sunucu tarafı cursor'dan her seferde çekilen satır sayısı ve akışa yazılan parça boyutu
+EXPORT_FETCH_SIZE = int(os.getenv('EXPORT_FETCH_SIZE', 5000))
+EXPORT_CHUNK_BYTES = 64 * 1024
+def export_chunks(rows, fmt):
+    """Satırları ~64 KB'lık CSV/NDJSON metin parçalarına çevir (bellekte tek parça tutulur)"""
+    buffer = io.StringIO()
+    if fmt == 'csv':
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_COLUMNS)
+        write = writer.writerow
+    else:
+        def write(row):
+            buffer.write(json.dumps(dict(zip(EXPORT_COLUMNS, row)), default=str, ensure_ascii=False))
+            buffer.write('\n')
+
+    for row in rows:
+        write(row)
+        if buffer.tell() >= EXPORT_CHUNK_BYTES:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+def gzip_chunks(chunks):
+    """Parçaları akış halinde gzip'le (tüm çıktı bellekte birikmez)"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+def stream_attendance_export(date_from=None, date_to=None, location=None, fmt='csv', compress=False):
+    """attendance satırlarını isimli (sunucu tarafı) cursor ile okuyup bayt parçaları üret"""
+    filters, params = [], {}
+    if date_from:
+        filters.append("date >= %(from)s")
+        params['from'] = date_from
+    if date_to:
+        filters.append("date <= %(to)s")
+        params['to'] = date_to
+    if location:
+        filters.append("location = %(location)s")
+        params['location'] = location
+    where = f"WHERE {' AND '.join(filters)}" if filters else ''
+
+    with get_conn() as conn:
+        with conn.cursor(name='attendance_export') as cur:
+            cur.itersize = EXPORT_FETCH_SIZE
+            cur.execute(f"SELECT {EXPORT_SELECT} FROM attendance {where} ORDER BY id", params)
+            i = EXPORT_DURATION_INDEX
+            rows = (row[:i] + (format_duration(row[i]),) + row[i + 1:] for row in cur)
+            chunks = export_chunks(rows, fmt)
+            yield from gzip_chunks(chunks) if compress else chunks
+def parse_export_args(args):
+    """from/to/location/format/gzip parametrelerini doğrula; (ayarlar, hata) döndür"""
+    try:
+        date_from = date.fromisoformat(args['from']) if args.get('from') else None
+        date_to = date.fromisoformat(args['to']) if args.get('to') else None
+    except ValueError:
+        return None, 'from ve to YYYY-MM-DD biçiminde olmalıdır!'
+
+    fmt = args.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        return None, 'format csv veya ndjson olmalıdır!'
+
+    return {
+        'date_from': date_from,
+        'date_to': date_to,
+        'location': (args.get('location') or '').strip() or None,
+        'fmt': fmt,
+        'compress': str(args.get('gzip', '')).lower() in ('1', 'true', 'yes')
+    }, None
+@app.route('/api/exports/attendance', methods=['GET'])
+def export_attendance():
+    """Bordro için attendance dışa aktarımı; satırlar okunurken istemciye akar. Yalnızca yöneticiler."""
+    _, is_admin, error = report_identity(request.headers.get('Authorization'))
+    if error:
+        return jsonify(error[0]), error[1]
+    if not is_admin:
+        return jsonify(REPORT_FORBIDDEN[0]), REPORT_FORBIDDEN[1]
+    options, error = parse_export_args(request.args)
+    if error:
+        return jsonify({'success': False, 'message': error}), 400
+
+    filename = 'attendance'
+    if options['date_from'] or options['date_to']:
+        filename += f"_{options['date_from'] or ''}_{options['date_to'] or ''}"
+    filename += f".{options['fmt']}" + ('.gz' if options['compress'] else '')
+
+    return Response(
+        stream_with_context(stream_attendance_export(**options)),
+        mimetype='application/gzip' if options['compress'] else EXPORT_FORMATS[options['fmt']],
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+@app.cli.command('export-attendance')
+@click.option('--from', 'date_from', help='Başlangıç tarihi (YYYY-MM-DD)')
+@click.option('--to', 'date_to', help='Bitiş tarihi (YYYY-MM-DD)')
+@click.option('--location', help='Yalnızca bu bölge')
+@click.option('--format', 'fmt', type=click.Choice(list(EXPORT_FORMATS)), default='csv')
+@click.option('--gzip', 'compress', is_flag=True, help='Çıktıyı gzip ile sıkıştır')
+@click.option('--output', '-o', type=click.File('wb'), default='-', help='Dosya (varsayılan: stdout)')
+def export_attendance_command(date_from, date_to, location, fmt, compress, output):
+    """attendance tablosunu CSV/NDJSON olarak dışa aktar: flask --app app export-attendance -o ay.csv.gz --gzip"""
+    options, error = parse_export_args({'from': date_from, 'to': date_to, 'location': location,
+                                        'format': fmt, 'gzip': compress})
+    if error:
+        raise click.BadParameter(error)
+    for chunk in stream_attendance_export(**options):
+        output.write(chunk)
+# ==================== METRICS ====================
+@app.before_request
+def start_request_timer():
+    request.environ['prospando.started'] = time.perf_counter()
+@app.after_request
+def observe_request(response):
+    started = request.environ.get('prospando.started')
+    if started is not None:
+        # Etiket URL kuralıdır (/api/reports/<x> gibi), ham path değil: kardinalite sınırlı kalır
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, route, request.method, str(response.status_code))
+    return response
+def _pool_gauges():
+    stats = pool_stats()
+    return {(state,): stats[state] for state in ('pool_size', 'in_use', 'idle', 'waiting')}
+GaugeCallback('db_pool_connections', 'Bağlantı havuzu durumu', _pool_gauges, ('state',))
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus metin formatında worker metrikleri"""
+    return Response(render_metrics(), content_type=METRICS_CONTENT_TYPE)
 # ==================== FAVICON & HEALTH CHECK ====================
 @app.route('/favicon.ico')
 def favicon():
     """Favicon 404 hatasını önle"""
     return '', 204
+HEALTH_CHECK_INTERVAL = float(os.getenv('HEALTH_CHECK_INTERVAL', 5))
+HEALTH_CHECK_TIMEOUT = float(os.getenv('HEALTH_CHECK_TIMEOUT', 2))
+# Bekleyen istek sayısı max_waiting'in bu oranına ulaşınca worker "hazır değil" sayılır
+READY_MAX_QUEUE_RATIO = float(os.getenv('READY_MAX_QUEUE_RATIO', 0.8))
+# Probe'lar için havuz dışı tek bağlantı; kısa zaman aşımlarıyla (libpq connect_timeout en az 2 sn)
+DB_PROBE = DatabaseProbe(
+    lambda: psycopg.connect(
+        os.getenv('DATABASE_URL'), autocommit=True,
+        **dict(DB_CONNECT_KWARGS, connect_timeout=max(2, int(HEALTH_CHECK_TIMEOUT)),
+               options=f'-c statement_timeout={int(HEALTH_CHECK_TIMEOUT * 1000)}')
+    ),
+    interval=HEALTH_CHECK_INTERVAL,
+    stale_after=3 * HEALTH_CHECK_INTERVAL + HEALTH_CHECK_TIMEOUT
+)
+def pool_saturated(stats):
+    """Havuz dolu ve kuyruk max_waiting sınırına yaklaşmışsa True"""
+    waiting = stats.get('waiting', 0)
+    if not waiting or stats.get('in_use', 0) < stats.get('pool_max', POOL_MAX_SIZE):
+        return False
+    return POOL_MAX_WAITING > 0 and waiting >= POOL_MAX_WAITING * READY_MAX_QUEUE_RATIO
+def readiness(stats):
+    """Önbellekteki DB durumu + havuz doluluğu; (hazır mı, yanıt gövdesi). G/Ç yapmaz."""
+    database = DB_PROBE.snapshot()
+    saturated = pool_saturated(stats)
+    migrated = MIGRATION_STATE['ok'] is not False
+    ready = database['ok'] and migrated and not saturated
+    body = {
+        'status': 'ready' if ready else 'not_ready',
+        'database': database,
+        'migrations': dict(MIGRATION_STATE),
+        'pool': dict(stats, saturated=saturated),
+        'listener': pg_listener.connected
+    }
+    if CHECKIN_QUEUE is not None:
+        body['queue'] = CHECKIN_QUEUE.stats()
+    return ready, body
+def legacy_health(ready, body):
+    """Eski /health biçimi (healthy/busy/unhealthy) ve durum kodları"""
+    if ready:
+        return {'status': 'healthy', 'database': 'connected', 'pool': body['pool']}, 200
+    if body['migrations']['ok'] is False:
+        return {'status': 'unhealthy', 'database': 'connected' if body['database']['ok'] else 'disconnected',
+                'error': f"Migration tamamlanmadı: {body['migrations']['error']}"}, 500
+    if body['database']['ok']:
+        return {'status': 'busy', 'database': 'connected', 'pool': body['pool'], 'error': 'Bağlantı havuzu dolu'}, 503
+    return {'status': 'unhealthy', 'database': 'disconnected',
+            'error': body['database']['error'] or body['database']['state']}, 500
+@app.route('/livez', methods=['GET'])
+def livez():
+    """Süreç yanıt veriyor mu; G/Ç yok"""
+    return jsonify({'status': 'alive'}), 200
+@app.route('/readyz', methods=['GET'])
+def readyz():
+    """Trafik alınabilir mi: arka plan DB kontrolü ve havuz doluluğu; bağlantı açmaz"""
+    ready, body = readiness(pool_stats())
+    return jsonify(body), 200 if ready else 503
 @app.route('/health', methods=['GET'])
 def health():
-    try:
-        conn = get_conn()
-        cur = conn.cursor()
-        cur.execute("SELECT 1")
-        cur.close()
-        conn.close()
-        return jsonify({'status': 'healthy', 'database': 'connected'}), 200
-    except Exception as e:
-        return jsonify({'status': 'unhealthy', 'database': 'disconnected', 'error': str(e)}), 500
+    """Geriye dönük uyumlu sağlık kontrolü; /readyz ile aynı önbellekteki durumu kullanır"""
+    payload, status_code = legacy_health(*readiness(pool_stats()))
+    return jsonify(payload), status_code
+@app.route('/api/pool/stats', methods=['GET'])
+def pool_stats_route():
+    """Bağlantı havuzu istatistikleri"""
+    return jsonify(pool_stats()), 200
+# ==================== WORKER STARTUP ====================
+def start_background():
+    """
+    Worker'ın arka plan thread'lerini başlat; çalışanlar tekrar başlatılmaz.
+    Import sırasında, her istekten önce (gunicorn --preload ile fork sonrası thread'ler
+    master'da kalır) ve ASGI lifespan başlangıcında çağrılır. İlk probe isteği
+    geldiğinde DB kontrolünün bir sonucu olur ('starting' yüzünden 503 dönülmez).
+    """
+    if not os.getenv('DATABASE_URL'):
+        return
+    DB_PROBE.start()
+    start_migration_retry()
+    # Süpürücü, bölüm bakımı ve diğer periyodik işler dinleyici thread'inde çalışır; token'lı
+    # check-in'ler dinleyiciyi hiç başlatmadığı için trafiğe bırakılmaz
+    pg_listener.start()
+@app.before_request
+def start_worker_threads():
+    start_background()
+if __name__ != '__main__':
+    start_background()
 # ==================== ERROR HANDLERS ====================
 @app.errorhandler(404)
 def not_found(e):
@@ -1057,11 +1494,12 @@ def server_error(e):
     return jsonify({'success': False, 'message': 'Sunucu hatası'}), 500
 # ==================== MAIN ====================
 if __name__ == '__main__':
-    print("🚀 Uygulama başlatılıyor...")
+    log.info('Uygulama başlatılıyor')
     if init_db():
-        print("✅ Veritabanı hazır")
+        log.info('Veritabanı hazır')
     else:
-        print("⚠️ Veritabanı bağlantısında sorun olabilir")
+        log.warning('Veritabanı bağlantısında sorun olabilir')
+    start_background()
    
     port = int(os.getenv('PORT', 5000))
     debug = os.getenv('FLASK_ENV', 'production') == 'development'
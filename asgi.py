@@ -0,0 +1,354 @@
+"""
+Async (ASGI) giriş noktası: /api/login, /api/signup, /api/checkin, /health.
+
+Flask uygulamasıyla aynı doğrulama, SQL ve JSON yanıtlarını kullanır (app.py'deki
+validate_* / *_result fonksiyonları); farkı, Postgres beklerken bir OS thread'i
+tutmaması. Bağlantılar psycopg AsyncConnectionPool'dan gelir, ayarlar sync
+havuzla aynıdır (DB_POOL_*).
+
+Çalıştırma:
+    uvicorn asgi:app --host 0.0.0.0 --port $PORT --workers 4
+"""
+import asyncio
+import json
+import os
+import time
+from contextlib import asynccontextmanager
+
+import psycopg
+from psycopg_pool import AsyncConnectionPool, PoolTimeout, TooManyRequests
+
+import app as flask_app
+from metrics import (
+    DB_ACQUIRE_SECONDS, HTTP_REQUEST_SECONDS, CONTENT_TYPE as METRICS_CONTENT_TYPE,
+    TimedAsyncConnection, TimedAsyncCursor, render as render_metrics
+)
+from passwords import HashingBusy, hash_password, verify_password
+from ratelimit import client_address
+
+_pool = None
+_pool_lock = asyncio.Lock()
+
+
+async def get_pool():
+    """Süreç başına async havuz (lifespan desteklenmiyorsa ilk istekte açılır)"""
+    global _pool
+    if _pool is None:
+        async with _pool_lock:
+            if _pool is None:
+                conn_string = os.getenv('DATABASE_URL')
+                if not conn_string:
+                    raise Exception("DATABASE_URL ortam değişkeni tanımlı değil!")
+                pool = AsyncConnectionPool(
+                    conn_string,
+                    min_size=flask_app.POOL_MIN_SIZE,
+                    max_size=flask_app.POOL_MAX_SIZE,
+                    max_idle=flask_app.POOL_MAX_IDLE,
+                    max_waiting=flask_app.POOL_MAX_WAITING,
+                    timeout=flask_app.POOL_TIMEOUT,
+                    check=AsyncConnectionPool.check_connection,
+                    connection_class=TimedAsyncConnection,
+                    kwargs=dict(flask_app.DB_CONNECT_KWARGS, cursor_factory=TimedAsyncCursor),
+                    name=f'prospando-async-{os.getpid()}',
+                    open=False
+                )
+                await pool.open()
+                _pool = pool
+    return _pool
+
+
+async def close_pool():
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+
+
+@asynccontextmanager
+async def get_conn():
+    """Havuzdan bağlantı al (alma süresi db_connection_acquire_seconds'a yazılır)"""
+    pool = await get_pool()
+    started = time.perf_counter()
+    try:
+        async with pool.connection() as conn:
+            DB_ACQUIRE_SECONDS.observe(time.perf_counter() - started)
+            yield conn
+    except (PoolTimeout, TooManyRequests) as e:
+        flask_app.log_error('pool', e)
+        raise
+
+
+# ==================== HANDLERS ====================
+async def signup(data, headers, client):
+    try:
+        fields, error = flask_app.validate_signup(data)
+        if error:
+            return error
+        name, email, password = fields
+
+        # Sınırlayıcı Redis'te olabilir (bloklayan soket); olay döngüsü beklemesin
+        retry_after = await asyncio.to_thread(flask_app.SIGNUP_LIMITER.check, client, email)
+        if retry_after:
+            return flask_app.rate_limited(retry_after)
+
+        hashed_password = await asyncio.to_thread(hash_password, password)
+
+        async with get_conn() as conn:
+            cur = await conn.execute(flask_app.SIGNUP_EMPLOYEE_SQL, (name,))
+            emp_id = (await cur.fetchone())[0]
+            cur = await conn.execute(flask_app.SIGNUP_USER_SQL, (email, hashed_password, name))
+            user = await cur.fetchone()
+            if user:
+                await conn.commit()
+            else:
+                await conn.rollback()
+
+        if user:
+            flask_app.EMPLOYEES.forget(emp_id)
+
+        return flask_app.signup_result(user[0] if user else None, name, emp_id)
+
+    except (PoolTimeout, TooManyRequests, HashingBusy):
+        return flask_app.SERVER_BUSY
+    except Exception as e:
+        flask_app.log_error('signup', e)
+        return {'success': False, 'message': 'Kayıt sırasında bir hata oluştu.'}, 500
+
+
+async def login(data, headers, client):
+    try:
+        fields, error = flask_app.validate_login(data)
+        if error:
+            return error
+        email, password = fields
+
+        retry_after = await asyncio.to_thread(flask_app.LOGIN_LIMITER.check, client, email)
+        if retry_after:
+            return flask_app.rate_limited(retry_after)
+
+        async with get_conn() as conn:
+            cur = await conn.execute(flask_app.LOGIN_SQL, (email,))
+            user = await cur.fetchone()
+
+        if not user:
+            return flask_app.LOGIN_FAILED
+
+        user_id, name, hashed_password, emp_id = user
+        valid, new_hash = await asyncio.to_thread(verify_password, password, hashed_password)
+        if not valid:
+            return flask_app.LOGIN_FAILED
+
+        if new_hash:
+            async with get_conn() as conn:
+                await conn.execute(flask_app.REHASH_SQL, (new_hash, user_id, hashed_password))
+                await conn.commit()
+
+        return flask_app.login_result(user_id, name, emp_id)
+
+    except (PoolTimeout, TooManyRequests, HashingBusy):
+        return flask_app.SERVER_BUSY
+    except Exception as e:
+        flask_app.log_error('login', e)
+        return {'success': False, 'message': f'Hata: {str(e)}'}, 500
+
+
+async def check_in(data, headers, client):
+    try:
+        claims, error = flask_app.check_in_identity(headers.get('authorization'))
+        if error:
+            return error
+        fields, error = flask_app.validate_check_in(data, claims['employee_id'] if claims else None)
+        if error:
+            return error
+        emp_id, location = fields
+        token_name = claims['name'] if claims else None
+
+        if token_name is None and flask_app.known_missing(emp_id):
+            return flask_app.check_in_result('not_found', emp_id, None, location, None, None, None)
+
+        cache_key = flask_app.check_in_cache_key(emp_id, location, headers.get('idempotency-key'))
+        cached = await asyncio.to_thread(flask_app.claim_check_in, cache_key)
+        if cached is not None:
+            return cached
+
+        now = flask_app.site_now()
+        now_time = now.strftime("%H:%M")
+
+        if flask_app.CHECKIN_QUEUE is not None:
+            queued = await asyncio.to_thread(
+                flask_app.queue_check_in, emp_id, location, now, token_name, headers.get('idempotency-key')
+            )
+            if queued is not None:
+                await asyncio.to_thread(flask_app.remember_check_in, cache_key, *queued)
+                return queued
+
+        try:
+            async with get_conn() as conn:
+                await conn.set_autocommit(True)
+                try:
+                    cur = await conn.execute(
+                        flask_app.CHECK_IN_SQL, (emp_id, location, now, flask_app.SITE_TIMEZONE, token_name)
+                    )
+                    status, emp_name, session_location, session_start, minutes = await cur.fetchone()
+                except psycopg.errors.ForeignKeyViolation:
+                    status, emp_name, session_location, session_start, minutes = 'not_found', None, None, None, None
+                finally:
+                    await conn.set_autocommit(False)
+        except Exception:
+            await asyncio.to_thread(flask_app.remember_check_in, cache_key, None, None)
+            raise
+
+        flask_app.note_check_in(status, emp_id, location, emp_name, now.time())
+        payload, status_code = flask_app.check_in_result(
+            status, emp_id, emp_name, location, session_location, now_time, minutes
+        )
+        # Önbellek Redis olabilir (bloklayan soket); olay döngüsü beklemesin
+        await asyncio.to_thread(flask_app.remember_check_in, cache_key, payload, status_code)
+        return payload, status_code
+
+    except (PoolTimeout, TooManyRequests):
+        return flask_app.SERVER_BUSY
+    except Exception as e:
+        flask_app.log_error('checkin', e)
+        return {
+            'success': False,
+            'message': '❌ Sunucu Hatası!\nLütfen tekrar deneyin.',
+            'type': 'error'
+        }, 500
+
+
+def pool_stats():
+    """Async havuzun durumu, app.pool_stats() ile aynı anahtarlarla"""
+    if _pool is None:
+        return {'pool_size': 0, 'in_use': 0, 'idle': 0, 'waiting': 0}
+    stats = _pool.get_stats()
+    return {
+        'pool_min': stats.get('pool_min', flask_app.POOL_MIN_SIZE),
+        'pool_max': stats.get('pool_max', flask_app.POOL_MAX_SIZE),
+        'pool_size': stats.get('pool_size', 0),
+        'in_use': stats.get('pool_size', 0) - stats.get('pool_available', 0),
+        'idle': stats.get('pool_available', 0),
+        'waiting': stats.get('requests_waiting', 0),
+        'max_waiting': flask_app.POOL_MAX_WAITING
+    }
+
+
+async def livez(data, headers, client):
+    return {'status': 'alive'}, 200
+
+
+async def readyz(data, headers, client):
+    ready, body = flask_app.readiness(pool_stats())
+    return body, 200 if ready else 503
+
+
+async def health(data, headers, client):
+    return flask_app.legacy_health(*flask_app.readiness(pool_stats()))
+
+
+ROUTES = {
+    ('POST', '/api/signup'): signup,
+    ('POST', '/api/login'): login,
+    ('POST', '/api/checkin'): check_in,
+    ('GET', '/health'): health,
+    ('GET', '/livez'): livez,
+    ('GET', '/readyz'): readyz,
+}
+
+
+# ==================== ASGI ====================
+def _json_body(payload):
+    # Flask jsonify ile birebir aynı çıktı: sıralı anahtarlar, ASCII, kompakt, sonda satır sonu
+    return (json.dumps(payload, sort_keys=True, ensure_ascii=True, separators=(',', ':')) + '\n').encode('utf-8')
+
+
+async def _send(send, status, body=b'', content_type=b'application/json', extra_headers=()):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [
+            (b'content-type', content_type),
+            (b'content-length', str(len(body)).encode()),
+            (b'access-control-allow-origin', b'*'),
+            *extra_headers
+        ]
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def _read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body'):
+            return b''.join(chunks)
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            try:
+                # DB kontrolü ve periyodik işler trafik beklemeden başlar
+                flask_app.start_background()
+                if os.getenv('DATABASE_URL'):
+                    await get_pool()
+                    if flask_app.CHECKIN_QUEUE is not None:
+                        # Yeniden başlatmadan önce kuyrukta kalanlar hemen yazılmaya başlar
+                        flask_app.CHECKIN_QUEUE.start()
+                await send({'type': 'lifespan.startup.complete'})
+            except Exception as e:
+                await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+        elif message['type'] == 'lifespan.shutdown':
+            await close_pool()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await _lifespan(receive, send)
+    if scope['type'] != 'http':
+        return
+
+    method, path = scope['method'], scope['path']
+    if method == 'OPTIONS':
+        # CORS ön kontrolü (Flask tarafında flask_cors yapıyor)
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'access-control-allow-origin', b'*'),
+                (b'access-control-allow-methods', b'GET, POST, OPTIONS'),
+                (b'access-control-allow-headers', b'Content-Type, Authorization, Idempotency-Key'),
+                (b'content-length', b'0'),
+            ]
+        })
+        await send({'type': 'http.response.body', 'body': b''})
+        return
+
+    if method == 'GET' and path == '/metrics':
+        await _send(send, 200, render_metrics().encode('utf-8'), METRICS_CONTENT_TYPE.encode())
+        return
+
+    handler = ROUTES.get((method, path))
+    if handler is None:
+        await _send(send, 404, _json_body({'success': False, 'message': 'Sayfa bulunamadı'}))
+        return
+
+    started = time.perf_counter()
+    body = await _read_body(receive)
+    try:
+        data = json.loads(body) if body else None
+    except ValueError:
+        data = None
+    if not isinstance(data, dict):
+        # Flask'taki gibi: bozuk/boş gövde handler'ın genel hata dalına düşer
+        data = None
+    headers = {name.decode('latin-1').lower(): value.decode('latin-1') for name, value in scope['headers']}
+    client = client_address(scope['client'][0] if scope.get('client') else None, headers.get('x-forwarded-for'))
+    payload, status = await handler(data, headers, client)
+    extra_headers = [(b'retry-after', str(payload['retry_after']).encode())] if status == 429 else ()
+    await _send(send, status, _json_body(payload), extra_headers=extra_headers)
+    HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, path, method, str(status))
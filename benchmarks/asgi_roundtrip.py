@@ -0,0 +1,92 @@
+"""
+ASGI giriş noktasının (asgi.py) veritabanına giden uçlarını gerçek isteklerle sınar.
+
+Uygulama süreç içinde, sunucusuz çağrılır (http scope): signup →
+login → check-in (giriş) → check-in (çıkış) → /readyz. Her adımın beklenen
+durum kodu kontrol edilir; bağlantı yolu bozulursa (ör. get_conn hatası)
+istekler 500 döner ve betik sıfırdan farklı kodla çıkar.
+
+Kullanım (test veritabanına karşı; oluşturulan kayıtlar sonunda silinir):
+    DATABASE_URL=postgresql://... python benchmarks/asgi_roundtrip.py
+"""
+import asyncio
+import json
+import os
+import sys
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import asgi  # noqa: E402
+import app as app_module  # noqa: E402
+
+
+async def call(method, path, body=None, headers=()):
+    """Tek bir HTTP isteğini ASGI uygulamasına ver; (durum, JSON gövde) döner"""
+    payload = json.dumps(body).encode('utf-8') if body is not None else b''
+    scope = {
+        'type': 'http', 'method': method, 'path': path, 'query_string': b'',
+        'headers': [(b'content-type', b'application/json'),
+                    *((name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers)],
+        'client': ('127.0.0.1', 50000),
+    }
+    sent = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': payload, 'more_body': False}
+
+    async def send(message):
+        sent.append(message)
+
+    await asgi.app(scope, receive, send)
+    status = sent[0]['status']
+    data = b''.join(message.get('body', b'') for message in sent[1:])
+    return status, json.loads(data) if data else None
+
+
+async def run(tag):
+    email, name = f'asgi-{tag}@example.com', f'asgi-{tag}'
+    steps = []
+
+    def check(label, result, expected):
+        status, body = result
+        ok = status == expected
+        steps.append(ok)
+        print(f"{'OK ' if ok else 'HATA'} {label:<24} {status} (beklenen {expected})"
+              + ('' if ok else f"  {body}"))
+        return body or {}
+
+    signup = check('signup', await call('POST', '/api/signup',
+                                        {'name': name, 'email': email, 'password': 'secret123'}), 201)
+    login = check('login', await call('POST', '/api/login', {'email': email, 'password': 'secret123'}), 200)
+    token = login.get('token') or signup.get('token')
+    emp_id = signup.get('employee_id')
+    for label, marker in (('check-in (giriş)', 'Giriş'), ('check-in (çıkış)', 'Çıkış')):
+        # Ayrı Idempotency-Key: ikinci dokunuş çift dokunma önbelleğine takılmasın
+        headers = [('Authorization', f'Bearer {token}'), ('Idempotency-Key', f'asgi-{tag}-{marker}')]
+        body = check(label, await call('POST', '/api/checkin', {'id': emp_id, 'location': 'Mitte'}, headers), 200)
+        if marker not in body.get('message', ''):
+            steps.append(False)
+            print(f"HATA {label:<24} beklenmeyen yanıt: {body.get('message')!r}")
+    check('readyz', await call('GET', '/readyz'), 200)
+    await asgi.close_pool()
+    return all(steps)
+
+
+def main():
+    if not os.getenv('DATABASE_URL'):
+        raise SystemExit('DATABASE_URL tanımlı değil')
+    tag = uuid.uuid4().hex[:8]
+    try:
+        ok = asyncio.run(run(tag))
+    finally:
+        with app_module.get_conn() as conn:
+            conn.execute("DELETE FROM attendance WHERE employee_name = %s", (f'asgi-{tag}',))
+            conn.execute("DELETE FROM users WHERE email = %s", (f'asgi-{tag}@example.com',))
+            conn.execute("DELETE FROM employees WHERE name = %s", (f'asgi-{tag}',))
+            conn.commit()
+    print("✅ ASGI uçları çalışıyor" if ok else "❌ ASGI uçlarında hata")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+Çıkış başına süre hesabı: eski metin yolu vs. tam sayı dakika.
+
+Eski yol: "%H:%M" metinleri iki kez strptime ile okunup "7h 30m" metni
+üretiliyordu (calculate_duration), rapor için de bu metin tekrar parse
+ediliyordu. Yeni yol: session_minutes() gerçek zaman damgalarından dakika,
+format_duration() yalnızca yanıtta. Gece yarısını geçen oturumlar dahil
+rastgele oturumlarla ölçülür; iki yolun sonuçları karşılaştırılır.
+Veritabanı gerekmez.
+
+Kullanım:
+    python benchmarks/bench_duration.py --sessions 200000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app import format_duration, session_minutes  # noqa: E402
+
+
+def legacy_calculate_duration(start_str, end_str):
+    """Kaldırılan calculate_duration() (karşılaştırma için birebir kopya)"""
+    try:
+        start = datetime.strptime(start_str, "%H:%M")
+        end = datetime.strptime(end_str, "%H:%M")
+        if end < start:
+            end += timedelta(days=1)
+        total_minutes = int((end - start).total_seconds() / 60)
+        hours = total_minutes // 60
+        minutes = total_minutes % 60
+        return f"{hours}h {minutes}m"
+    except:  # noqa: E722
+        return "Hesaplanamadı"
+
+
+def legacy_minutes(text):
+    """Rapor tarafında metinden dakikaya dönüş"""
+    hours, minutes = text.split()
+    return int(hours[:-1]) * 60 + int(minutes[:-1])
+
+
+def sessions(count, rng):
+    """(gün, giriş saati, çıkış anı); geç açılanların bir kısmı gece yarısını geçer"""
+    result = []
+    for _ in range(count):
+        day = date(2026, 1, 1) + timedelta(days=rng.randrange(365))
+        opened = datetime.combine(day, datetime.min.time()) + timedelta(minutes=rng.randrange(6 * 60, 23 * 60))
+        closed = opened + timedelta(minutes=rng.randrange(1, 12 * 60))
+        result.append((day, opened.time(), closed))
+    return result
+
+
+def timed(label, count, fn):
+    started = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<44} {elapsed * 1000:>9.1f} ms  {elapsed / count * 1e9:>8.0f} ns/oturum")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sessions', type=int, default=200000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    data = sessions(args.sessions, random.Random(args.seed))
+    as_text = [(start.strftime("%H:%M"), end.strftime("%H:%M")) for _, start, end in data]
+    n = len(data)
+
+    legacy = timed('eski: calculate_duration (2x strptime)', n,
+                   lambda: [legacy_calculate_duration(start, end) for start, end in as_text])
+    minutes = timed('yeni: session_minutes', n,
+                    lambda: [session_minutes(day, start, end) for day, start, end in data])
+    timed('yeni: session_minutes + format_duration', n,
+          lambda: [format_duration(session_minutes(day, start, end)) for day, start, end in data])
+
+    legacy_total = timed('rapor, eski: metinleri parse edip topla', n, lambda: sum(map(legacy_minutes, legacy)))
+    total = timed('rapor, yeni: dakikaları topla', n, lambda: sum(minutes))
+
+    crossing = sum(1 for day, _, end in data if end.date() != day)
+    mismatches = sum(1 for old, new in zip(legacy, minutes) if old != format_duration(new))
+    print(f"gece yarısını geçen: {crossing}, farklı sonuç: {mismatches}, "
+          f"toplam dakika eşit: {'evet' if legacy_total == total else 'hayır'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""
+Personel önbelleğinin check-in başına sorgu sayısına etkisi.
+
+Aynı kiosk trafiği önbellek kapalı ve açık iki kez çalıştırılır; SQL ifadesi
+sayıları /metrics'teki db_query_duration_seconds sayaçlarından okunur.
+Trafik: tek tek check-in'ler (bir kısmı yanlış yazılmış, olmayan id'ler) ve
+aynı personelin tekrar tekrar göründüğü /api/checkin/batch gönderimleri.
+
+Kullanım (test veritabanına karşı; oluşturulan kayıtlar sonunda silinir):
+    DATABASE_URL=postgresql://... python benchmarks/bench_employee_cache.py --employees 50 --checkins 2000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+# Çift dokunma koruması sorguları gizlemesin
+os.environ.setdefault('CHECKIN_DEBOUNCE_SECONDS', '0')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import app as app_module  # noqa: E402
+from metrics import DB_QUERY_SECONDS  # noqa: E402
+
+LOCATION = 'Mitte'
+
+
+def query_counts():
+    """SQL ifadesi etiketi → şimdiye kadarki çalışma sayısı"""
+    return {labels.split('"')[1]: value for name, labels, value in DB_QUERY_SECONDS.samples()
+            if name.endswith('_count')}
+
+
+def run(client, emp_ids, args, tag, rng):
+    before = query_counts()
+    started = time.perf_counter()
+    missing_base = max(emp_ids) + 1_000_000
+
+    for _ in range(args.checkins):
+        emp_id = missing_base + rng.randrange(20) if rng.random() < args.typo_rate else rng.choice(emp_ids)
+        client.post('/api/checkin', json={'id': emp_id, 'location': LOCATION})
+
+    at = datetime(2000, 1, 1, 8, 0)
+    for batch in range(args.batches):
+        events = []
+        for i in range(args.batch_size):
+            at += timedelta(minutes=1)
+            events.append({'idempotency_key': f'bench-{tag}-{batch}-{i}', 'employee_id': rng.choice(emp_ids),
+                           'location': LOCATION, 'timestamp': at.isoformat()})
+        client.post('/api/checkin/batch', json={'events': events})
+
+    elapsed = time.perf_counter() - started
+    after = query_counts()
+    return elapsed, {label: after.get(label, 0) - before.get(label, 0) for label in after
+                     if after.get(label, 0) != before.get(label, 0)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--employees', type=int, default=50)
+    parser.add_argument('--checkins', type=int, default=2000)
+    parser.add_argument('--typo-rate', type=float, default=0.1, help='olmayan id ile yapılan check-in oranı')
+    parser.add_argument('--batches', type=int, default=50)
+    parser.add_argument('--batch-size', type=int, default=20)
+    args = parser.parse_args()
+
+    tag = uuid.uuid4().hex[:8]
+    with app_module.get_conn() as conn:
+        emp_ids = [row[0] for row in conn.execute(
+            "INSERT INTO employees (name) SELECT 'bench-' || %s || '-' || i FROM generate_series(1, %s) AS i RETURNING id",
+            (tag, args.employees)
+        )]
+        conn.commit()
+
+    # Olmayan id kaydına yalnızca geçersiz kılma bildirimleri gelirken güvenilir
+    app_module.ensure_listener()
+    deadline = time.monotonic() + 10
+    while not app_module.pg_listener.connected and time.monotonic() < deadline:
+        time.sleep(0.1)
+
+    client = app_module.app.test_client()
+    directory = app_module.EMPLOYEES
+    total_requests = args.checkins + args.batches
+    try:
+        results = {}
+        for label, ttl in (('önbellek kapalı', 0), ('önbellek açık', directory.ttl or 300)):
+            directory.ttl = ttl
+            directory.clear()
+            results[label] = run(client, emp_ids, args, f'{tag}-{ttl}', random.Random(42))
+
+        for label, (elapsed, counts) in results.items():
+            total = sum(counts.values())
+            print(f"{label}: {total_requests} istek, {elapsed:.2f} s, {total} sorgu "
+                  f"({total / total_requests:.2f} sorgu/istek)")
+            for statement, count in sorted(counts.items(), key=lambda item: -item[1]):
+                print(f"   {statement:<40} {count}")
+        print(f"canlı bildirim: {'evet' if app_module.pg_listener.connected else 'hayır (olmayan id kaydı kullanılmadı)'}")
+    finally:
+        with app_module.get_conn() as conn:
+            conn.execute("DELETE FROM checkin_events WHERE idempotency_key LIKE %s", (f'bench-{tag}-%',))
+            conn.execute("DELETE FROM attendance WHERE employee_id = ANY(%s)", (emp_ids,))
+            conn.execute("DELETE FROM employees WHERE id = ANY(%s)", (emp_ids,))
+            conn.commit()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""
+Açık oturum aramasının tablo boyutuna göre gecikmesi: eski şema vs. yeni şema.
+
+Eski şema: date/start_time/end_time TEXT, indeks yok.
+Yeni şema: DATE/TIME kolonlar + attendance_open_session_idx / attendance_one_open_session_uidx.
+
+Kullanım (boş bir test veritabanına karşı çalıştırın, gerçek tablolara dokunmaz):
+    DATABASE_URL=postgresql://... python benchmarks/bench_open_session.py --sizes 10000 100000 1000000
+"""
+import argparse
+import os
+import random
+import statistics
+import time
+from datetime import date
+
+import psycopg
+
+SCHEMA = 'bench_open_session'
+LOCATIONS = ['Mitte', 'Spandau', 'Steglitz', 'Neukölln', 'Charlottenburg']
+
+
+def seed(cur, rows, employees, typed):
+    """Tabloyu oluştur ve geçmiş kayıtlarla doldur (hepsi kapalı, bugün birkaç açık oturum)"""
+    cur.execute(f"DROP TABLE IF EXISTS {SCHEMA}.attendance")
+    if typed:
+        cur.execute(f"""
+            CREATE TABLE {SCHEMA}.attendance (
+                id BIGSERIAL PRIMARY KEY, employee_id INTEGER, employee_name TEXT,
+                date DATE, start_time TIME, end_time TIME, location TEXT, duration TEXT
+            )
+        """)
+        day, start, end = "CURRENT_DATE - mod(g, 365)", "'08:00'::TIME", "'16:00'::TIME"
+    else:
+        cur.execute(f"""
+            CREATE TABLE {SCHEMA}.attendance (
+                id BIGSERIAL PRIMARY KEY, employee_id INTEGER, employee_name TEXT,
+                date TEXT, start_time TEXT, end_time TEXT, location TEXT, duration TEXT
+            )
+        """)
+        day, start, end = "to_char(CURRENT_DATE - mod(g, 365), 'YYYY-MM-DD')", "'08:00'", "'16:00'"
+
+    cur.execute(f"""
+        INSERT INTO {SCHEMA}.attendance (employee_id, employee_name, date, start_time, end_time, location, duration)
+        SELECT mod(g, %s), 'emp ' || mod(g, %s), {day}, {start}, {end},
+               (ARRAY{LOCATIONS!r})[1 + mod(g, 5)], '8h 0m'
+        FROM generate_series(1, %s) g
+    """, (employees, employees, rows))
+
+    # Bugün vardiyada olan personelin onda biri için açık oturum
+    cur.execute(f"""
+        INSERT INTO {SCHEMA}.attendance (employee_id, employee_name, date, start_time, location)
+        SELECT g, 'emp ' || g, {day.replace('mod(g, 365)', '0')}, {start}, (ARRAY{LOCATIONS!r})[1 + mod(g, 5)]
+        FROM generate_series(0, %s - 1, 10) g
+    """, (employees,))
+
+    if typed:
+        cur.execute(f"""
+            CREATE INDEX attendance_open_session_idx ON {SCHEMA}.attendance (employee_id, date, location)
+            WHERE end_time IS NULL
+        """)
+        cur.execute(f"""
+            CREATE UNIQUE INDEX attendance_one_open_session_uidx ON {SCHEMA}.attendance (employee_id, date)
+            WHERE end_time IS NULL
+        """)
+    cur.execute(f"ANALYZE {SCHEMA}.attendance")
+
+
+def measure(cur, employees, typed, iterations):
+    """check_in() içindeki açık oturum sorgusunu rastgele personel/bölge ile ölç"""
+    today = date.today() if typed else date.today().strftime('%Y-%m-%d')
+    samples = []
+    for _ in range(iterations):
+        emp_id = random.randrange(employees)
+        location = random.choice(LOCATIONS)
+        started = time.perf_counter()
+        cur.execute(f"""
+            SELECT id, location, start_time FROM {SCHEMA}.attendance
+            WHERE employee_id = %s AND date = %s AND end_time IS NULL
+            ORDER BY (location = %s) DESC, id
+            LIMIT 1
+        """, (emp_id, today, location))
+        cur.fetchall()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--employees', type=int, default=2000)
+    parser.add_argument('--iterations', type=int, default=500)
+    args = parser.parse_args()
+
+    with psycopg.connect(os.environ['DATABASE_URL'], autocommit=True) as conn:
+        cur = conn.cursor()
+        cur.execute(f"CREATE SCHEMA IF NOT EXISTS {SCHEMA}")
+        print(f"{'rows':>10} | {'before p50':>10} | {'before p95':>10} | {'after p50':>10} | {'after p95':>10}  (ms)")
+        try:
+            for rows in args.sizes:
+                results = []
+                for typed in (False, True):
+                    seed(cur, rows, args.employees, typed)
+                    results.extend(measure(cur, args.employees, typed, args.iterations))
+                print(f"{rows:>10} | " + " | ".join(f"{value:>10.3f}" for value in results))
+        finally:
+            cur.execute(f"DROP SCHEMA {SCHEMA} CASCADE")
+
+
+if __name__ == '__main__':
+    main()
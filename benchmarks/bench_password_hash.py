@@ -0,0 +1,78 @@
+"""
+Maliyet ayarına göre worker başına giriş (şifre doğrulama) kapasitesi.
+
+Her scrypt N değeri için tek doğrulama süresi ve bir worker'ın, aynı anda
+--clients istek thread'i varken, PASSWORD_HASH_WORKERS'lık havuzla saniyede
+kaç doğrulama yapabildiği ölçülür. Veritabanı gerekmez.
+
+Kullanım:
+    python benchmarks/bench_password_hash.py --costs 13 14 15 16 --workers 2 --clients 8
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import passwords  # noqa: E402
+
+
+def run(log2_n, workers, clients, duration):
+    hasher = passwords.ScryptHasher(n=2 ** log2_n)
+    encoded = hasher.hash('secret123')
+    executor = ThreadPoolExecutor(max_workers=workers)
+
+    single = []
+    for _ in range(5):
+        started = time.perf_counter()
+        hasher.verify('secret123', encoded)
+        single.append((time.perf_counter() - started) * 1000)
+
+    def client(_):
+        # Bir istek thread'i: doğrulamayı havuza verip sonucu bekler (passwords._offload gibi)
+        count, latencies = 0, []
+        deadline = time.perf_counter() + duration
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            executor.submit(hasher.verify, 'secret123', encoded).result()
+            latencies.append((time.perf_counter() - started) * 1000)
+            count += 1
+        return count, latencies
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        results = list(pool.map(client, range(clients)))
+    elapsed = time.perf_counter() - started
+    executor.shutdown()
+
+    total = sum(count for count, _ in results)
+    latencies = sorted(lat for _, lats in results for lat in lats)
+    p95 = latencies[int(len(latencies) * 0.95) - 1] if latencies else 0.0
+    return statistics.median(single), total / elapsed, p95
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--costs', type=int, nargs='+', default=[13, 14, 15, 16], help='log2(N)')
+    parser.add_argument('--workers', type=int, default=passwords.PASSWORD_HASH_WORKERS)
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=3.0)
+    args = parser.parse_args()
+
+    print(f"hash havuzu: {args.workers} thread, eşzamanlı istek: {args.clients}")
+    print(f"{'N':>8} | {'tek (ms)':>9} | {'giriş/s':>8} | {'p95 (ms)':>9}")
+    for log2_n in args.costs:
+        single_ms, per_second, p95 = run(log2_n, args.workers, args.clients, args.duration)
+        print(f"{2 ** log2_n:>8} | {single_ms:>9.1f} | {per_second:>8.1f} | {p95:>9.1f}")
+
+    legacy = passwords.LegacySha256Hasher()
+    started = time.perf_counter()
+    for _ in range(10000):
+        legacy.verify('secret123', legacy.hash('secret123'))
+    print(f"(eski SHA-256: {10000 / (time.perf_counter() - started):.0f} doğrulama/s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""
+Migration'ların eksik alanlı eski (legacy) satırlarla uygulanabildiğini doğrular.
+
+Boş bir şemada migration'lar 0010'a kadar uygulanır, ardından eski verilerde
+görülen satırlar eklenir: bölgesi NULL kapanmış oturum, tarihi NULL kapanmış
+oturum ve normal bir oturum. Sonra kalan tüm migration'lar uygulanır ve
+beklenenler kontrol edilir: tüm sürümler kaydedildi, günlük özet yalnızca
+eksiksiz satırları sayıyor, eksik alanlı satırlar güncellenip silinebiliyor,
+eski bölüm (attendance_legacy) bu ayın sonunda bitiyor. Düzeltme migration'ı
+(0018, "before 0011") 0011'den önce çalışmazsa ilk kontrol başarısız olur.
+
+Gerçek tablolara dokunmaz: her şey search_path ile geçici bir şemada kurulur
+ve sonunda silinir.
+    DATABASE_URL=postgresql://... python benchmarks/check_migrations.py
+"""
+import os
+import shutil
+import sys
+import tempfile
+import uuid
+from datetime import date
+
+import psycopg
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from migrate import MIGRATIONS_DIR, load_migrations, run_migrations  # noqa: E402
+
+SEED_BEFORE = 11  # bu sürümden önceki migration'lar uygulandıktan sonra eski satırlar eklenir
+
+
+def seed_legacy(conn):
+    """0010 şemasına eski verilerde görülen eksik alanlı satırları ekle; personel id'si döner"""
+    emp_id = conn.execute("INSERT INTO employees (name) VALUES ('legacy-check') RETURNING id").fetchone()[0]
+    conn.execute("""
+        INSERT INTO attendance (employee_id, employee_name, date, start_time, end_time, location,
+                                duration, duration_minutes, created_at)
+        VALUES (%(emp)s, 'legacy-check', DATE '2026-01-05', '08:00', '16:00', 'Mitte', '8h 0m', 480,
+                TIMESTAMP '2026-01-05 16:00'),
+               (%(emp)s, 'legacy-check', DATE '2026-01-05', '17:00', '18:00', NULL, '1h 0m', 60,
+                TIMESTAMP '2026-01-05 18:00'),
+               (%(emp)s, 'legacy-check', NULL, '08:00', '12:00', 'Spandau', '4h 0m', 240,
+                TIMESTAMP '2026-01-06 12:00')
+    """, {'emp': emp_id})
+    return emp_id
+
+
+def main():
+    conn_string = os.environ['DATABASE_URL']
+    schema = f'migration_check_{uuid.uuid4().hex[:8]}'
+    options = f'-c search_path={schema}'
+    early = tempfile.mkdtemp()
+    failures = []
+
+    def check(label, ok, detail=''):
+        print(f"{'OK ' if ok else 'HATA'} {label}" + ('' if ok else f"  {detail}"))
+        if not ok:
+            failures.append(label)
+
+    with psycopg.connect(conn_string, autocommit=True) as admin:
+        admin.execute(f'CREATE SCHEMA {schema}')
+        try:
+            for migration in load_migrations(MIGRATIONS_DIR):
+                if migration.version < SEED_BEFORE:
+                    shutil.copy(migration.path, early)
+            run_migrations(conn_string, directory=early, options=options)
+
+            with psycopg.connect(conn_string, options=options) as conn:
+                emp_id = seed_legacy(conn)
+                conn.commit()
+
+            try:
+                run_migrations(conn_string, options=options)
+                check('eski satırlarla tüm migration\'lar uygulanır', True)
+            except Exception as e:
+                check('eski satırlarla tüm migration\'lar uygulanır', False, f'{type(e).__name__}: {e}')
+
+            with psycopg.connect(conn_string, options=options) as conn:
+                versions = {version for version, in conn.execute("SELECT version FROM schema_migrations")}
+                expected = {migration.version for migration in load_migrations(MIGRATIONS_DIR)}
+                check('tüm sürümler kaydedildi', versions == expected, sorted(expected - versions))
+
+                rollup = conn.execute("""
+                    SELECT location, day, total_minutes, session_count FROM daily_attendance_rollup
+                    WHERE employee_id = %s ORDER BY day, location
+                """, (emp_id,)).fetchall()
+                check('özet yalnızca bölgesi olan satırı sayar',
+                      ('Mitte', date(2026, 1, 5), 480, 1) in rollup, rollup)
+                # 0016: tarihi NULL satır oluşturulma gününü alır ve özete o günle girer
+                backfilled = conn.execute(
+                    "SELECT date, tableoid::regclass::TEXT FROM attendance WHERE employee_id = %s AND location = 'Spandau'",
+                    (emp_id,)
+                ).fetchone()
+                check('tarihi NULL satır oluşturulma gününü alır', backfilled and backfilled[0] == date(2026, 1, 6),
+                      backfilled)
+                check('tarihi NULL satır özete yeni günüyle girer',
+                      ('Spandau', date(2026, 1, 6), 240, 1) in rollup, rollup)
+                relkind = conn.execute("SELECT relkind FROM pg_class WHERE oid = 'attendance'::regclass").fetchone()[0]
+                check('attendance bölümlü tablo', relkind == 'p', relkind)
+                # 0019: eski bölüm bu ayla (ayın son günüyse ertesi ayla) biter, sonraki aylar aylık bölümlerde
+                bound, expected_bound = conn.execute("""
+                    SELECT pg_get_expr(c.relpartbound, c.oid),
+                           (date_trunc('month', current_date + 1) + INTERVAL '1 month')::DATE
+                    FROM pg_class c WHERE c.oid = 'attendance_legacy'::regclass
+                """).fetchone()
+                check('eski bölüm bu ayın sonunda biter', f"TO ('{expected_bound}')" in bound, bound)
+                next_partition = conn.execute(
+                    "SELECT to_regclass(%s) IS NOT NULL", (f'attendance_{expected_bound:%Y_%m}',)
+                ).fetchone()[0]
+                check('eski bölümden sonraki ayın bölümü açıldı', next_partition)
+
+                # Süpürücü/elle düzeltme yolları: eksik alanlı satır güncellenip silinebilmeli
+                conn.execute("UPDATE attendance SET duration_minutes = 61 WHERE employee_id = %s AND location IS NULL",
+                             (emp_id,))
+                conn.execute("DELETE FROM attendance WHERE employee_id = %s AND location IS NULL", (emp_id,))
+                conn.commit()
+                check('bölgesi NULL satır güncellenir ve silinir', True)
+        finally:
+            admin.execute(f'DROP SCHEMA {schema} CASCADE')
+            shutil.rmtree(early, ignore_errors=True)
+
+    print("✅ Migration'lar eski verilerle uygulanıyor" if not failures else "❌ Migration kontrolü başarısız")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
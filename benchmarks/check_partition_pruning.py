@@ -0,0 +1,110 @@
+"""
+attendance bölüm budamasının (partition pruning) EXPLAIN ile doğrulanması.
+
+migrations/0016 sonrası canlı tablo tek parça attendance_legacy bölümü olarak
+kalır (MINVALUE'dan migration ayının sonuna kadar, bkz. 0019); bugünün verisi
+de bir süre orada durur. Budamanın aylık bölümlerde çalıştığını göstermek
+için kontroller attendance_ensure_partitions()'ın açtığı ilk aylık bölümün
+bir günü üzerinden yapılır:
+
+    açık oturum araması (dün..bugün, attendance_check_in)    → yalnızca o bölüm
+    aynı sorgu, genel plan (plpgsql plan önbelleği gibi)     → yalnızca o bölüm
+    id + date ile çıkış güncellemesi                          → yalnızca o bölüm
+    bir aylık dışa aktarım aralığı                            → yalnızca o bölüm
+    ayın ilk günündeki arama (önceki ayın son günü dahil)     → önceki bölüm + o bölüm
+
+Bir sorgu başka bölümlere de gidiyorsa betik sıfırdan farklı kodla çıkar.
+Yalnızca EXPLAIN (ANALYZE olmadan) çalıştırır, veri değiştirmez. Migration
+uygulanmış bir veritabanına karşı:
+    DATABASE_URL=postgresql://... python benchmarks/check_partition_pruning.py
+"""
+import json
+import os
+import sys
+from datetime import time, timedelta
+
+import psycopg
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app import SITE_TIMEZONE, attendance_partitions  # noqa: E402
+
+OPEN_SESSION_SQL = """
+    SELECT a.id, a.date, a.location, a.start_time FROM attendance a
+    WHERE a.employee_id = {emp} AND a.date BETWEEN {day}::DATE - 1 AND {day}::DATE AND a.end_time IS NULL
+    ORDER BY (a.location = {location}) DESC, a.id DESC LIMIT 1
+"""
+
+
+def relations(plan):
+    """Plan ağacındaki tüm tablo adları"""
+    found = set()
+    if 'Relation Name' in plan:
+        found.add(plan['Relation Name'])
+    for child in plan.get('Plans', []):
+        found |= relations(child)
+    return found
+
+
+def explain(cur, query, params=None):
+    """Plandaki bölümler (üst tablo hariç)"""
+    cur.execute("EXPLAIN (FORMAT JSON) " + query, params)
+    plan = cur.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return relations(plan[0]['Plan']) - {'attendance'}
+
+
+def explain_generic(cur, day):
+    """plpgsql'in önbelleğe aldığı genel plan: budama yürütme başında (Subplans Removed) yapılır"""
+    cur.execute("SET plan_cache_mode = force_generic_plan")
+    cur.execute("PREPARE open_session(INTEGER, DATE, TEXT) AS "
+                + OPEN_SESSION_SQL.format(emp='$1', day='$2', location='$3'))
+    try:
+        # EXECUTE argümanları bağlanan parametre alamaz; tarih sabit olarak yazılır
+        return explain(cur, f"EXECUTE open_session(1, '{day.isoformat()}', 'Mitte')")
+    finally:
+        cur.execute("DEALLOCATE open_session")
+        cur.execute("RESET plan_cache_mode")
+
+
+def main():
+    with psycopg.connect(os.environ['DATABASE_URL'], autocommit=True) as conn:
+        cur = conn.cursor()
+        partitions = attendance_partitions(conn)
+        if not partitions:
+            raise SystemExit('attendance bölümlü değil: migrations/0016 uygulanmamış')
+        monthly = [(i, p) for i, p in enumerate(partitions) if p[1] is not None and p[2] is not None]
+        if not monthly:
+            raise SystemExit('Aylık bölüm yok: önce flask --app app attendance-partitions')
+        index, (name, lower, upper) = monthly[0]
+        previous = partitions[index - 1][0] if index > 0 else None
+        day = lower + timedelta(days=14)
+        opened = OPEN_SESSION_SQL.format(emp='%s', day='%s', location='%s')
+
+        checks = [
+            ('açık oturum (dün..bugün)', explain(cur, opened, (1, day, day, 'Mitte')), {name}),
+            ('açık oturum, genel plan', explain_generic(cur, day), {name}),
+            ('çıkış güncellemesi (id + date)', explain(cur, """
+                UPDATE attendance SET end_time = %s WHERE id = %s AND date = %s
+            """, (time(17), 1, day)), {name}),
+            ('dışa aktarım (bir ay)', explain(cur, """
+                SELECT employee_id, date, location, duration_minutes FROM attendance
+                WHERE date BETWEEN %s AND %s ORDER BY date, employee_id
+            """, (lower, upper - timedelta(days=1))), {name}),
+            ('ayın ilk günü (gece yarısı araması)', explain(cur, opened, (1, lower, lower, 'Mitte')),
+             {name, previous} - {None}),
+        ]
+
+        print(f"aylık bölüm: {name} [{lower} – {upper}), saat dilimi {SITE_TIMEZONE}")
+        failed = 0
+        for label, scanned, expected in checks:
+            ok = scanned == expected
+            failed += not ok
+            print(f"{'OK ' if ok else 'HATA'} {label:<38} {', '.join(sorted(scanned)) or '-'}"
+                  + ('' if ok else f"  (beklenen: {', '.join(sorted(expected))})"))
+        print(f"{len(partitions)} bölüm: " + ', '.join(p[0] for p in partitions))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,352 @@
+"""
+Check-in iş akışı için tekrarlanabilir yük testi.
+
+Üç adım:
+    seed   yerel/test Postgres'e migration'ları uygular, N personel + kullanıcı ve
+           M geçmiş (kapalı) attendance satırı ekler
+    run    çalışan bir sunucuya vardiya değişimi trafiği gönderir: her sanal
+           kullanıcı (isteğe bağlı signup →) login → beş bölge arasında
+           giriş/çıkış döngüsü; sonuç JSON olarak yazılır
+    clean  seed ile eklenen her şeyi siler
+
+Çıktı: uç nokta başına istek/sn, p50/p90/p99, durum kodları ve hata oranı;
+sunucunun /metrics'inden istek başına veritabanı gidiş-dönüşü (SQL ifadeleri +
+COMMIT). Metrikler worker başınadır; gidiş-dönüş sayısının kesin olması için
+sunucuyu tek worker'la ve yeni başlatılmış olarak çalıştırın.
+
+Örnek:
+    createdb prospando_bench
+    export DATABASE_URL=postgresql://localhost/prospando_bench DB_SSLMODE=disable
+    python benchmarks/checkin_suite.py seed --employees 2000 --history 1000000
+    # Tüm sanal kullanıcılar tek IP'den gelir: sunucu hız sınırları kapalı başlatılmalı
+    export RATE_LIMIT_LOGIN_IP=off RATE_LIMIT_LOGIN_EMAIL=off RATE_LIMIT_SIGNUP_IP=off RATE_LIMIT_SIGNUP_EMAIL=off
+    gunicorn app:app -w 1 --threads 32 -b :8000 &
+    python benchmarks/checkin_suite.py run --url http://127.0.0.1:8000 --concurrency 200 \\
+        --duration 60 --output results/$(git rev-parse --short HEAD).json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from loadtest import read_response, percentile  # noqa: E402
+
+LOCATIONS = ('Mitte', 'Spandau', 'Steglitz', 'Neukölln', 'Charlottenburg')
+PREFIX = 'load-'
+PASSWORD = 'loadtest123'
+
+
+# ==================== SEED ====================
+def connect():
+    import psycopg
+    return psycopg.connect(os.environ['DATABASE_URL'], sslmode=os.getenv('DB_SSLMODE', 'prefer'))
+
+
+def clean(conn):
+    like = PREFIX + '%'
+    conn.execute("DELETE FROM checkin_events WHERE employee_id IN (SELECT id FROM employees WHERE name LIKE %s)", (like,))
+    conn.execute("DELETE FROM attendance WHERE employee_id IN (SELECT id FROM employees WHERE name LIKE %s)", (like,))
+    conn.execute("DELETE FROM users WHERE name LIKE %s", (like,))
+    conn.execute("DELETE FROM employees WHERE name LIKE %s", (like,))
+
+
+def seed(args):
+    from migrate import run_migrations
+    from passwords import default_hasher
+
+    run_migrations(os.environ['DATABASE_URL'], sslmode=os.getenv('DB_SSLMODE', 'prefer'))
+    # Tek hash tüm kullanıcılar için yeterli; seed süresini scrypt belirlemesin
+    hashed = default_hasher().hash(PASSWORD)
+
+    started = time.perf_counter()
+    with connect() as conn:
+        clean(conn)
+        conn.execute(
+            "INSERT INTO employees (name) SELECT %s::TEXT || g FROM generate_series(0, %s - 1) AS g",
+            (PREFIX, args.employees)
+        )
+        conn.execute("""
+            INSERT INTO users (email, password, name)
+            SELECT %(prefix)s::TEXT || g || '@example.com', %(hash)s, %(prefix)s::TEXT || g
+            FROM generate_series(0, %(n)s - 1) AS g
+        """, {'prefix': PREFIX, 'hash': hashed, 'n': args.employees})
+        # Geçmiş günler: hepsi kapalı oturum, 4-10 saat, bölgeler sırayla
+        conn.execute("""
+            INSERT INTO attendance (employee_id, employee_name, date, start_time, end_time, started_at, ended_at,
+                                    location, duration_minutes)
+            SELECT e.id, e.name,
+                   d.opened::DATE, d.opened::TIME, (d.opened + d.minutes * INTERVAL '1 minute')::TIME,
+                   d.opened AT TIME ZONE %(tz)s, (d.opened + d.minutes * INTERVAL '1 minute') AT TIME ZONE %(tz)s,
+                   (ARRAY['Mitte', 'Spandau', 'Steglitz', 'Neukölln', 'Charlottenburg'])[mod(g, 5) + 1],
+                   d.minutes
+            FROM generate_series(0, %(m)s - 1) AS g
+            CROSS JOIN LATERAL (
+                SELECT (CURRENT_DATE - 1 - g / %(n)s) + TIME '06:00' + mod(g, 180) * INTERVAL '1 minute' AS opened,
+                       240 + mod(g * 7, 360) AS minutes
+            ) AS d
+            JOIN employees e ON e.name = %(prefix)s::TEXT || mod(g, %(n)s)
+        """, {'prefix': PREFIX, 'n': args.employees, 'm': args.history,
+              'tz': os.getenv('SITE_TIMEZONE', 'Europe/Berlin')})
+        conn.execute("ANALYZE employees")
+        conn.execute("ANALYZE users")
+        conn.execute("ANALYZE attendance")
+    print(json.dumps({'seeded': {'employees': args.employees, 'history_rows': args.history},
+                      'seconds': round(time.perf_counter() - started, 1)}))
+
+
+# ==================== RUN ====================
+class HttpClient:
+    """Tek keep-alive HTTP/1.1 bağlantısı; hata olursa bir sonraki istekte yeniden bağlanır"""
+
+    def __init__(self, base):
+        url = urlsplit(base)
+        self.host, self.port = url.hostname, url.port or 80
+        self.reader = self.writer = None
+
+    async def request(self, method, path, payload=None, headers=None):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        body = json.dumps(payload).encode('utf-8') if payload is not None else b''
+        head = f'{method} {path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\n'
+        for name, value in (headers or {}).items():
+            head += f'{name}: {value}\r\n'
+        head += f'Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n'
+        try:
+            self.writer.write(head.encode('latin-1') + body)
+            await self.writer.drain()
+            status, close, data = await read_response(self.reader)
+        except BaseException:
+            self.close()
+            raise
+        if close:
+            self.close()
+        return status, data
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = {}
+        self.statuses = {}
+        self.failures = {}
+
+    async def call(self, client, endpoint, method, path, payload=None, headers=None):
+        started = time.perf_counter()
+        try:
+            status, data = await client.request(method, path, payload, headers)
+        except (OSError, ConnectionError, asyncio.IncompleteReadError, ValueError, IndexError) as e:
+            self.failures.setdefault(endpoint, Counter())[type(e).__name__] += 1
+            return None, None
+        self.latencies.setdefault(endpoint, []).append(time.perf_counter() - started)
+        self.statuses.setdefault(endpoint, Counter())[status] += 1
+        return status, data
+
+    def summary(self, elapsed):
+        result = {}
+        for endpoint in sorted(set(self.latencies) | set(self.failures)):
+            latencies = self.latencies.get(endpoint, [])
+            statuses = self.statuses.get(endpoint, Counter())
+            failures = self.failures.get(endpoint, Counter())
+            errors = sum(count for status, count in statuses.items() if status >= 500 or status == 429)
+            errors += sum(failures.values())
+            total = len(latencies) + sum(failures.values())
+            result[endpoint] = {
+                'requests': len(latencies),
+                'rps': round(len(latencies) / elapsed, 1),
+                'p50_ms': _ms(percentile(latencies, 50)),
+                'p90_ms': _ms(percentile(latencies, 90)),
+                'p99_ms': _ms(percentile(latencies, 99)),
+                'max_ms': _ms(max(latencies) if latencies else None),
+                'statuses': {str(status): count for status, count in sorted(statuses.items())},
+                'transport_errors': dict(failures),
+                'error_rate': round(errors / total, 4) if total else 0.0
+            }
+        return result
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 2) if seconds is not None else None
+
+
+async def virtual_user(index, args, recorder, deadline, tag):
+    rng = random.Random(f'{args.seed}-{index}')
+    client = HttpClient(args.url)
+    email, password = f'{PREFIX}{index % args.employees}@example.com', PASSWORD
+    try:
+        if rng.random() < args.signup_ratio:
+            name = f'{PREFIX}new-{tag}-{index}'
+            email = f'{name}@example.com'
+            await recorder.call(client, 'signup', 'POST', '/api/signup',
+                                {'name': name, 'email': email, 'password': password})
+
+        status, data = await recorder.call(client, 'login', 'POST', '/api/login',
+                                           {'email': email, 'password': password})
+        if status != 200:
+            return
+        session = json.loads(data)
+        emp_id, token = session['employee_id'], session.get('token')
+
+        toggle = rng.randrange(len(LOCATIONS))
+        while time.monotonic() < deadline:
+            # Giriş ve çıkış aynı bölgede; her turda sonraki bölgeye geçilir.
+            # Her dokunuş kendi Idempotency-Key'i ile gider, çift dokunma koruması ölçümü bozmaz
+            location = LOCATIONS[toggle % len(LOCATIONS)]
+            for _ in range(2):
+                headers = {'Idempotency-Key': uuid.uuid4().hex}
+                if token:
+                    headers['Authorization'] = f'Bearer {token}'
+                await recorder.call(client, 'checkin', 'POST', '/api/checkin',
+                                    {'id': emp_id, 'location': location}, headers)
+                if args.think_ms:
+                    await asyncio.sleep(rng.uniform(0, 2 * args.think_ms) / 1000)
+                if time.monotonic() >= deadline:
+                    break
+            toggle += 1
+    finally:
+        client.close()
+
+
+_SAMPLE = re.compile(r'^(\w+)(?:\{(.*)\})? (\S+)$')
+
+
+async def scrape_metrics(url):
+    client = HttpClient(url)
+    try:
+        status, data = await client.request('GET', '/metrics')
+    except OSError:
+        return None
+    finally:
+        client.close()
+    if status != 200:
+        return None
+    queries = commits = requests = 0.0
+    statements = Counter()
+    for line in data.decode('utf-8').splitlines():
+        match = _SAMPLE.match(line)
+        if not match:
+            continue
+        name, labels, value = match.group(1), match.group(2) or '', float(match.group(3))
+        if name == 'db_query_duration_seconds_count':
+            queries += value
+            statements[re.search(r'statement="([^"]*)"', labels).group(1)] += value
+        elif name == 'db_commit_duration_seconds_count':
+            commits += value
+        elif name == 'http_request_duration_seconds_count' and 'route="/api/' in labels:
+            requests += value
+    return {'queries': queries, 'commits': commits, 'requests': requests, 'statements': statements}
+
+
+def round_trips(before, after):
+    if not after:
+        return None
+    delta = {key: after[key] - before[key] for key in ('queries', 'commits', 'requests')} if before else None
+    source = 'delta'
+    if delta is None or min(delta.values()) < 0 or not delta['requests']:
+        # Önce/sonra farklı worker'lara düştü; o worker'ın başlangıçtan beri toplamı kullanılır
+        delta, source = {key: after[key] for key in ('queries', 'commits', 'requests')}, 'absolute'
+        statements = after['statements']
+    else:
+        statements = after['statements'] - before['statements']
+    if not delta['requests']:
+        return None
+    return {
+        'source': source,
+        'per_request': round((delta['queries'] + delta['commits']) / delta['requests'], 3),
+        'queries_per_request': round(delta['queries'] / delta['requests'], 3),
+        'commits_per_request': round(delta['commits'] / delta['requests'], 3),
+        'statements': {name: int(count) for name, count in statements.most_common()}
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+async def run_load(args):
+    tag = uuid.uuid4().hex[:8]
+    recorder = Recorder()
+    before = await scrape_metrics(args.url)
+    started_at = datetime.now().isoformat(timespec='seconds')
+    started = time.monotonic()
+    deadline = started + args.duration
+    await asyncio.gather(*(virtual_user(i, args, recorder, deadline, tag) for i in range(args.concurrency)))
+    elapsed = time.monotonic() - started
+    after = await scrape_metrics(args.url)
+
+    endpoints = recorder.summary(elapsed)
+    total = sum(e['requests'] for e in endpoints.values())
+    return {
+        'started_at': started_at,
+        'revision': git_revision(),
+        'config': {key: getattr(args, key) for key in
+                   ('url', 'concurrency', 'duration', 'employees', 'signup_ratio', 'think_ms', 'seed')},
+        'elapsed_seconds': round(elapsed, 2),
+        'requests': total,
+        'rps': round(total / elapsed, 1),
+        'endpoints': endpoints,
+        'db_round_trips': round_trips(before, after)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    seed_parser = commands.add_parser('seed', help='test verisini oluştur')
+    seed_parser.add_argument('--employees', type=int, default=1000)
+    seed_parser.add_argument('--history', type=int, default=200000, help='geçmiş attendance satırı sayısı')
+
+    commands.add_parser('clean', help='test verisini sil')
+
+    run_parser = commands.add_parser('run', help='yük testini çalıştır')
+    run_parser.add_argument('--url', default='http://127.0.0.1:8000')
+    run_parser.add_argument('--concurrency', type=int, default=100)
+    run_parser.add_argument('--duration', type=float, default=30)
+    run_parser.add_argument('--employees', type=int, default=1000, help='seed ile aynı olmalı')
+    run_parser.add_argument('--signup-ratio', type=float, default=0.05,
+                            help='önce yeni hesap açan sanal kullanıcı oranı')
+    run_parser.add_argument('--think-ms', type=float, default=0, help='dokunuşlar arası ortalama bekleme')
+    run_parser.add_argument('--seed', type=int, default=42)
+    run_parser.add_argument('--output', help='JSON dosyası (varsayılan: stdout)')
+    args = parser.parse_args()
+
+    if args.command == 'seed':
+        seed(args)
+    elif args.command == 'clean':
+        with connect() as conn:
+            clean(conn)
+    else:
+        result = asyncio.run(run_load(args))
+        text = json.dumps(result, indent=2, ensure_ascii=False)
+        if args.output:
+            os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+            with open(args.output, 'w', encoding='utf-8') as f:
+                f.write(text + '\n')
+        print(text)
+        limited = sorted(name for name, e in result['endpoints'].items() if e['statuses'].get('429'))
+        if limited:
+            print(f"⚠️  429 yanıtları ({', '.join(limited)}): sunucuyu RATE_LIMIT_*=off ile başlatın",
+                  file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
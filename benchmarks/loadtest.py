@@ -0,0 +1,164 @@
+"""
+Sync (gunicorn + Flask) ve async (uvicorn + asgi.py) sunucuların aynı yük altında
+karşılaştırılması: istek/sn, p50/p99 gecikme, hata oranı.
+
+Her sanal istemci kendi keep-alive HTTP/1.1 bağlantısını kullanır ve süre
+boyunca arka arkaya istek atar. İstemci saf asyncio'dur (ek bağımlılık yok),
+500 eşzamanlı bağlantıyı tek süreçte rahat taşır.
+
+Kullanım (iki sunucu ayrı portlarda, aynı veritabanına karşı):
+    gunicorn app:app -w 4 --threads 8 -b :8000
+    uvicorn asgi:app --workers 4 --port 8001
+    python benchmarks/loadtest.py --target sync=http://127.0.0.1:8000 \\
+        --target async=http://127.0.0.1:8001 --scenario checkin --concurrency 500 --duration 30
+
+checkin senaryosu --employees kadar var olan çalışan id'si kullanır (1..N);
+login senaryosu --email/--password ile kayıtlı bir hesap ister.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from urllib.parse import urlsplit
+
+LOCATIONS = ('Mitte', 'Spandau', 'Steglitz', 'Neukölln', 'Charlottenburg')
+
+
+def build_request(args):
+    """Senaryoya göre (method, path, body üreten fonksiyon) döndür"""
+    if args.scenario == 'health':
+        return 'GET', '/health', lambda: None
+    if args.scenario == 'login':
+        body = json.dumps({'email': args.email, 'password': args.password})
+        return 'POST', '/api/login', lambda: body
+    return 'POST', '/api/checkin', lambda: json.dumps({
+        'id': random.randint(1, args.employees),
+        'location': random.choice(LOCATIONS)
+    })
+
+
+async def read_response(reader):
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("bağlantı kapandı")
+    status = int(status_line.split()[1])
+    length, close = 0, False
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        name = name.strip().lower()
+        if name == 'content-length':
+            length = int(value)
+        elif name == 'connection' and value.strip().lower() == 'close':
+            close = True
+    body = await reader.readexactly(length) if length else b''
+    return status, close, body
+
+
+async def client(base, method, path, make_body, deadline, latencies, errors):
+    url = urlsplit(base)
+    host, port = url.hostname, url.port or 80
+    reader = writer = None
+    while time.monotonic() < deadline:
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(host, port)
+            body = make_body()
+            payload = body.encode('utf-8') if body else b''
+            head = (
+                f'{method} {path} HTTP/1.1\r\nHost: {host}:{port}\r\n'
+                f'Content-Type: application/json\r\nContent-Length: {len(payload)}\r\n\r\n'
+            ).encode('latin-1')
+            started = time.perf_counter()
+            writer.write(head + payload)
+            await writer.drain()
+            status, close, _ = await read_response(reader)
+            latencies.append(time.perf_counter() - started)
+            if status >= 500 or status == 429:
+                errors[str(status)] = errors.get(str(status), 0) + 1
+            if close:
+                writer.close()
+                writer = None
+        except (OSError, ConnectionError, asyncio.IncompleteReadError, ValueError, IndexError) as e:
+            errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+            if writer is not None:
+                writer.close()
+            writer = None
+            await asyncio.sleep(0.05)
+    if writer is not None:
+        writer.close()
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+async def run_target(name, base, args):
+    method, path, make_body = build_request(args)
+    latencies, errors = [], {}
+    deadline = time.monotonic() + args.duration
+    started = time.monotonic()
+    await asyncio.gather(*(
+        client(base, method, path, make_body, deadline, latencies, errors)
+        for _ in range(args.concurrency)
+    ))
+    elapsed = time.monotonic() - started
+    failed = sum(errors.values())
+    # HTTP hataları yanıt olarak latencies içinde; bağlantı hataları değil
+    dropped = sum(count for kind, count in errors.items() if not kind.isdigit())
+    total = len(latencies)
+    return {
+        'target': name,
+        'url': base,
+        'scenario': args.scenario,
+        'concurrency': args.concurrency,
+        'requests': total,
+        'rps': round(total / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2) if latencies else None,
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2) if latencies else None,
+        'max_ms': round(max(latencies) * 1000, 2) if latencies else None,
+        'error_rate': round(failed / max(total + dropped, 1), 4),
+        'errors': errors
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--target', action='append', required=True,
+                        help='ad=url, örn. sync=http://127.0.0.1:8000 (tekrarlanabilir)')
+    parser.add_argument('--scenario', choices=('checkin', 'health', 'login'), default='checkin')
+    parser.add_argument('--concurrency', type=int, default=500)
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--employees', type=int, default=1000)
+    parser.add_argument('--email', default='loadtest@example.com')
+    parser.add_argument('--password', default='loadtest')
+    parser.add_argument('--json', action='store_true', help='sonucu JSON olarak yazdır')
+    args = parser.parse_args()
+
+    results = []
+    for target in args.target:
+        name, _, base = target.partition('=')
+        if not base:
+            name, base = target, target
+        results.append(asyncio.run(run_target(name, base, args)))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'hedef':<10} {'istek':>8} {'rps':>9} {'p50 ms':>9} {'p99 ms':>9} {'hata':>7}")
+    for r in results:
+        print(f"{r['target']:<10} {r['requests']:>8} {r['rps']:>9} {r['p50_ms'] or '-':>9} "
+              f"{r['p99_ms'] or '-':>9} {r['error_rate']:>7.2%}")
+        if r['errors']:
+            print(f"           hatalar: {r['errors']}")
+
+
+if __name__ == '__main__':
+    main()
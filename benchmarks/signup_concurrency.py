@@ -0,0 +1,88 @@
+"""
+Eşzamanlı /api/signup çağrılarında employee id tahsisinin doğruluğu.
+
+Yüzlerce kayıt aynı anda gönderilir; her isim için tek bir employee id,
+farklı isimler için farklı id'ler ve hiç başarısız kayıt olmaması beklenir.
+Bazı isimler bilerek tekrarlanır (aynı isimle eşzamanlı upsert yarışı).
+
+Kullanım (test veritabanına karşı; oluşturulan kayıtlar sonunda silinir):
+    DATABASE_URL=postgresql://... python benchmarks/signup_concurrency.py --signups 500 --concurrency 64
+"""
+import argparse
+import os
+import sys
+import time
+import uuid
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+# Havuz beklemeleri 503'e dönüşmesin; burada ölçülen tahsis doğruluğu
+os.environ.setdefault('DB_POOL_MAX_WAITING', '0')
+os.environ.setdefault('DB_POOL_TIMEOUT', '60')
+# Tüm kayıtlar test istemcisinin tek IP'sinden gelir; hız sınırı 429 döndürmesin
+os.environ.setdefault('RATE_LIMIT_SIGNUP_IP', 'off')
+os.environ.setdefault('RATE_LIMIT_SIGNUP_EMAIL', 'off')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import app as app_module  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--signups', type=int, default=300)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--repeat-every', type=int, default=5,
+                        help='her N. kayıt önceki bir ismi tekrar kullanır')
+    parser.add_argument('--keep', action='store_true', help='oluşturulan kayıtları silme')
+    args = parser.parse_args()
+
+    tag = uuid.uuid4().hex[:8]
+    requests = []
+    for i in range(args.signups):
+        name_index = i - 1 if i and i % args.repeat_every == 0 else i
+        requests.append({
+            'name': f'bench-{tag}-{name_index}',
+            'email': f'bench-{tag}-{i}@example.com',
+            'password': 'secret123'
+        })
+
+    client = app_module.app.test_client()
+
+    def signup(payload):
+        response = client.post('/api/signup', json=payload)
+        return payload['name'], response.status_code, response.get_json()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        results = list(executor.map(signup, requests))
+    elapsed = time.perf_counter() - started
+
+    failures = [(name, status, body) for name, status, body in results if status != 201]
+    ids_by_name = defaultdict(set)
+    for name, status, body in results:
+        if status == 201:
+            ids_by_name[name].add(body['employee_id'])
+
+    split_names = {name: ids for name, ids in ids_by_name.items() if len(ids) > 1}
+    owners = Counter(next(iter(ids)) for ids in ids_by_name.values() if len(ids) == 1)
+    shared_ids = {emp_id: count for emp_id, count in owners.items() if count > 1}
+
+    print(f"{len(results)} kayıt, {elapsed:.2f} s ({len(results) / elapsed:.0f} kayıt/s), eşzamanlılık {args.concurrency}")
+    print(f"başarısız: {len(failures)}, birden fazla id alan isim: {len(split_names)}, "
+          f"birden fazla isme verilen id: {len(shared_ids)}")
+    for failure in failures[:10]:
+        print(f"   ❌ {failure}")
+
+    if not args.keep:
+        with app_module.get_conn() as conn:
+            conn.execute("DELETE FROM users WHERE email LIKE %s", (f'bench-{tag}-%',))
+            conn.execute("DELETE FROM employees WHERE name LIKE %s", (f'bench-{tag}-%',))
+            conn.commit()
+
+    ok = not failures and not split_names and not shared_ids
+    print("✅ Tahsis doğru" if ok else "❌ Tahsis hatalı")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""
+Kısa ömürlü anahtar/değer önbelleği (TTL + LRU).
+
+Varsayılan arka uç süreç içidir (LocalCache). REDIS_URL tanımlı ve redis
+paketi kuruluysa RedisCache kullanılır; böylece aynı anahtar tüm gunicorn
+worker'larında görünür. Değerler JSON'a çevrilebilir olmalıdır.
+
+add() yalnızca anahtar yoksa yazar (Redis'te SET NX); aynı anda gelen iki
+isteğin yalnızca birinin işi üstlenmesi için kullanılır.
+"""
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from logs import get_logger
+
+try:
+    import redis
+except ImportError:  # redis kurulu değilse yalnızca yerel önbellek kullanılır
+    redis = None
+
+log = get_logger('cache')
+
+
+class LocalCache:
+    """Thread-safe LRU; her kaydın kendi son kullanma zamanı vardır"""
+
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _live(self, key, now):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[1] <= now:
+            del self._entries[key]
+            return None
+        return entry
+
+    def _store(self, key, value, ttl, now):
+        self._entries[key] = (value, now + ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._live(key, time.monotonic())
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._store(key, value, ttl, time.monotonic())
+
+    def add(self, key, value, ttl):
+        """Anahtar yoksa yaz ve True döndür; varsa dokunma, False döndür"""
+        now = time.monotonic()
+        with self._lock:
+            if self._live(key, now) is not None:
+                return False
+            self._store(key, value, ttl, now)
+            return True
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class RedisCache:
+    """Worker'lar arası paylaşılan önbellek; değerler JSON olarak saklanır"""
+
+    def __init__(self, url, prefix='prospando:'):
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+
+    def get(self, key):
+        raw = self._client.get(self.prefix + key)
+        return None if raw is None else json.loads(raw)
+
+    def set(self, key, value, ttl):
+        self._client.set(self.prefix + key, json.dumps(value), px=int(ttl * 1000))
+
+    def add(self, key, value, ttl):
+        return bool(self._client.set(self.prefix + key, json.dumps(value), px=int(ttl * 1000), nx=True))
+
+    def delete(self, key):
+        self._client.delete(self.prefix + key)
+
+
+def make_cache(maxsize=10000, prefix='prospando:'):
+    """REDIS_URL varsa (ve redis kuruluysa) paylaşılan, yoksa yerel önbellek"""
+    url = os.getenv('REDIS_URL')
+    if url and redis is not None:
+        return RedisCache(url, prefix=prefix)
+    if url:
+        log.warning('REDIS_URL tanımlı ama redis paketi kurulu değil; yerel önbellek kullanılıyor')
+    return LocalCache(maxsize=maxsize)
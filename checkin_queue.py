@@ -0,0 +1,249 @@
+"""
+Check-in dokunuşları için ertelenmiş yazma (write-behind) kuyruğu.
+
+Vardiya değişiminde /api/checkin trafiği katlanır; her istek uzak Postgres'e
+commit edip beklemek yerine yerel bir SQLite (WAL) dosyasına yazılır ve
+giriş/çıkış kararı hemen döner. Arka plandaki flusher kuyruğu sırayla
+okuyup enjekte edilen flush(events) fonksiyonuyla (app.apply_checkin_events)
+toplu transaction'larda attendance'a yazar.
+
+Karar: personelin kuyrukta (bekleyen ya da yakında yazılmış) satırı varsa
+son satır, yoksa base() ile verilen durum (doluluk indeksi) esas alınır.
+attendance_check_in() gibi yalnızca son MAX_SESSION içinde açılmış oturum
+kapatılır; gece yarısını geçen oturum da buna dahildir.
+Karar ve ekleme tek bir BEGIN IMMEDIATE transaction'ında yapılır; aynı
+dosyayı kullanan tüm worker'lar için sıra tekdir. Yazılan satırlar retain
+saniye daha saklanır, böylece diğer worker'ların indeksine NOTIFY ulaşana
+kadar karar yine kuyruktan verilir.
+
+Sıra: olaylar seq sırasıyla okunur ve tek flusher (dosya kilidi) yazar;
+apply_checkin_events personel başına (zaman, seq) sırasıyla uygular.
+Dayanıklılık: satırlar synchronous=FULL ile commit edilir, yeniden
+başlatmada bekleyenler yazılmaya devam eder; aynı olay tekrar yazılırsa
+checkin_events'teki idempotency_key ile 'duplicate' olur.
+
+Gecikme sınırı: en eski bekleyen satır max_lag saniyeden eskiyse ya da
+max_depth satırdan fazlası bekliyorsa kuyruk yeni personel kabul etmez
+(çağıran senkron yola döner); kuyrukta satırı olan personel için BUSY döner.
+"""
+import fcntl
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from logs import get_logger
+from metrics import Counter, GaugeCallback, record_error
+from sweeper import MAX_SESSION
+
+log = get_logger('checkin_queue')
+
+# Kuyruk sınırı aşıldı ve bu personelin sırası kuyrukta: senkron yazılamaz
+BUSY = 'busy'
+# base() durumu bilinmiyor (ör. bildirim bağlantısı kopuk)
+UNKNOWN = object()
+
+QUEUE_EVENTS = Counter('checkin_queue_events_total', 'Ertelenmiş yazma kuyruğu olayları', ('result',))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkin_queue (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    idempotency_key TEXT NOT NULL,
+    employee_id INTEGER NOT NULL,
+    employee_name TEXT NOT NULL,
+    location TEXT NOT NULL,
+    at TEXT NOT NULL,
+    status TEXT NOT NULL,
+    session_start TEXT,
+    enqueued_at REAL NOT NULL,
+    flushed_at REAL
+);
+CREATE INDEX IF NOT EXISTS checkin_queue_employee_idx ON checkin_queue (employee_id, seq);
+CREATE INDEX IF NOT EXISTS checkin_queue_pending_idx ON checkin_queue (seq) WHERE flushed_at IS NULL;
+"""
+
+
+class CheckInQueue:
+    def __init__(self, path, flush, batch_size=500, interval=0.5, max_lag=30.0, max_depth=10000,
+                 retain=120.0, name='checkin-flusher'):
+        self.path = path
+        self._flush = flush
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_lag = max_lag
+        self.max_depth = max_depth
+        self.retain = retain
+        self._name = name
+        self._local = threading.local()
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        GaugeCallback('checkin_queue', 'Ertelenmiş yazma kuyruğu (bekleyen satır, en eski satırın yaşı)',
+                      self._gauges, ('stat',))
+
+    def _conn(self):
+        """Thread başına (fork sonrası yeniden açılan) SQLite bağlantısı"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=FULL')
+            conn.executescript(SCHEMA)
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def start(self):
+        """Bu süreçte flusher çalışmıyorsa başlat (fork sonrası her worker kendi thread'ini açar)"""
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name=self._name, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    # ---------- kuyruğa ekleme ----------
+    def _pending(self, conn, now):
+        depth, oldest = conn.execute(
+            "SELECT count(*), min(enqueued_at) FROM checkin_queue WHERE flushed_at IS NULL"
+        ).fetchone()
+        return depth, (now - oldest) if oldest is not None else 0.0
+
+    def enqueue(self, key, employee_id, name, location, at, base):
+        """
+        Dokunuşun kararını ver ve gerekiyorsa kuyruğa yaz.
+        (status, isim, oturum bölgesi, giriş saati, oturum günü), BUSY ya da None (senkron yola dön) döner.
+        status: 'entry' | 'exit' (kuyruğa yazıldı) ya da 'elsewhere' (yazılacak bir şey yok).
+        """
+        conn = self._conn()
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            last = conn.execute("""
+                SELECT employee_name, location, at, status, session_start, flushed_at FROM checkin_queue
+                WHERE employee_id = ? ORDER BY seq DESC LIMIT 1
+            """, (employee_id,)).fetchone()
+            depth, lag = self._pending(conn, now)
+            if depth >= self.max_depth or lag > self.max_lag:
+                conn.execute('ROLLBACK')
+                QUEUE_EVENTS.inc('over_limit')
+                # Kuyrukta satırı olan personel senkron yazılırsa sırası bozulur
+                return BUSY if last is not None else None
+
+            if last is not None:
+                name = name or last[0]
+                last_at = datetime.fromisoformat(last[2])
+                if last[3] == 'entry' and at - last_at < MAX_SESSION:
+                    session = (last[1], last_at.time(), last_at.date())
+                else:
+                    session = None
+            else:
+                session = base()
+                if session is UNKNOWN or (session is not None and session[1] is None):
+                    conn.execute('ROLLBACK')
+                    return None
+                if session is not None and at - datetime.combine(session[2], session[1], at.tzinfo) >= MAX_SESSION:
+                    session = None
+            if not name:
+                conn.execute('ROLLBACK')
+                return None
+
+            if session is None:
+                status, session_location, start, day = 'entry', location, at.time(), at.date()
+            elif session[0] != location:
+                conn.execute('ROLLBACK')
+                return 'elsewhere', name, session[0], session[1], session[2]
+            else:
+                status, session_location, start, day = 'exit', location, session[1], session[2]
+
+            conn.execute("""
+                INSERT INTO checkin_queue (idempotency_key, employee_id, employee_name, location, at, status,
+                                           session_start, enqueued_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (key, employee_id, name, location, at.isoformat(), status, start.strftime('%H:%M'), now))
+            conn.execute('COMMIT')
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            raise
+        QUEUE_EVENTS.inc('queued')
+        return status, name, session_location, start, day
+
+    # ---------- flusher ----------
+    def _take_lock(self):
+        """Dosyayı tek flusher yazar; kilit süreç ömrü boyunca tutulur"""
+        handle = open(self.path + '.lock', 'a')
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            return None
+        return handle
+
+    def flush_once(self):
+        """Bekleyen en fazla batch_size olayı yaz; yazılan olay sayısı döner"""
+        conn = self._conn()
+        rows = conn.execute("""
+            SELECT seq, idempotency_key, employee_id, location, at, status FROM checkin_queue
+            WHERE flushed_at IS NULL ORDER BY seq LIMIT ?
+        """, (self.batch_size,)).fetchall()
+        if not rows:
+            return 0
+        events = [{'seq': seq, 'key': key, 'employee_id': employee_id, 'location': location,
+                   'at': datetime.fromisoformat(at)}
+                  for seq, key, employee_id, location, at, _ in rows]
+        results = self._flush(events)
+        for seq, key, employee_id, _, _, status in rows:
+            result = results.get(seq, {})
+            if result.get('status') not in (status, 'duplicate'):
+                # Yanıt kuyruğun kararıyla verildi; veritabanı farklı karar verdiyse kaydı kalsın
+                QUEUE_EVENTS.inc('mismatch')
+                log.warning('Kuyruk kararı veritabanıyla uyuşmadı', extra={
+                    'idempotency_key': key, 'employee_id': employee_id,
+                    'queued_status': status, 'applied_status': result.get('status')
+                })
+        conn.execute("UPDATE checkin_queue SET flushed_at = ? WHERE seq <= ? AND flushed_at IS NULL",
+                     (time.time(), rows[-1][0]))
+        conn.execute("DELETE FROM checkin_queue WHERE flushed_at < ?", (time.time() - self.retain,))
+        QUEUE_EVENTS.inc('flushed', amount=len(rows))
+        return len(rows)
+
+    def _run(self):
+        lock = None
+        failures = 0
+        while not self._stop.is_set():
+            if lock is None:
+                lock = self._take_lock()
+                if lock is None:
+                    # Başka bir worker yazıyor; o durursa kilidi devral
+                    self._stop.wait(max(self.interval, 1.0))
+                    continue
+            try:
+                flushed = self.flush_once()
+                failures = 0
+            except Exception as e:
+                failures += 1
+                record_error('checkin_queue', e)
+                log.error('Kuyruk yazılamadı: %s', e, extra={'error_type': type(e).__name__, 'failures': failures})
+                self._stop.wait(min(30.0, self.interval * 2 ** failures))
+                continue
+            if flushed < self.batch_size:
+                self._stop.wait(self.interval)
+        if lock is not None:
+            lock.close()
+
+    def stats(self):
+        conn = self._conn()
+        depth, lag = self._pending(conn, time.time())
+        return {'depth': depth, 'lag_seconds': round(lag, 3), 'max_depth': self.max_depth, 'max_lag': self.max_lag}
+
+    def _gauges(self):
+        stats = self.stats()
+        return {('depth',): stats['depth'], ('lag_seconds',): stats['lag_seconds']}
@@ -0,0 +1,80 @@
+"""
+Personel id → isim önbelleği.
+
+Kadro haftada birkaç kez değişir; isimler her istekte sorgulanmak yerine
+sınırlı bir TTL LRU'da tutulur. Olmayan id'ler de (kiosk'ta yanlış yazılan
+numaralar) kısa süreliğine "yok" olarak hatırlanır, böylece tekrar eden
+hatalı girişler veritabanına gitmez.
+
+employees tablosundaki her değişiklik trigger ile employees_changed kanalına
+NOTIFY edilir (bkz. migrations/0009); her worker ilgili kaydı önbellekten
+düşürür. Dinleyici bağlantısı koparsa yeniden bağlanınca önbellek tamamen
+temizlenir.
+"""
+import json
+import os
+
+from cache import LocalCache
+from metrics import Counter
+
+EMPLOYEE_CACHE_SIZE = int(os.getenv('EMPLOYEE_CACHE_SIZE', 10000))
+EMPLOYEE_CACHE_TTL = float(os.getenv('EMPLOYEE_CACHE_TTL', 300))
+EMPLOYEE_CACHE_NEGATIVE_TTL = float(os.getenv('EMPLOYEE_CACHE_NEGATIVE_TTL', 30))
+
+# Önbellekte "böyle bir personel yok" kaydı
+NOT_FOUND = ''
+
+CACHE_REQUESTS = Counter('employee_cache_requests_total', 'Personel önbelleği sorguları', ('result',))
+
+
+class EmployeeDirectory:
+    def __init__(self, maxsize=EMPLOYEE_CACHE_SIZE, ttl=EMPLOYEE_CACHE_TTL, negative_ttl=EMPLOYEE_CACHE_NEGATIVE_TTL):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._names = LocalCache(maxsize=maxsize)
+
+    def lookup(self, emp_id):
+        """İsim, NOT_FOUND ya da önbellekte yoksa None"""
+        if self.ttl <= 0:
+            return None
+        name = self._names.get(emp_id)
+        CACHE_REQUESTS.inc('miss' if name is None else 'negative_hit' if name == NOT_FOUND else 'hit')
+        return name
+
+    def put(self, emp_id, name):
+        if self.ttl > 0:
+            self._names.set(emp_id, name, self.ttl)
+
+    def put_missing(self, emp_id):
+        if self.ttl > 0 and self.negative_ttl > 0:
+            self._names.set(emp_id, NOT_FOUND, self.negative_ttl)
+
+    def names(self, cur, emp_ids):
+        """{id: isim} (olmayanlar hariç); önbellekte olmayanlar tek sorguda okunur"""
+        found, missing = {}, []
+        for emp_id in emp_ids:
+            name = self.lookup(emp_id)
+            if name is None:
+                missing.append(emp_id)
+            elif name != NOT_FOUND:
+                found[emp_id] = name
+        if missing:
+            cur.execute("SELECT id, name FROM employees WHERE id = ANY(%s)", (missing,))
+            loaded = dict(cur.fetchall())
+            for emp_id in missing:
+                if emp_id in loaded:
+                    self.put(emp_id, loaded[emp_id])
+                else:
+                    self.put_missing(emp_id)
+            found.update(loaded)
+        return found
+
+    def forget(self, emp_id):
+        self._names.delete(emp_id)
+
+    def apply_notification(self, payload):
+        """employees_changed kanalından gelen JSON bildirimi uygula"""
+        self.forget(json.loads(payload)['id'])
+
+    def clear(self):
+        self._names = LocalCache(maxsize=self._names.maxsize)
@@ -0,0 +1,92 @@
+"""
+Arka planda veritabanı erişilebilirlik kontrolü.
+
+Probe'lar (/readyz, /health) veritabanına gitmez; her worker'da tek bir
+thread, havuz dışı kalıcı bir bağlantıyla belirli aralıklarla SELECT 1
+çalıştırır ve sonucu saklar. Bağlantı kısa connect_timeout ve
+statement_timeout ile açılır; veritabanı yavaşsa kontrol hızla başarısız
+olur, probe'lar beklemez. Son başarılı kontrol stale_after saniyeden
+eskiyse durum "stale" sayılır (thread takıldıysa da hazır görünmeyiz).
+"""
+import os
+import threading
+import time
+from datetime import datetime
+
+from logs import get_logger
+
+log = get_logger('health')
+
+
+class DatabaseProbe:
+    def __init__(self, connect, interval=5.0, stale_after=15.0, name='db-probe'):
+        self._connect = connect
+        self.interval = interval
+        self.stale_after = stale_after
+        self._name = name
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._status = {'ok': False, 'state': 'starting', 'latency_ms': None, 'error': None}
+        self._checked_at = None
+        self._checked_monotonic = None
+
+    def start(self):
+        """Bu süreçte kontrol thread'i çalışmıyorsa başlat (fork sonrası her worker kendi thread'ini açar)"""
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name=self._name, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _record(self, ok, latency_ms=None, error=None):
+        self._status = {
+            'ok': ok,
+            'state': 'up' if ok else 'down',
+            'latency_ms': latency_ms,
+            'error': error
+        }
+        self._checked_at = datetime.now()
+        self._checked_monotonic = time.monotonic()
+
+    def _run(self):
+        conn = None
+        while not self._stop.is_set():
+            started = time.perf_counter()
+            try:
+                if conn is None or conn.closed:
+                    conn = self._connect()
+                conn.execute("SELECT 1")
+                self._record(True, round((time.perf_counter() - started) * 1000, 2))
+            except Exception as e:
+                if self._status['ok']:
+                    log.warning('Veritabanı kontrolü başarısız: %s', e, extra={'error_type': type(e).__name__})
+                self._record(False, error=str(e))
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+                    conn = None
+            self._stop.wait(self.interval)
+        if conn is not None:
+            conn.close()
+
+    def snapshot(self):
+        """Son kontrolün sonucu; G/Ç yapmaz"""
+        status = dict(self._status)
+        if self._checked_monotonic is not None:
+            age = time.monotonic() - self._checked_monotonic
+            status['age_seconds'] = round(age, 1)
+            status['checked_at'] = self._checked_at.isoformat(timespec='seconds')
+            if status['ok'] and age > self.stale_after:
+                status.update(ok=False, state='stale')
+        return status
@@ -0,0 +1,105 @@
+"""
+Postgres LISTEN/NOTIFY dinleyicisi.
+
+Her süreç (gunicorn worker) havuz dışı tek bir autocommit bağlantıyla
+abone olunan kanalları dinler ve gelen bildirimleri kayıtlı fonksiyonlara
+iletir. Bağlantı koparsa artan beklemeyle yeniden bağlanır; yeniden
+bağlanınca on_reconnect fonksiyonları çağrılır (kaçırılan bildirimler için
+tam senkronizasyon). every() ile kaydedilen periyodik işler de aynı
+thread'de çalışır.
+"""
+import os
+import threading
+import time
+
+from psycopg import sql
+
+from logs import get_logger
+from metrics import record_error
+
+log = get_logger('listener')
+
+
+class NotificationListener:
+    def __init__(self, connect, name='pg-listener', max_backoff=30.0):
+        self._connect = connect
+        self._name = name
+        self._max_backoff = max_backoff
+        self._handlers = {}
+        self._reconnect_callbacks = []
+        self._periodic = []
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self.connected = False
+
+    def subscribe(self, channel, handler, on_reconnect=None):
+        """Kanala handler(payload) bağla; start() öncesinde çağrılmalı"""
+        self._handlers.setdefault(channel, []).append(handler)
+        if on_reconnect is not None:
+            self._reconnect_callbacks.append(on_reconnect)
+
+    def every(self, seconds, callback, delay=None):
+        """callback() her `seconds` saniyede bir dinleyici thread'inde çalışır; ilki `delay` sonra (varsayılan `seconds`)"""
+        self._periodic.append([seconds, time.monotonic() + (seconds if delay is None else delay), callback])
+
+    def start(self):
+        """Bu süreçte dinleyici çalışmıyorsa başlat (fork sonrası her worker kendi thread'ini açar)"""
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name=self._name, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _call(self, callback, *args):
+        try:
+            callback(*args)
+        except Exception as e:
+            record_error('listener_callback', e)
+            log.error('Listener callback error (%s): %s', self._name, e, extra={'listener': self._name})
+
+    def _run_due(self):
+        now = time.monotonic()
+        for task in self._periodic:
+            seconds, due, callback = task
+            if now >= due:
+                task[1] = now + seconds
+                self._call(callback)
+
+    def _next_timeout(self):
+        if not self._periodic:
+            return 1.0
+        return max(0.0, min(1.0, min(due for _, due, _ in self._periodic) - time.monotonic()))
+
+    def _run(self):
+        backoff = 1.0
+        while not self._stop.is_set():
+            try:
+                with self._connect() as conn:
+                    for channel in self._handlers:
+                        conn.execute(sql.SQL("LISTEN {}").format(sql.Identifier(channel)))
+                    self.connected = True
+                    backoff = 1.0
+                    for callback in self._reconnect_callbacks:
+                        self._call(callback)
+
+                    while not self._stop.is_set():
+                        for notify in conn.notifies(timeout=self._next_timeout()):
+                            for handler in self._handlers.get(notify.channel, ()):
+                                self._call(handler, notify.payload)
+                        self._run_due()
+            except Exception as e:
+                record_error('listener_connection', e)
+                log.warning('Listener connection error (%s): %s', self._name, e, extra={'listener': self._name})
+            self.connected = False
+            if self._stop.wait(backoff):
+                break
+            backoff = min(backoff * 2, self._max_backoff)
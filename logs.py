@@ -0,0 +1,48 @@
+"""
+Yapılandırılmış (JSON satırı) loglama.
+
+Her kayıt tek satır JSON olarak stdout'a yazılır: ts, level, logger, msg ve
+extra={...} ile verilen alanlar. Mesaj argümanları logging'in kendi tembel
+biçimlendirmesiyle, yalnızca kayıt gerçekten yazılacaksa işlenir
+(log.info("...: %s", x)). Seviye LOG_LEVEL ile ayarlanır.
+"""
+import json
+import logging
+import os
+import sys
+import time
+
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+
+# LogRecord'un kendi alanları; geri kalanlar extra={...} ile gelmiştir
+_RESERVED = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'ts': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created)) + f'.{int(record.msecs):03d}Z',
+            'level': record.levelname.lower(),
+            'logger': record.name,
+            'msg': record.getMessage()
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED:
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+_root = logging.getLogger('prospando')
+if not _root.handlers:
+    _handler = logging.StreamHandler(sys.stdout)
+    _handler.setFormatter(JsonFormatter())
+    _root.addHandler(_handler)
+    _root.setLevel(LOG_LEVEL)
+    _root.propagate = False
+
+
+def get_logger(name):
+    """prospando.<name> logger'ı"""
+    return _root.getChild(name)
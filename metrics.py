@@ -0,0 +1,215 @@
+"""
+Süreç içi metrikler ve Prometheus metin formatı (/metrics).
+
+Sayaçlar ve histogramlar kilitli küçük sözlüklerdir; gözlem maliyeti bir
+bisect ve birkaç toplamadır. Değerler worker başınadır (her gunicorn
+worker'ı kendi /metrics'ini döndürür).
+
+Veritabanı ölçümü psycopg sınıflarıyla yapılır: havuz TimedConnection ve
+TimedCursor ile açılır, böylece her execute/executemany ve commit ayrı
+ayrı süre tutar; uygulama kodu değişmez.
+"""
+import re
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+import psycopg
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+REGISTRY = []
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{value}"' for name, value in extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def inc(self, *labelvalues, amount=1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def value(self, *labelvalues):
+        return self._values.get(labelvalues, 0)
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        for labelvalues, value in items:
+            yield self.name, _labels(self.labelnames, labelvalues), value
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def observe(self, value, *labelvalues):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labelvalues)
+            if entry is None:
+                entry = self._values[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, *labelvalues):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labelvalues)
+
+    def samples(self):
+        with self._lock:
+            items = [(labelvalues, list(counts), total, count) for labelvalues, (counts, total, count) in self._values.items()]
+        for labelvalues, counts, total, count in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                yield self.name + '_bucket', _labels(self.labelnames, labelvalues, [('le', _number(bound))]), cumulative
+            yield self.name + '_sum', _labels(self.labelnames, labelvalues), total
+            yield self.name + '_count', _labels(self.labelnames, labelvalues), count
+
+
+class GaugeCallback:
+    """Değeri kazıma anında hesaplanan gösterge; callback {etiket değerleri: sayı} döndürür"""
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, callback, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.callback = callback
+        REGISTRY.append(self)
+
+    def samples(self):
+        for labelvalues, value in self.callback().items():
+            yield self.name, _labels(self.labelnames, labelvalues), value
+
+
+def render():
+    """Tüm metrikleri Prometheus metin formatında döndür"""
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f'# HELP {metric.name} {metric.documentation}')
+        lines.append(f'# TYPE {metric.name} {metric.kind}')
+        for name, labels, value in metric.samples():
+            lines.append(f'{name}{labels} {_number(value)}')
+    return '\n'.join(lines) + '\n'
+
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+HTTP_REQUEST_SECONDS = Histogram(
+    'http_request_duration_seconds', 'HTTP istek süresi (yanıt başlıklarına kadar)', ('route', 'method', 'status')
+)
+DB_QUERY_SECONDS = Histogram('db_query_duration_seconds', 'SQL ifadesi başına çalışma süresi', ('statement',))
+DB_ACQUIRE_SECONDS = Histogram('db_connection_acquire_seconds', 'Havuzdan bağlantı alma süresi')
+DB_COMMIT_SECONDS = Histogram('db_commit_duration_seconds', 'COMMIT süresi')
+ERRORS = Counter('app_errors_total', 'Yakalanan hatalar', ('where', 'type'))
+
+
+def record_error(where, exc):
+    ERRORS.inc(where, type(exc).__name__)
+
+
+# ==================== DB INSTRUMENTATION ====================
+_VERB = re.compile(r'^\s*(\w+)')
+_TARGET = re.compile(r'\b(?:FROM|INTO|UPDATE|COPY|TABLE)\s+([A-Za-z_][\w.]*)', re.IGNORECASE)
+_labels_cache = {}
+
+
+def statement_label(query):
+    """Düşük kardinaliteli etiket: 'select attendance_check_in', 'insert employees' gibi"""
+    if not isinstance(query, str):
+        query = query.decode() if isinstance(query, bytes) else None
+        if query is None:
+            return 'composed'
+    label = _labels_cache.get(query)
+    if label is None:
+        verb = _VERB.match(query)
+        target = _TARGET.search(query)
+        label = ' '.join(part for part in (
+            verb.group(1).lower() if verb else 'sql',
+            target.group(1).lower() if target else None
+        ) if part)
+        if len(_labels_cache) < 1000:
+            _labels_cache[query] = label
+    return label
+
+
+class TimedCursor(psycopg.Cursor):
+    def execute(self, query, params=None, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().execute(query, params, **kwargs)
+        finally:
+            DB_QUERY_SECONDS.observe(time.perf_counter() - started, statement_label(query))
+
+    def executemany(self, query, params_seq, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().executemany(query, params_seq, **kwargs)
+        finally:
+            DB_QUERY_SECONDS.observe(time.perf_counter() - started, statement_label(query))
+
+
+class TimedConnection(psycopg.Connection):
+    def commit(self):
+        started = time.perf_counter()
+        try:
+            super().commit()
+        finally:
+            DB_COMMIT_SECONDS.observe(time.perf_counter() - started)
+
+
+class TimedAsyncCursor(psycopg.AsyncCursor):
+    async def execute(self, query, params=None, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await super().execute(query, params, **kwargs)
+        finally:
+            DB_QUERY_SECONDS.observe(time.perf_counter() - started, statement_label(query))
+
+
+class TimedAsyncConnection(psycopg.AsyncConnection):
+    async def commit(self):
+        started = time.perf_counter()
+        try:
+            await super().commit()
+        finally:
+            DB_COMMIT_SECONDS.observe(time.perf_counter() - started)
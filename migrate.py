@@ -0,0 +1,240 @@
+"""
+Sürümlü şema migration'ları.
+
+migrations/NNNN_ad.sql dosyaları numara sırasıyla bir kez uygulanır ve
+schema_migrations tablosuna checksum ile kaydedilir. Uygulanmış bir dosya
+sonradan değiştirilirse uygulama başlamaz (yeni bir migration yazılmalı).
+
+Bir dosya "--! <mod>" satırlarıyla adımlara bölünür:
+    --! transaction   Adım tek transaction içinde çalışır (varsayılan)
+    --! autocommit    Transaction dışında tek komut (CREATE INDEX CONCURRENTLY için)
+    --! batch         %(after)s / %(batch_size)s alan ve RETURNING id döndüren tek komut;
+                      satır dönmeyene kadar id sırasıyla tekrarlanır, her parça ayrı commit
+                      (alt sorgu yalnızca işlenecek satırları seçmeli; boş parça döngüyü bitirir)
+
+Uygulanmış bir migration'daki hata yeni bir dosyayla düzeltilir. Düzeltme, hatalı dosya
+henüz uygulanmamış veritabanlarında ondan önce çalışmalıysa dosyaya bir satır eklenir:
+    --! before NNNN   NNNN bekliyorsa bu dosya hemen ondan önce uygulanır
+                      (NNNN uygulanmışsa kendi sırasında)
+
+Aynı anda başlayan gunicorn worker'ları advisory lock ile sıraya girer;
+ilk worker migration'ları uygular, diğerleri bekleyip hiçbir şey yapmadan devam eder.
+Bekleyenler kilidi pg_try_advisory_lock ile yoklar; sunucuda bekleyen bir komut
+CREATE INDEX CONCURRENTLY adımlarını kilitlerdi.
+
+Kullanım:
+    python migrate.py           # bekleyen migration'ları uygula
+    python migrate.py status    # uygulanan/bekleyen listesi
+"""
+import hashlib
+import os
+import re
+import sys
+import time
+
+import psycopg
+
+from logs import get_logger
+
+log = get_logger('migrate')
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+MIGRATION_BATCH_SIZE = int(os.getenv('MIGRATION_BATCH_SIZE', 5000))
+# pg_advisory_lock anahtarı; uygulamanın diğer kilitleriyle çakışmayacak sabit bir sayı
+MIGRATION_LOCK_KEY = 72_420_001
+# Kilidi bekleyen worker'ın yoklama aralığı (saniye)
+MIGRATION_LOCK_POLL = float(os.getenv('MIGRATION_LOCK_POLL', 0.5))
+
+_FILE_RE = re.compile(r'^(\d+)_([\w-]+)\.sql$')
+_DIRECTIVE_RE = re.compile(r'^--!\s*(\w+)\s*$')
+_BEFORE_RE = re.compile(r'^--!\s*before\s+(\d+)\s*$')
+STEP_MODES = ('transaction', 'autocommit', 'batch')
+
+
+class MigrationError(Exception):
+    pass
+
+
+class DatabaseUnavailable(MigrationError):
+    """Migration bağlantısı kurulamadı; hiçbir adım çalışmadı, sonra yeniden denenebilir"""
+
+
+class Migration:
+    def __init__(self, version, name, path):
+        self.version = version
+        self.name = name
+        self.path = path
+        with open(path, 'rb') as f:
+            # Satır sonları normalize edilir, CRLF/LF checkout farkı checksum'ı bozmaz
+            self.sql = f.read().decode('utf-8').replace('\r\n', '\n')
+        self.checksum = hashlib.sha256(self.sql.encode('utf-8')).hexdigest()
+        self.before = None
+        for line in self.sql.split('\n'):
+            match = _BEFORE_RE.match(line.strip())
+            if match:
+                self.before = int(match.group(1))
+
+    def steps(self):
+        """Dosyayı (mod, sql) adımlarına böl; sadece yorumdan oluşan adımlar atlanır"""
+        steps = []
+        mode, lines = 'transaction', []
+        for line in self.sql.split('\n') + ['--! end']:
+            match = _DIRECTIVE_RE.match(line.strip())
+            if not match:
+                lines.append(line)
+                continue
+            body = '\n'.join(lines).strip()
+            if any(l.strip() and not l.strip().startswith('--') for l in lines):
+                steps.append((mode, body))
+            mode, lines = match.group(1), []
+            if mode not in STEP_MODES + ('end',):
+                raise MigrationError(f"{self.path}: bilinmeyen adım modu '{mode}'")
+        return steps
+
+    def __repr__(self):
+        return f'<Migration {self.version:04d}_{self.name}>'
+
+
+def load_migrations(directory=MIGRATIONS_DIR):
+    """Klasördeki migration dosyalarını sürüm sırasıyla döndür"""
+    migrations = []
+    for filename in os.listdir(directory):
+        match = _FILE_RE.match(filename)
+        if match:
+            migrations.append(Migration(int(match.group(1)), match.group(2), os.path.join(directory, filename)))
+    migrations.sort(key=lambda m: m.version)
+
+    versions = [m.version for m in migrations]
+    if len(versions) != len(set(versions)):
+        raise MigrationError(f"Aynı sürüm numarası birden fazla dosyada: {versions}")
+    for migration in migrations:
+        if migration.before is not None and (migration.before >= migration.version or migration.before not in versions):
+            raise MigrationError(f"{migration!r}: 'before {migration.before:04d}' önceki bir migration'ı göstermeli")
+    return migrations
+
+
+def _apply_order(migrations, applied):
+    """Sürüm sırası; 'before N' bildiren dosya, N henüz uygulanmadıysa hemen N'den önce"""
+    def key(migration):
+        if migration.before is not None and migration.before not in applied:
+            return (migration.before, 0, migration.version)
+        return (migration.version, 1, migration.version)
+    return sorted(migrations, key=key)
+
+
+def _ensure_table(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            checksum TEXT NOT NULL,
+            execution_ms INTEGER,
+            applied_at TIMESTAMPTZ DEFAULT now()
+        )
+    """)
+
+
+def _applied(conn):
+    rows = conn.execute("SELECT version, name, checksum FROM schema_migrations ORDER BY version").fetchall()
+    return {version: (name, checksum) for version, name, checksum in rows}
+
+
+def _run_step(conn, mode, sql, batch_size):
+    if mode == 'transaction':
+        with conn.transaction():
+            conn.execute(sql)
+    elif mode == 'autocommit':
+        conn.execute(sql)
+    else:
+        after, total = 0, 0
+        while True:
+            with conn.transaction():
+                ids = [row[0] for row in conn.execute(sql, {'after': after, 'batch_size': batch_size})]
+            if not ids:
+                break
+            after = max(ids)
+            total += len(ids)
+        log.info('Batch adımı: %d satır işlendi', total, extra={'rows': total})
+
+
+def _acquire_lock(conn, poll=MIGRATION_LOCK_POLL):
+    """
+    Migration kilidini al; alınamazsa istemci tarafında uyuyup yeniden dene.
+
+    pg_advisory_lock() ile sunucuda beklemek açık bir snapshot tutar; kilidi
+    tutan worker'ın CREATE INDEX CONCURRENTLY adımı o snapshot'ı bekler ve
+    iki taraf kilitlenir (deadlock detected). Bekleme sırasında hiçbir
+    komut açık kalmamalı.
+    """
+    waited = False
+    while not conn.execute("SELECT pg_try_advisory_lock(%s)", (MIGRATION_LOCK_KEY,)).fetchone()[0]:
+        if not waited:
+            log.info('Migration kilidi başka bir süreçte, bekleniyor')
+            waited = True
+        time.sleep(poll)
+
+
+def run_migrations(conn_string=None, directory=MIGRATIONS_DIR, batch_size=MIGRATION_BATCH_SIZE, **connect_kwargs):
+    """Bekleyen migration'ları uygula, uygulananların listesini döndür"""
+    conn_string = conn_string or os.getenv('DATABASE_URL')
+    if not conn_string:
+        raise MigrationError("DATABASE_URL ortam değişkeni tanımlı değil!")
+
+    migrations = load_migrations(directory)
+    done = []
+    # Oturum seviyesinde advisory lock + autocommit adımları için havuz dışı ayrı bağlantı
+    try:
+        conn = psycopg.connect(conn_string, autocommit=True, **connect_kwargs)
+    except psycopg.OperationalError as e:
+        raise DatabaseUnavailable(f"Veritabanına bağlanılamadı: {e}") from e
+    with conn:
+        _acquire_lock(conn)
+        try:
+            _ensure_table(conn)
+            applied = _applied(conn)
+
+            for migration in _apply_order(migrations, applied):
+                if migration.version in applied:
+                    name, checksum = applied[migration.version]
+                    if checksum != migration.checksum:
+                        raise MigrationError(
+                            f"{migration!r} uygulandıktan sonra değiştirilmiş (checksum uyuşmuyor); "
+                            f"değişiklik için yeni bir migration dosyası ekleyin."
+                        )
+                    continue
+
+                log.info('Migration uygulanıyor: %04d_%s', migration.version, migration.name)
+                started = time.perf_counter()
+                for mode, sql in migration.steps():
+                    _run_step(conn, mode, sql, batch_size)
+                elapsed_ms = int((time.perf_counter() - started) * 1000)
+
+                conn.execute(
+                    "INSERT INTO schema_migrations (version, name, checksum, execution_ms) VALUES (%s, %s, %s, %s)",
+                    (migration.version, migration.name, migration.checksum, elapsed_ms)
+                )
+                log.info('Migration tamamlandı: %04d_%s', migration.version, migration.name,
+                         extra={'version': migration.version, 'execution_ms': elapsed_ms})
+                done.append(migration)
+        finally:
+            conn.execute("SELECT pg_advisory_unlock(%s)", (MIGRATION_LOCK_KEY,))
+    return done
+
+
+def status(conn_string=None, directory=MIGRATIONS_DIR, **connect_kwargs):
+    """Her migration için (migration, uygulandı mı) listesi"""
+    conn_string = conn_string or os.getenv('DATABASE_URL')
+    with psycopg.connect(conn_string, autocommit=True, **connect_kwargs) as conn:
+        _ensure_table(conn)
+        applied = _applied(conn)
+    return [(m, m.version in applied) for m in load_migrations(directory)]
+
+
+if __name__ == '__main__':
+    cli_kwargs = {'sslmode': os.getenv('DB_SSLMODE', 'require'), 'connect_timeout': 20}
+    if len(sys.argv) > 1 and sys.argv[1] == 'status':
+        for migration, is_applied in status(**cli_kwargs):
+            print(f"{'✅' if is_applied else '⏳'} {migration.version:04d}_{migration.name}")
+    else:
+        applied = run_migrations(**cli_kwargs)
+        print(f"✅ {len(applied)} migration uygulandı" if applied else "✅ Şema güncel")
@@ -0,0 +1,27 @@
+-- İlk şema (eski init_db() ile aynı). Var olan veritabanlarında IF NOT EXISTS sayesinde bir şey yapmaz.
+
+CREATE TABLE IF NOT EXISTS employees (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS attendance (
+    id BIGSERIAL PRIMARY KEY,
+    employee_id INTEGER REFERENCES employees(id),
+    employee_name TEXT,
+    date TEXT,
+    start_time TEXT,
+    end_time TEXT,
+    location TEXT,
+    duration TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS users (
+    id SERIAL PRIMARY KEY,
+    email VARCHAR(255) UNIQUE NOT NULL,
+    password VARCHAR(255) NOT NULL,
+    name VARCHAR(255) NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
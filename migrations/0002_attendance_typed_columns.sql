@@ -0,0 +1,53 @@
+-- attendance.date/start_time/end_time: TEXT -> DATE/TIME, canlı tabloyu kilitlemeden.
+-- 1) Gölge kolonlar + yazmaları senkron tutan trigger
+-- 2) Mevcut satırları id sırasıyla parça parça doldur (trigger hesaplar)
+-- 3) Kısa kilitle kolonları yer değiştir
+
+--! transaction
+ALTER TABLE attendance
+    ADD COLUMN IF NOT EXISTS date_typed DATE,
+    ADD COLUMN IF NOT EXISTS start_time_typed TIME,
+    ADD COLUMN IF NOT EXISTS end_time_typed TIME;
+
+-- ::text sayesinde kolon zaten DATE/TIME ise de çalışır
+CREATE OR REPLACE FUNCTION attendance_sync_typed_columns() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    NEW.date_typed := CASE WHEN NEW.date::TEXT ~ '^\d{4}-\d{2}-\d{2}$' THEN NEW.date::TEXT::DATE END;
+    NEW.start_time_typed := CASE WHEN NEW.start_time::TEXT ~ '^\d{1,2}:\d{2}' THEN left(NEW.start_time::TEXT, 5)::TIME END;
+    NEW.end_time_typed := CASE WHEN NEW.end_time::TEXT ~ '^\d{1,2}:\d{2}' THEN left(NEW.end_time::TEXT, 5)::TIME END;
+    RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS attendance_sync_typed_columns ON attendance;
+CREATE TRIGGER attendance_sync_typed_columns
+    BEFORE INSERT OR UPDATE ON attendance
+    FOR EACH ROW EXECUTE FUNCTION attendance_sync_typed_columns();
+
+--! batch
+UPDATE attendance SET date = date
+WHERE id IN (
+    SELECT id FROM attendance
+    WHERE id > %(after)s
+    ORDER BY id
+    LIMIT %(batch_size)s
+)
+RETURNING id;
+
+--! transaction
+SET LOCAL lock_timeout = '10s';
+LOCK TABLE attendance IN ACCESS EXCLUSIVE MODE;
+
+DROP TRIGGER attendance_sync_typed_columns ON attendance;
+DROP FUNCTION attendance_sync_typed_columns();
+
+-- Eski TEXT imzalı check-in fonksiyonu silinecek kolonlara bağlı
+DROP FUNCTION IF EXISTS attendance_check_in(INTEGER, TEXT, TEXT, TEXT);
+
+ALTER TABLE attendance
+    DROP COLUMN date,
+    DROP COLUMN start_time,
+    DROP COLUMN end_time;
+ALTER TABLE attendance RENAME COLUMN date_typed TO date;
+ALTER TABLE attendance RENAME COLUMN start_time_typed TO start_time;
+ALTER TABLE attendance RENAME COLUMN end_time_typed TO end_time;
@@ -0,0 +1,28 @@
+-- check_in() açık oturum aramaları için kısmi indeksler.
+
+--! transaction
+-- Aynı gün birden fazla açık oturum kalmışsa en yenisi hariç kapat (benzersiz indeks için şart)
+UPDATE attendance a SET end_time = a.start_time, duration = '0h 0m'
+WHERE a.end_time IS NULL AND EXISTS (
+    SELECT 1 FROM attendance b
+    WHERE b.employee_id = a.employee_id AND b.date = a.date
+      AND b.end_time IS NULL AND b.id > a.id
+);
+
+--! autocommit
+-- Yarıda kalmış bir CONCURRENTLY denemesi geçersiz (INVALID) indeks bırakmış olabilir
+DROP INDEX CONCURRENTLY IF EXISTS attendance_open_session_idx;
+
+--! autocommit
+CREATE INDEX CONCURRENTLY attendance_open_session_idx
+    ON attendance (employee_id, date, location)
+    WHERE end_time IS NULL;
+
+--! autocommit
+DROP INDEX CONCURRENTLY IF EXISTS attendance_one_open_session_uidx;
+
+--! autocommit
+-- Personel başına günde en fazla bir açık oturum
+CREATE UNIQUE INDEX CONCURRENTLY attendance_one_open_session_uidx
+    ON attendance (employee_id, date)
+    WHERE end_time IS NULL;
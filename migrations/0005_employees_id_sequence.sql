@@ -0,0 +1,10 @@
+-- employees.id: MAX(id)+1 yerine sequence. Mevcut id'ler korunur, sequence en büyük id'den devam eder.
+
+--! transaction
+-- Eski kodla eşzamanlı kayıt araya girmesin diye kısa süreli kilit (okumalar engellenmez)
+SET LOCAL lock_timeout = '10s';
+LOCK TABLE employees IN EXCLUSIVE MODE;
+
+CREATE SEQUENCE IF NOT EXISTS employees_id_seq AS INTEGER OWNED BY employees.id;
+SELECT setval('employees_id_seq', COALESCE(MAX(id), 0) + 1, false) FROM employees;
+ALTER TABLE employees ALTER COLUMN id SET DEFAULT nextval('employees_id_seq');
@@ -0,0 +1,12 @@
+-- Kiosk toplu senkronizasyonu (/api/checkin/batch) için idempotency kaydı.
+-- Aynı idempotency_key ile tekrar gönderilen olay yeniden uygulanmaz, ilk sonucu döner.
+
+CREATE TABLE IF NOT EXISTS checkin_events (
+    idempotency_key TEXT PRIMARY KEY,
+    employee_id INTEGER NOT NULL,
+    location TEXT NOT NULL,
+    occurred_at TIMESTAMP NOT NULL,
+    status TEXT NOT NULL,
+    attendance_id BIGINT,
+    received_at TIMESTAMPTZ DEFAULT now()
+);
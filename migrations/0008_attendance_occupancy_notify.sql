@@ -0,0 +1,27 @@
+-- Açık oturum değişikliklerini LISTEN/NOTIFY ile yayınla (occupancy.py süreç içi indeksi).
+-- Trigger tüm yazma yollarını kapsar: attendance_check_in(), toplu senkron (COPY), elle düzeltmeler.
+-- Bildirim transaction commit olunca gönderilir; geri alınan değişiklikler yayınlanmaz.
+
+CREATE OR REPLACE FUNCTION attendance_notify_occupancy() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' AND NEW.end_time IS NULL THEN
+        PERFORM pg_notify('attendance_occupancy', json_build_object(
+            'op', 'open', 'employee_id', NEW.employee_id, 'location', NEW.location, 'date', NEW.date
+        )::TEXT);
+    ELSIF TG_OP = 'UPDATE' AND OLD.end_time IS NULL AND NEW.end_time IS NOT NULL THEN
+        PERFORM pg_notify('attendance_occupancy', json_build_object(
+            'op', 'close', 'employee_id', NEW.employee_id, 'location', NEW.location, 'date', NEW.date
+        )::TEXT);
+    ELSIF TG_OP = 'DELETE' AND OLD.end_time IS NULL THEN
+        PERFORM pg_notify('attendance_occupancy', json_build_object(
+            'op', 'close', 'employee_id', OLD.employee_id, 'location', OLD.location, 'date', OLD.date
+        )::TEXT);
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS attendance_notify_occupancy ON attendance;
+CREATE TRIGGER attendance_notify_occupancy
+    AFTER INSERT OR UPDATE OF end_time OR DELETE ON attendance
+    FOR EACH ROW EXECUTE FUNCTION attendance_notify_occupancy();
@@ -0,0 +1,24 @@
+-- Personel değişikliklerini LISTEN/NOTIFY ile yayınla (employees.py süreç içi isim önbelleği).
+-- INSERT de yayınlanır: diğer worker'lar o id için tuttukları "yok" kaydını düşürür.
+-- Signup'taki ON CONFLICT (name) DO UPDATE ismi değiştirmez; bildirim yalnızca gerçek değişiklikte gider.
+
+CREATE OR REPLACE FUNCTION employees_notify_changed() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM pg_notify('employees_changed', json_build_object('op', 'insert', 'id', NEW.id)::TEXT);
+    ELSIF TG_OP = 'UPDATE' AND (OLD.id, OLD.name) IS DISTINCT FROM (NEW.id, NEW.name) THEN
+        PERFORM pg_notify('employees_changed', json_build_object('op', 'update', 'id', OLD.id)::TEXT);
+        IF NEW.id <> OLD.id THEN
+            PERFORM pg_notify('employees_changed', json_build_object('op', 'update', 'id', NEW.id)::TEXT);
+        END IF;
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM pg_notify('employees_changed', json_build_object('op', 'delete', 'id', OLD.id)::TEXT);
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS employees_notify_changed ON employees;
+CREATE TRIGGER employees_notify_changed
+    AFTER INSERT OR UPDATE OF id, name OR DELETE ON employees
+    FOR EACH ROW EXECUTE FUNCTION employees_notify_changed();
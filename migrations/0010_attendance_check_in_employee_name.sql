@@ -0,0 +1,67 @@
+-- attendance_check_in(): isteğe bağlı p_employee_name parametresi (imzalı oturum token'ı, bkz. tokens.py).
+-- Eski 4 parametreli imza kaldırılır; varsayılan değer sayesinde 4 argümanlı çağrılar
+-- (deploy sırasında eski sürüm) yeni fonksiyona düşer, belirsiz overload oluşmaz.
+
+DROP FUNCTION IF EXISTS attendance_check_in(INTEGER, TEXT, DATE, TIME);
+
+CREATE FUNCTION attendance_check_in(
+    p_employee_id INTEGER,
+    p_location TEXT,
+    p_date DATE,
+    p_time TIME,
+    p_employee_name TEXT DEFAULT NULL
+) RETURNS TABLE (
+    status TEXT,
+    emp_name TEXT,
+    session_location TEXT,
+    session_start TIME,
+    session_duration TEXT
+) LANGUAGE plpgsql AS $$
+DECLARE
+    v_name TEXT;
+    v_id BIGINT;
+    v_location TEXT;
+    v_start TIME;
+    v_minutes INTEGER;
+BEGIN
+    -- İsim doğrulanmış token'dan geliyorsa personel tablosuna bakılmaz
+    -- (silinmiş personel için INSERT yabancı anahtar hatası verir, uygulama 404'e çevirir)
+    v_name := p_employee_name;
+    IF v_name IS NULL THEN
+        SELECT e.name INTO v_name FROM employees e WHERE e.id = p_employee_id;
+        IF NOT FOUND THEN
+            RETURN QUERY SELECT 'not_found'::TEXT, NULL::TEXT, NULL::TEXT, NULL::TIME, NULL::TEXT;
+            RETURN;
+        END IF;
+    END IF;
+
+    -- Aynı personelin eşzamanlı dokunuşları sıraya girer (çift açık oturum yarışı yok)
+    PERFORM pg_advisory_xact_lock(hashtext('attendance_check_in'), p_employee_id);
+
+    -- Önce bu bölgedeki, yoksa başka bölgedeki açık oturum
+    SELECT a.id, a.location, a.start_time INTO v_id, v_location, v_start
+    FROM attendance a
+    WHERE a.employee_id = p_employee_id AND a.date = p_date AND a.end_time IS NULL
+    ORDER BY (a.location = p_location) DESC, a.id
+    LIMIT 1;
+
+    IF v_id IS NULL THEN
+        -- GİRİŞ
+        INSERT INTO attendance (employee_id, employee_name, date, start_time, location)
+        VALUES (p_employee_id, v_name, p_date, p_time, p_location);
+        RETURN QUERY SELECT 'entry'::TEXT, v_name, p_location, p_time, NULL::TEXT;
+    ELSIF v_location IS DISTINCT FROM p_location THEN
+        RETURN QUERY SELECT 'elsewhere'::TEXT, v_name, v_location, v_start, NULL::TEXT;
+    ELSE
+        -- ÇIKIŞ (calculate_duration ile aynı biçim, gece yarısını geçen oturumlar dahil)
+        v_minutes := ((EXTRACT(EPOCH FROM (p_time - v_start)) / 60)::INTEGER + 1440) % 1440;
+        UPDATE attendance
+        SET end_time = p_time,
+            duration = format('%sh %sm', v_minutes / 60, v_minutes % 60),
+            duration_minutes = v_minutes
+        WHERE id = v_id;
+        RETURN QUERY SELECT 'exit'::TEXT, v_name, p_location, v_start,
+                            format('%sh %sm', v_minutes / 60, v_minutes % 60);
+    END IF;
+END;
+$$;
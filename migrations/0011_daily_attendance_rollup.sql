@@ -0,0 +1,75 @@
+-- Günlük özet: personel + bölge + gün başına toplam dakika ve kapanmış oturum sayısı.
+-- attendance trigger'ı ile artımlı güncellenir (check_in(), toplu senkron, elle düzeltmeler);
+-- attendance_rollup_rebuild() gün gün yeniden hesaplar (ilk doldurma ve onarım, bkz. flask rollup-attendance).
+
+--! transaction
+CREATE TABLE IF NOT EXISTS daily_attendance_rollup (
+    employee_id INTEGER NOT NULL,
+    location TEXT NOT NULL,
+    day DATE NOT NULL,
+    total_minutes INTEGER NOT NULL DEFAULT 0,
+    session_count INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    PRIMARY KEY (employee_id, day, location)
+);
+
+CREATE INDEX IF NOT EXISTS daily_attendance_rollup_day_idx
+    ON daily_attendance_rollup (day, employee_id)
+    INCLUDE (location, total_minutes, session_count);
+
+-- Kapanmış oturumun (duration_minutes dolu) katkısını ekle (+1) ya da geri al (-1)
+CREATE OR REPLACE FUNCTION attendance_rollup_apply(
+    p_employee_id INTEGER, p_location TEXT, p_day DATE, p_minutes INTEGER, p_sign INTEGER
+) RETURNS void LANGUAGE sql AS $$
+    INSERT INTO daily_attendance_rollup AS r (employee_id, location, day, total_minutes, session_count)
+    VALUES (p_employee_id, p_location, p_day, p_sign * p_minutes, p_sign)
+    ON CONFLICT (employee_id, day, location) DO UPDATE
+    SET total_minutes = r.total_minutes + EXCLUDED.total_minutes,
+        session_count = r.session_count + EXCLUDED.session_count,
+        updated_at = now();
+$$;
+
+CREATE OR REPLACE FUNCTION attendance_rollup_trigger() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.duration_minutes IS NOT NULL AND OLD.employee_id IS NOT NULL THEN
+        PERFORM attendance_rollup_apply(OLD.employee_id, OLD.location, OLD.date, OLD.duration_minutes, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.duration_minutes IS NOT NULL AND NEW.employee_id IS NOT NULL THEN
+        PERFORM attendance_rollup_apply(NEW.employee_id, NEW.location, NEW.date, NEW.duration_minutes, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+-- Gün gün yeniden hesapla; her gün ayrı transaction. EXCLUSIVE kilit o gün hesaplanırken
+-- trigger yazımlarını bekletir (okumaları değil): bekleyen yazım, yeniden hesaplanmış satıra eklenir.
+CREATE OR REPLACE PROCEDURE attendance_rollup_rebuild(p_from DATE DEFAULT NULL, p_to DATE DEFAULT NULL)
+LANGUAGE plpgsql AS $$
+DECLARE
+    v_day DATE;
+    v_to DATE;
+BEGIN
+    v_day := COALESCE(p_from, (SELECT MIN(date) FROM attendance));
+    v_to := COALESCE(p_to, (SELECT MAX(date) FROM attendance));
+    WHILE v_day IS NOT NULL AND v_day <= v_to LOOP
+        LOCK TABLE daily_attendance_rollup IN EXCLUSIVE MODE;
+        DELETE FROM daily_attendance_rollup WHERE day = v_day;
+        INSERT INTO daily_attendance_rollup (employee_id, location, day, total_minutes, session_count)
+        SELECT employee_id, location, date, SUM(duration_minutes), COUNT(*)
+        FROM attendance
+        WHERE date = v_day AND duration_minutes IS NOT NULL AND employee_id IS NOT NULL
+        GROUP BY employee_id, location, date;
+        COMMIT;
+        v_day := v_day + 1;
+    END LOOP;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS attendance_rollup ON attendance;
+CREATE TRIGGER attendance_rollup
+    AFTER INSERT OR UPDATE OF employee_id, location, date, duration_minutes OR DELETE ON attendance
+    FOR EACH ROW EXECUTE FUNCTION attendance_rollup_trigger();
+
+--! autocommit
+-- İlk doldurma; trigger zaten etkin olduğundan bu sırada kapanan oturumlar kaybolmaz
+CALL attendance_rollup_rebuild();
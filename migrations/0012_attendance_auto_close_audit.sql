@@ -0,0 +1,16 @@
+-- Süpürücünün (bkz. sweeper.py, flask sweep-sessions) kapattığı oturumlar için denetim kolonları.
+-- auto_closed_at: oturumun kapatıldığı gerçek an; end_time kuraldan hesaplanan saattir.
+-- auto_close_policy: uygulanan kural (ör. '23:59', '12h'). Personelin kendi çıkışlarında ikisi de NULL.
+
+--! transaction
+ALTER TABLE attendance ADD COLUMN IF NOT EXISTS auto_closed_at TIMESTAMPTZ;
+ALTER TABLE attendance ADD COLUMN IF NOT EXISTS auto_close_policy TEXT;
+
+--! autocommit
+DROP INDEX CONCURRENTLY IF EXISTS attendance_open_session_id_idx;
+
+--! autocommit
+-- Süpürücü açık oturumları id sırasıyla sınırlı sayfalarla gezer
+CREATE INDEX CONCURRENTLY attendance_open_session_id_idx
+    ON attendance (id)
+    WHERE end_time IS NULL;
@@ -0,0 +1,22 @@
+-- 'open' bildirimi giriş saatini de taşır: doluluk indeksi açık oturumun başlangıcını bilir
+-- (ertelenmiş yazma kuyruğu çıkış süresini veritabanına gitmeden hesaplar, bkz. checkin_queue.py).
+
+CREATE OR REPLACE FUNCTION attendance_notify_occupancy() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' AND NEW.end_time IS NULL THEN
+        PERFORM pg_notify('attendance_occupancy', json_build_object(
+            'op', 'open', 'employee_id', NEW.employee_id, 'location', NEW.location, 'date', NEW.date,
+            'start_time', NEW.start_time
+        )::TEXT);
+    ELSIF TG_OP = 'UPDATE' AND OLD.end_time IS NULL AND NEW.end_time IS NOT NULL THEN
+        PERFORM pg_notify('attendance_occupancy', json_build_object(
+            'op', 'close', 'employee_id', NEW.employee_id, 'location', NEW.location, 'date', NEW.date
+        )::TEXT);
+    ELSIF TG_OP = 'DELETE' AND OLD.end_time IS NULL THEN
+        PERFORM pg_notify('attendance_occupancy', json_build_object(
+            'op', 'close', 'employee_id', OLD.employee_id, 'location', OLD.location, 'date', OLD.date
+        )::TEXT);
+    END IF;
+    RETURN NULL;
+END;
+$$;
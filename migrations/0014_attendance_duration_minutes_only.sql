@@ -0,0 +1,84 @@
+-- Süre yalnızca tam sayı dakika olarak tutulur (duration_minutes); "7h 30m" metni yanıt/çıktı
+-- üretilirken app.format_duration() ile oluşturulur. duration metin kolonu eski kayıtlar için
+-- kalır, yeni kayıtlarda yazılmaz.
+
+--! batch
+-- Dakikası hesaplanamamış (başlangıç/bitiş saati olmayan) eski kayıtlar: metinden toplu dönüşüm
+UPDATE attendance
+SET duration_minutes = substring(duration FROM '^(\d+)h')::INTEGER * 60
+                     + substring(duration FROM ' (\d+)m$')::INTEGER
+WHERE id IN (
+    SELECT id FROM attendance
+    WHERE id > %(after)s
+      AND duration_minutes IS NULL AND duration ~ '^\d+h \d+m$'
+    ORDER BY id
+    LIMIT %(batch_size)s
+)
+RETURNING id;
+
+--! transaction
+COMMENT ON COLUMN attendance.duration IS 'Eski metin süre ("7h 30m"); artık yazılmıyor, duration_minutes kullanın';
+
+-- Dönüş tipi değiştiği için fonksiyon yeniden oluşturulur: session_duration TEXT → session_minutes INTEGER
+DROP FUNCTION IF EXISTS attendance_check_in(INTEGER, TEXT, DATE, TIME, TEXT);
+
+CREATE FUNCTION attendance_check_in(
+    p_employee_id INTEGER,
+    p_location TEXT,
+    p_date DATE,
+    p_time TIME,
+    p_employee_name TEXT DEFAULT NULL
+) RETURNS TABLE (
+    status TEXT,
+    emp_name TEXT,
+    session_location TEXT,
+    session_start TIME,
+    session_minutes INTEGER
+) LANGUAGE plpgsql AS $$
+DECLARE
+    v_name TEXT;
+    v_id BIGINT;
+    v_location TEXT;
+    v_date DATE;
+    v_start TIME;
+    v_minutes INTEGER;
+BEGIN
+    -- İsim doğrulanmış token'dan geliyorsa personel tablosuna bakılmaz
+    -- (silinmiş personel için INSERT yabancı anahtar hatası verir, uygulama 404'e çevirir)
+    v_name := p_employee_name;
+    IF v_name IS NULL THEN
+        SELECT e.name INTO v_name FROM employees e WHERE e.id = p_employee_id;
+        IF NOT FOUND THEN
+            RETURN QUERY SELECT 'not_found'::TEXT, NULL::TEXT, NULL::TEXT, NULL::TIME, NULL::INTEGER;
+            RETURN;
+        END IF;
+    END IF;
+
+    -- Aynı personelin eşzamanlı dokunuşları sıraya girer (çift açık oturum yarışı yok)
+    PERFORM pg_advisory_xact_lock(hashtext('attendance_check_in'), p_employee_id);
+
+    -- Önce bu bölgedeki, yoksa başka bölgedeki açık oturum
+    SELECT a.id, a.location, a.date, a.start_time INTO v_id, v_location, v_date, v_start
+    FROM attendance a
+    WHERE a.employee_id = p_employee_id AND a.date = p_date AND a.end_time IS NULL
+    ORDER BY (a.location = p_location) DESC, a.id
+    LIMIT 1;
+
+    IF v_id IS NULL THEN
+        -- GİRİŞ
+        INSERT INTO attendance (employee_id, employee_name, date, start_time, location)
+        VALUES (p_employee_id, v_name, p_date, p_time, p_location);
+        RETURN QUERY SELECT 'entry'::TEXT, v_name, p_location, p_time, NULL::INTEGER;
+    ELSIF v_location IS DISTINCT FROM p_location THEN
+        RETURN QUERY SELECT 'elsewhere'::TEXT, v_name, v_location, v_start, NULL::INTEGER;
+    ELSE
+        -- ÇIKIŞ: süre gerçek zaman damgalarından (oturumun günü + saat), gece yarısı dahil
+        v_minutes := (EXTRACT(EPOCH FROM ((p_date + p_time) - (v_date + v_start))) / 60)::INTEGER;
+        UPDATE attendance
+        SET end_time = p_time,
+            duration_minutes = v_minutes
+        WHERE id = v_id;
+        RETURN QUERY SELECT 'exit'::TEXT, v_name, p_location, v_start, v_minutes;
+    END IF;
+END;
+$$;
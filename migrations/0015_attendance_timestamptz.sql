@@ -0,0 +1,114 @@
+-- Giriş/çıkış anları TIMESTAMPTZ olarak tutulur (started_at, ended_at). date / start_time / end_time
+-- site saat dilimindeki (SITE_TIMEZONE, varsayılan Europe/Berlin) gün ve saattir; attendance_check_in()
+-- bunları veritabanında p_at AT TIME ZONE p_timezone ile üretir, böylece gece yarısındaki bir dokunuşun
+-- günü ve saati aynı andan gelir ve açık oturum araması (employee_id, date) indeksini kullanır.
+--
+-- Eski kayıtların date/start_time değerleri olduğu gibi kalır ve Europe/Berlin duvar saati kabul edilir.
+-- Eski kayıtlar sunucu saatiyle (UTC) yazıldıysa ve düzeltilmek isteniyorsa elle:
+--   UPDATE attendance SET started_at = (date + start_time) AT TIME ZONE 'UTC', ... WHERE ...;
+
+--! transaction
+ALTER TABLE attendance ADD COLUMN IF NOT EXISTS started_at TIMESTAMPTZ;
+ALTER TABLE attendance ADD COLUMN IF NOT EXISTS ended_at TIMESTAMPTZ;
+
+CREATE OR REPLACE FUNCTION attendance_check_in(
+    p_employee_id INTEGER,
+    p_location TEXT,
+    p_at TIMESTAMPTZ,
+    p_timezone TEXT,
+    p_employee_name TEXT DEFAULT NULL
+) RETURNS TABLE (
+    status TEXT,
+    emp_name TEXT,
+    session_location TEXT,
+    session_start TIME,
+    session_minutes INTEGER
+) LANGUAGE plpgsql AS $$
+DECLARE
+    v_local TIMESTAMP := p_at AT TIME ZONE p_timezone;
+    v_name TEXT;
+    v_id BIGINT;
+    v_location TEXT;
+    v_start TIME;
+    v_started_at TIMESTAMPTZ;
+    v_minutes INTEGER;
+BEGIN
+    -- İsim doğrulanmış token'dan geliyorsa personel tablosuna bakılmaz
+    -- (silinmiş personel için INSERT yabancı anahtar hatası verir, uygulama 404'e çevirir)
+    v_name := p_employee_name;
+    IF v_name IS NULL THEN
+        SELECT e.name INTO v_name FROM employees e WHERE e.id = p_employee_id;
+        IF NOT FOUND THEN
+            RETURN QUERY SELECT 'not_found'::TEXT, NULL::TEXT, NULL::TEXT, NULL::TIME, NULL::INTEGER;
+            RETURN;
+        END IF;
+    END IF;
+
+    -- Aynı personelin eşzamanlı dokunuşları sıraya girer (çift açık oturum yarışı yok)
+    PERFORM pg_advisory_xact_lock(hashtext('attendance_check_in'), p_employee_id);
+
+    -- Önce bu bölgedeki, yoksa başka bölgedeki açık oturum (site gününe göre)
+    SELECT a.id, a.location, a.start_time,
+           COALESCE(a.started_at, (a.date + a.start_time) AT TIME ZONE p_timezone)
+    INTO v_id, v_location, v_start, v_started_at
+    FROM attendance a
+    WHERE a.employee_id = p_employee_id AND a.date = v_local::DATE AND a.end_time IS NULL
+    ORDER BY (a.location = p_location) DESC, a.id
+    LIMIT 1;
+
+    IF v_id IS NULL THEN
+        -- GİRİŞ
+        INSERT INTO attendance (employee_id, employee_name, date, start_time, started_at, location)
+        VALUES (p_employee_id, v_name, v_local::DATE, v_local::TIME, p_at, p_location);
+        RETURN QUERY SELECT 'entry'::TEXT, v_name, p_location, v_local::TIME, NULL::INTEGER;
+    ELSIF v_location IS DISTINCT FROM p_location THEN
+        RETURN QUERY SELECT 'elsewhere'::TEXT, v_name, v_location, v_start, NULL::INTEGER;
+    ELSE
+        -- ÇIKIŞ: süre iki gerçek an arasından (gece yarısı ve yaz saati geçişleri dahil)
+        v_minutes := floor(EXTRACT(EPOCH FROM (p_at - v_started_at)) / 60)::INTEGER;
+        UPDATE attendance
+        SET end_time = v_local::TIME,
+            ended_at = p_at,
+            duration_minutes = v_minutes
+        WHERE id = v_id;
+        RETURN QUERY SELECT 'exit'::TEXT, v_name, p_location, v_start, v_minutes;
+    END IF;
+END;
+$$;
+
+-- Deploy sırasında hâlâ (tarih, saat) gönderen eski sürüm için: değerleri site saati kabul et
+CREATE OR REPLACE FUNCTION attendance_check_in(
+    p_employee_id INTEGER,
+    p_location TEXT,
+    p_date DATE,
+    p_time TIME,
+    p_employee_name TEXT DEFAULT NULL
+) RETURNS TABLE (
+    status TEXT,
+    emp_name TEXT,
+    session_location TEXT,
+    session_start TIME,
+    session_minutes INTEGER
+) LANGUAGE sql AS $$
+    SELECT * FROM attendance_check_in(
+        p_employee_id, p_location, (p_date + p_time) AT TIME ZONE 'Europe/Berlin', 'Europe/Berlin'::TEXT, p_employee_name
+    );
+$$;
+
+--! batch
+UPDATE attendance
+SET started_at = (date + start_time) AT TIME ZONE 'Europe/Berlin',
+    ended_at = CASE WHEN end_time IS NOT NULL THEN
+        (date + start_time + make_interval(mins => COALESCE(
+            duration_minutes,
+            ((EXTRACT(EPOCH FROM (end_time - start_time)) / 60)::INTEGER + 1440) %% 1440
+        ))) AT TIME ZONE 'Europe/Berlin'
+    END
+WHERE id IN (
+    SELECT id FROM attendance
+    WHERE id > %(after)s
+      AND started_at IS NULL AND date IS NOT NULL AND start_time IS NOT NULL
+    ORDER BY id
+    LIMIT %(batch_size)s
+)
+RETURNING id;
@@ -0,0 +1,192 @@
+-- attendance aylık RANGE (date) bölümlü tabloya dönüştürülür; canlı tabloda veri kopyalanmaz.
+-- Mevcut tablo olduğu gibi ilk bölüm olur (attendance_legacy: en eskiden, migration ayı ve ertesi
+-- ay dahil). Sonraki aylar için bölümleri
+-- attendance_ensure_partitions() açar (bkz. flask attendance-partitions ve app.maintain_partitions).
+--
+-- Kilitler: sınır CHECK'i NOT VALID eklenip ayrı adımda doğrulanır ve (id, date) benzersiz indeksi
+-- CONCURRENTLY kurulur; böylece son adımdaki SET NOT NULL ve ATTACH PARTITION tabloyu taramaz,
+-- ACCESS EXCLUSIVE kilit yalnızca katalog değişiklikleri süresince tutulur.
+
+--! batch
+-- Bölüm anahtarı boş olamaz: tarihi olmayan eski kayıtlara oluşturulma günü
+UPDATE attendance
+SET date = COALESCE(created_at::DATE, DATE '1970-01-01')
+WHERE id IN (
+    SELECT id FROM attendance
+    WHERE id > %(after)s AND date IS NULL
+    ORDER BY id
+    LIMIT %(batch_size)s
+)
+RETURNING id;
+
+--! transaction
+-- Aylık bölüm oluşturucu: bu aydan p_months_ahead ay sonrasına kadar eksik olanlar (açılanların adları döner)
+CREATE OR REPLACE FUNCTION attendance_ensure_partitions(p_months_ahead INTEGER DEFAULT 3)
+RETURNS SETOF TEXT LANGUAGE plpgsql AS $$
+DECLARE
+    v_month DATE := date_trunc('month', current_date)::DATE;
+    v_last DATE := (date_trunc('month', current_date) + make_interval(months => p_months_ahead))::DATE;
+    v_name TEXT;
+BEGIN
+    WHILE v_month <= v_last LOOP
+        v_name := format('attendance_%s', to_char(v_month, 'YYYY_MM'));
+        IF to_regclass(v_name) IS NULL THEN
+            BEGIN
+                EXECUTE format('CREATE TABLE %I PARTITION OF attendance FOR VALUES FROM (%L) TO (%L)',
+                               v_name, v_month, (v_month + INTERVAL '1 month')::DATE);
+                RETURN NEXT v_name;
+            EXCEPTION
+                -- Ay başka bir bölümün (ör. attendance_legacy) aralığında ya da başka worker açtı
+                WHEN invalid_object_definition OR duplicate_table THEN NULL;
+            END;
+        END IF;
+        v_month := (v_month + INTERVAL '1 month')::DATE;
+    END LOOP;
+END;
+$$;
+
+DO $$
+BEGIN
+    IF (SELECT relkind FROM pg_class WHERE oid = 'attendance'::regclass) = 'r'
+       AND NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'attendance_partition_bound') THEN
+        -- Yeni satırlar için hemen geçerli; mevcut satırlar sonraki adımda kilitsiz doğrulanır.
+        -- Sınır iki ay ileride: son adım ay sonunda başarısız olup geç tekrarlansa da check-in'ler reddedilmez
+        EXECUTE format(
+            'ALTER TABLE attendance ADD CONSTRAINT attendance_partition_bound CHECK (date IS NOT NULL AND date < %L) NOT VALID',
+            (date_trunc('month', current_date) + INTERVAL '2 months')::DATE
+        );
+    END IF;
+END;
+$$;
+
+--! autocommit
+ALTER TABLE attendance VALIDATE CONSTRAINT attendance_partition_bound;
+
+--! autocommit
+DROP INDEX CONCURRENTLY IF EXISTS attendance_id_date_uidx;
+
+--! autocommit
+-- Bölümlü tablonun birincil anahtarı (id, date); ATTACH sırasında bu indeks kullanılır
+CREATE UNIQUE INDEX CONCURRENTLY attendance_id_date_uidx ON attendance (id, date);
+
+--! transaction
+DO $$
+DECLARE
+    v_bound DATE;
+    v_sequence TEXT := pg_get_serial_sequence('attendance', 'id');
+BEGIN
+    SET LOCAL lock_timeout = '10s';
+    LOCK TABLE attendance IN ACCESS EXCLUSIVE MODE;
+
+    SELECT (regexp_match(pg_get_constraintdef(oid), '(\d{4}-\d{2}-\d{2})'))[1]::DATE INTO v_bound
+    FROM pg_constraint WHERE conname = 'attendance_partition_bound';
+
+    -- Doğrulanmış CHECK sayesinde tarama yapılmaz
+    ALTER TABLE attendance ALTER COLUMN date SET NOT NULL;
+
+    -- Birincil anahtar (id, date) olur; ATTACH, üst tablonun anahtarına karşılık kısıt ister
+    -- (attendance.id'ye yabancı anahtar yok, checkin_events.attendance_id yalnızca kayıt)
+    ALTER TABLE attendance DROP CONSTRAINT attendance_pkey;
+    ALTER TABLE attendance ADD CONSTRAINT attendance_legacy_pkey PRIMARY KEY USING INDEX attendance_id_date_uidx;
+
+    ALTER TABLE attendance RENAME TO attendance_legacy;
+    ALTER INDEX attendance_open_session_idx RENAME TO attendance_legacy_open_session_idx;
+    ALTER INDEX attendance_one_open_session_uidx RENAME TO attendance_legacy_one_open_session_uidx;
+    ALTER INDEX attendance_date_employee_idx RENAME TO attendance_legacy_date_employee_idx;
+    ALTER INDEX attendance_open_session_id_idx RENAME TO attendance_legacy_open_session_id_idx;
+
+    -- Trigger'lar üst tabloda tanımlanır, tüm bölümlere uygulanır
+    DROP TRIGGER attendance_notify_occupancy ON attendance_legacy;
+    DROP TRIGGER attendance_rollup ON attendance_legacy;
+
+    CREATE TABLE attendance (LIKE attendance_legacy INCLUDING DEFAULTS INCLUDING STORAGE INCLUDING COMMENTS)
+        PARTITION BY RANGE (date);
+    ALTER TABLE attendance ADD PRIMARY KEY (id, date);
+    ALTER TABLE attendance ADD FOREIGN KEY (employee_id) REFERENCES employees(id);
+    EXECUTE format('ALTER SEQUENCE %s OWNED BY attendance.id', v_sequence);
+
+    -- Eski tablodaki indekslerle aynı tanımlar: ATTACH onları yeniden kurmadan bağlar
+    CREATE INDEX attendance_open_session_idx ON attendance (employee_id, date, location) WHERE end_time IS NULL;
+    CREATE UNIQUE INDEX attendance_one_open_session_uidx ON attendance (employee_id, date) WHERE end_time IS NULL;
+    CREATE INDEX attendance_date_employee_idx ON attendance (date, employee_id) INCLUDE (location, duration_minutes);
+    CREATE INDEX attendance_open_session_id_idx ON attendance (id) WHERE end_time IS NULL;
+
+    CREATE TRIGGER attendance_notify_occupancy
+        AFTER INSERT OR UPDATE OF end_time OR DELETE ON attendance
+        FOR EACH ROW EXECUTE FUNCTION attendance_notify_occupancy();
+    CREATE TRIGGER attendance_rollup
+        AFTER INSERT OR UPDATE OF employee_id, location, date, duration_minutes OR DELETE ON attendance
+        FOR EACH ROW EXECUTE FUNCTION attendance_rollup_trigger();
+
+    EXECUTE format('ALTER TABLE attendance ATTACH PARTITION attendance_legacy FOR VALUES FROM (MINVALUE) TO (%L)', v_bound);
+    ALTER TABLE attendance_legacy DROP CONSTRAINT attendance_partition_bound;
+
+    PERFORM attendance_ensure_partitions(3);
+END;
+$$;
+
+-- Çıkış güncellemesi de bölümü (date) belirtir: id ile arama tüm bölümlere gitmez
+CREATE OR REPLACE FUNCTION attendance_check_in(
+    p_employee_id INTEGER,
+    p_location TEXT,
+    p_at TIMESTAMPTZ,
+    p_timezone TEXT,
+    p_employee_name TEXT DEFAULT NULL
+) RETURNS TABLE (
+    status TEXT,
+    emp_name TEXT,
+    session_location TEXT,
+    session_start TIME,
+    session_minutes INTEGER
+) LANGUAGE plpgsql AS $$
+DECLARE
+    v_local TIMESTAMP := p_at AT TIME ZONE p_timezone;
+    v_name TEXT;
+    v_id BIGINT;
+    v_location TEXT;
+    v_start TIME;
+    v_started_at TIMESTAMPTZ;
+    v_minutes INTEGER;
+BEGIN
+    -- İsim doğrulanmış token'dan geliyorsa personel tablosuna bakılmaz
+    -- (silinmiş personel için INSERT yabancı anahtar hatası verir, uygulama 404'e çevirir)
+    v_name := p_employee_name;
+    IF v_name IS NULL THEN
+        SELECT e.name INTO v_name FROM employees e WHERE e.id = p_employee_id;
+        IF NOT FOUND THEN
+            RETURN QUERY SELECT 'not_found'::TEXT, NULL::TEXT, NULL::TEXT, NULL::TIME, NULL::INTEGER;
+            RETURN;
+        END IF;
+    END IF;
+
+    -- Aynı personelin eşzamanlı dokunuşları sıraya girer (çift açık oturum yarışı yok)
+    PERFORM pg_advisory_xact_lock(hashtext('attendance_check_in'), p_employee_id);
+
+    -- Önce bu bölgedeki, yoksa başka bölgedeki açık oturum (site gününe göre; yalnızca bu ayın bölümü)
+    SELECT a.id, a.location, a.start_time,
+           COALESCE(a.started_at, (a.date + a.start_time) AT TIME ZONE p_timezone)
+    INTO v_id, v_location, v_start, v_started_at
+    FROM attendance a
+    WHERE a.employee_id = p_employee_id AND a.date = v_local::DATE AND a.end_time IS NULL
+    ORDER BY (a.location = p_location) DESC, a.id
+    LIMIT 1;
+
+    IF v_id IS NULL THEN
+        -- GİRİŞ
+        INSERT INTO attendance (employee_id, employee_name, date, start_time, started_at, location)
+        VALUES (p_employee_id, v_name, v_local::DATE, v_local::TIME, p_at, p_location);
+        RETURN QUERY SELECT 'entry'::TEXT, v_name, p_location, v_local::TIME, NULL::INTEGER;
+    ELSIF v_location IS DISTINCT FROM p_location THEN
+        RETURN QUERY SELECT 'elsewhere'::TEXT, v_name, v_location, v_start, NULL::INTEGER;
+    ELSE
+        -- ÇIKIŞ: süre iki gerçek an arasından (gece yarısı ve yaz saati geçişleri dahil)
+        v_minutes := floor(EXTRACT(EPOCH FROM (p_at - v_started_at)) / 60)::INTEGER;
+        UPDATE attendance
+        SET end_time = v_local::TIME,
+            ended_at = p_at,
+            duration_minutes = v_minutes
+        WHERE id = v_id AND date = v_local::DATE;
+        RETURN QUERY SELECT 'exit'::TEXT, v_name, p_location, v_start, v_minutes;
+    END IF;
+END;
+$$;
@@ -0,0 +1,76 @@
+-- Gece yarısını geçen oturumlar: çıkış dokunuşu açık oturumu bugünün tarihiyle değil, son 24 saat
+-- içinde açılmış olmasıyla bulur (sweeper.MAX_SESSION; otomatik kapatma kuralları bunu aşamaz) ve
+-- oturumu kendi gününde (bölüm anahtarı) kapatır. Önceden ikinci dokunuş yeni oturum açıyor, dünkü
+-- oturum süpürücüye kalıyordu. Arama en fazla iki günün (iki bölümün) açık oturum indeksine gider.
+
+--! transaction
+CREATE OR REPLACE FUNCTION attendance_check_in(
+    p_employee_id INTEGER,
+    p_location TEXT,
+    p_at TIMESTAMPTZ,
+    p_timezone TEXT,
+    p_employee_name TEXT DEFAULT NULL
+) RETURNS TABLE (
+    status TEXT,
+    emp_name TEXT,
+    session_location TEXT,
+    session_start TIME,
+    session_minutes INTEGER
+) LANGUAGE plpgsql AS $$
+DECLARE
+    v_local TIMESTAMP := p_at AT TIME ZONE p_timezone;
+    v_name TEXT;
+    v_id BIGINT;
+    v_date DATE;
+    v_location TEXT;
+    v_start TIME;
+    v_started_at TIMESTAMPTZ;
+    v_minutes INTEGER;
+BEGIN
+    -- İsim doğrulanmış token'dan geliyorsa personel tablosuna bakılmaz
+    -- (silinmiş personel için INSERT yabancı anahtar hatası verir, uygulama 404'e çevirir)
+    v_name := p_employee_name;
+    IF v_name IS NULL THEN
+        SELECT e.name INTO v_name FROM employees e WHERE e.id = p_employee_id;
+        IF NOT FOUND THEN
+            RETURN QUERY SELECT 'not_found'::TEXT, NULL::TEXT, NULL::TEXT, NULL::TIME, NULL::INTEGER;
+            RETURN;
+        END IF;
+    END IF;
+
+    -- Aynı personelin eşzamanlı dokunuşları sıraya girer (çift açık oturum yarışı yok)
+    PERFORM pg_advisory_xact_lock(hashtext('attendance_check_in'), p_employee_id);
+
+    -- Son 24 saatte açılmış açık oturum: önce bu bölgedeki, sonra en yenisi
+    SELECT a.id, a.date, a.location, a.start_time, s.started_at
+    INTO v_id, v_date, v_location, v_start, v_started_at
+    FROM attendance a
+    CROSS JOIN LATERAL (
+        SELECT COALESCE(a.started_at, (a.date + a.start_time) AT TIME ZONE p_timezone) AS started_at
+    ) s
+    WHERE a.employee_id = p_employee_id
+      AND a.date BETWEEN v_local::DATE - 1 AND v_local::DATE
+      AND a.end_time IS NULL
+      AND s.started_at > p_at - INTERVAL '24 hours'
+    ORDER BY (a.location = p_location) DESC, s.started_at DESC
+    LIMIT 1;
+
+    IF v_id IS NULL THEN
+        -- GİRİŞ
+        INSERT INTO attendance (employee_id, employee_name, date, start_time, started_at, location)
+        VALUES (p_employee_id, v_name, v_local::DATE, v_local::TIME, p_at, p_location);
+        RETURN QUERY SELECT 'entry'::TEXT, v_name, p_location, v_local::TIME, NULL::INTEGER;
+    ELSIF v_location IS DISTINCT FROM p_location THEN
+        RETURN QUERY SELECT 'elsewhere'::TEXT, v_name, v_location, v_start, NULL::INTEGER;
+    ELSE
+        -- ÇIKIŞ: süre iki gerçek an arasından (gece yarısı ve yaz saati geçişleri dahil)
+        v_minutes := floor(EXTRACT(EPOCH FROM (p_at - v_started_at)) / 60)::INTEGER;
+        UPDATE attendance
+        SET end_time = v_local::TIME,
+            ended_at = p_at,
+            duration_minutes = v_minutes
+        WHERE id = v_id AND date = v_date;
+        RETURN QUERY SELECT 'exit'::TEXT, v_name, p_location, v_start, v_minutes;
+    END IF;
+END;
+$$;
@@ -0,0 +1,37 @@
+-- Bölgesi ya da tarihi olmayan eski attendance satırları günlük özete girmez. Özetin anahtarı
+-- (employee_id, day, location) boş olamaz; 0011'in trigger'ı ve attendance_rollup_rebuild() bu
+-- satırlarda hata veriyordu (0011'in ilk doldurması, 0016'nın tarih doldurması, süpürücü ve elle
+-- düzeltmeler). Koruma özet tablosundadır: anahtarı eksik satır sessizce atlanır, böylece trigger
+-- ile yeniden hesaplama aynı sonucu verir. Tarihi sonradan doldurulan kapanmış oturum özete yeni
+-- günüyle girer.
+--
+-- 0011 henüz uygulanmamışsa bu dosya ondan önce çalışır; tablo burada açılır, 0011'in
+-- CREATE ... IF NOT EXISTS komutları onu olduğu gibi bırakır.
+--! before 0011
+
+--! transaction
+CREATE TABLE IF NOT EXISTS daily_attendance_rollup (
+    employee_id INTEGER NOT NULL,
+    location TEXT NOT NULL,
+    day DATE NOT NULL,
+    total_minutes INTEGER NOT NULL DEFAULT 0,
+    session_count INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    PRIMARY KEY (employee_id, day, location)
+);
+
+-- BEFORE trigger NULL döndürünce satır (ON CONFLICT güncellemesi dahil) yazılmaz;
+-- NOT NULL kısıtları trigger'dan sonra denetlenir
+CREATE OR REPLACE FUNCTION daily_attendance_rollup_skip_incomplete() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF NEW.employee_id IS NULL OR NEW.location IS NULL OR NEW.day IS NULL THEN
+        RETURN NULL;
+    END IF;
+    RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS daily_attendance_rollup_skip_incomplete ON daily_attendance_rollup;
+CREATE TRIGGER daily_attendance_rollup_skip_incomplete
+    BEFORE INSERT ON daily_attendance_rollup
+    FOR EACH ROW EXECUTE FUNCTION daily_attendance_rollup_skip_incomplete();
@@ -0,0 +1,76 @@
+-- 0016 eski tabloyu attendance_legacy olarak en eskiden migration ayının iki ay sonrasına kadar
+-- bağlıyordu; ertesi ay da aylık bölüm yerine eski bölüme yazılıyordu. Üst sınır, içindeki son
+-- satırın ayının ve bugünün sonuna çekilir; sonraki aylar attendance_ensure_partitions() ile
+-- açılan aylık bölümlere yazılır ve tek tek ayrılabilir. Bugün eski bölümün son ayını geçmişse
+-- sınır zaten doğrudur, değişiklik yapılmaz. Eski bölümdeki aylar taşınmaz: bölüm, tüm ayları
+-- saklama süresini geçince bir bütün olarak ayrılır (flask attendance-partitions --detach-before).
+--
+-- Bölüm sınırı değiştirilemez; eski bölüm ayrılıp yeni sınırla yeniden bağlanır. Sınır önce
+-- NOT VALID CHECK olarak eklenip kilitsiz doğrulanır, son adımdaki ATTACH tabloyu taramaz.
+
+--! transaction
+DO $$
+DECLARE
+    v_upper DATE;
+    v_target DATE;
+BEGIN
+    SELECT (regexp_match(pg_get_expr(c.relpartbound, c.oid), 'TO \(''(\d{4}-\d{2}-\d{2})''\)'))[1]::DATE
+    INTO v_upper
+    FROM pg_class c
+    WHERE c.oid = to_regclass('attendance_legacy') AND c.relispartition;
+    IF v_upper IS NULL THEN
+        -- Eski bölüm yok ya da elle ayrılmış
+        RETURN;
+    END IF;
+
+    -- Ayın son günü çalışırsa bir ay daha bırakılır: kısıt doğrulanırken ay dönerse
+    -- yeni ayın check-in'leri kısıta takılırdı
+    SELECT (date_trunc('month', GREATEST(MAX(date), current_date + 1)) + INTERVAL '1 month')::DATE
+    INTO v_target
+    FROM attendance_legacy;
+
+    IF v_target < v_upper
+       AND NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'attendance_legacy_bound') THEN
+        EXECUTE format(
+            'ALTER TABLE attendance_legacy ADD CONSTRAINT attendance_legacy_bound CHECK (date < %L) NOT VALID',
+            v_target
+        );
+    END IF;
+END;
+$$;
+
+--! transaction
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'attendance_legacy_bound') THEN
+        ALTER TABLE attendance_legacy VALIDATE CONSTRAINT attendance_legacy_bound;
+    END IF;
+END;
+$$;
+
+--! transaction
+DO $$
+DECLARE
+    v_bound DATE;
+BEGIN
+    SELECT (regexp_match(pg_get_constraintdef(oid), '(\d{4}-\d{2}-\d{2})'))[1]::DATE INTO v_bound
+    FROM pg_constraint WHERE conname = 'attendance_legacy_bound';
+    IF v_bound IS NULL THEN
+        RETURN;
+    END IF;
+
+    SET LOCAL lock_timeout = '10s';
+    LOCK TABLE attendance IN ACCESS EXCLUSIVE MODE;
+
+    -- Doğrulanmış CHECK sayesinde ATTACH tarama yapmaz; indeksler, trigger'lar ve yabancı
+    -- anahtar yeniden bağlanır
+    IF current_date < v_bound THEN
+        ALTER TABLE attendance DETACH PARTITION attendance_legacy;
+        EXECUTE format('ALTER TABLE attendance ATTACH PARTITION attendance_legacy FOR VALUES FROM (MINVALUE) TO (%L)', v_bound);
+    END IF;
+    ALTER TABLE attendance_legacy DROP CONSTRAINT attendance_legacy_bound;
+
+    -- Eski bölümden çıkan aylar
+    PERFORM attendance_ensure_partitions(3);
+END;
+$$;
@@ -0,0 +1,127 @@
+"""
+"Şu an sahada kim var" için süreç içi açık oturum indeksi.
+
+İndeks açık oturumları employee_id → bölge (ve giriş günü/saati) olarak
+tutar; dün açılıp gece yarısını geçen oturumlar da sahadadır, daha eskiler
+gün dönümünde düşer. check_in() kendi sonucunu hemen uygular; diğer worker'ların yazdıkları attendance
+trigger'ının NOTIFY'ı ile gelir (bkz. migrations/0008). Periyodik
+reconcile() tabloyla tam eşitleme yapar, kaçan bildirimleri ve gün
+dönümünü düzeltir.
+"""
+import json
+import threading
+import time
+from datetime import date, datetime, time as time_type, timedelta
+
+KNOWN_LOCATIONS = ('Mitte', 'Spandau', 'Steglitz', 'Neukölln', 'Charlottenburg')
+
+
+class OccupancyIndex:
+    def __init__(self, locations=KNOWN_LOCATIONS, today=date.today):
+        self.locations = tuple(locations)
+        # Gün dönümü site saatine göre (app.site_today)
+        self._today = today
+        self._sessions = {}
+        self._starts = {}
+        self._days = {}
+        self._day = today()
+        self._version = 0
+        self._reconciled_at = None
+        self._updated_at = None
+        self._changed = threading.Condition()
+
+    def _bump(self):
+        self._version += 1
+        self._updated_at = datetime.now()
+        self._changed.notify_all()
+
+    def _roll_day(self, today):
+        if today != self._day:
+            self._day = today
+            stale = [employee_id for employee_id, day in self._days.items() if day < today - timedelta(days=1)]
+            for employee_id in stale:
+                self._sessions.pop(employee_id, None)
+                self._starts.pop(employee_id, None)
+                self._days.pop(employee_id, None)
+
+    def open(self, employee_id, location, day=None, start=None):
+        today = self._today()
+        day = day or today
+        with self._changed:
+            self._roll_day(today)
+            # Dünden eski ya da bilinen oturumdan eski açılış (geç gelen bildirim) yok sayılır
+            if day < today - timedelta(days=1) or day < self._days.get(employee_id, day):
+                return
+            self._starts[employee_id] = start
+            self._days[employee_id] = day
+            if self._sessions.get(employee_id) != location:
+                self._sessions[employee_id] = location
+                self._bump()
+
+    def close(self, employee_id, day=None):
+        with self._changed:
+            self._roll_day(self._today())
+            if day is not None and self._days.get(employee_id) != day:
+                return
+            if self._sessions.pop(employee_id, None) is not None:
+                self._starts.pop(employee_id, None)
+                self._days.pop(employee_id, None)
+                self._bump()
+
+    def session(self, employee_id):
+        """Açık oturum (bölge, giriş saati, gün) ya da None; giriş saati bilinmiyorsa None olabilir"""
+        with self._changed:
+            self._roll_day(self._today())
+            location = self._sessions.get(employee_id)
+            if location is None:
+                return None
+            return location, self._starts.get(employee_id), self._days.get(employee_id)
+
+    def apply_notification(self, payload):
+        """attendance_occupancy kanalından gelen JSON bildirimi uygula"""
+        event = json.loads(payload)
+        day = date.fromisoformat(event['date']) if event.get('date') else None
+        if event['op'] == 'open':
+            start = time_type.fromisoformat(event['start_time']) if event.get('start_time') else None
+            self.open(event['employee_id'], event['location'], day, start)
+        else:
+            self.close(event['employee_id'], day)
+
+    def replace(self, rows, day):
+        """Tablodan (gün sırasıyla) okunan (employee_id, location, start_time, date) satırlarıyla
+        indeksi baştan kur; personelin birden fazla açık oturumu varsa en yenisi kalır"""
+        sessions = {employee_id: location for employee_id, location, _, _ in rows}
+        with self._changed:
+            self._starts = {employee_id: start for employee_id, _, start, _ in rows}
+            self._days = {employee_id: session_day for employee_id, _, _, session_day in rows}
+            self._day = day
+            self._reconciled_at = datetime.now()
+            if sessions != self._sessions:
+                self._sessions = sessions
+                self._bump()
+
+    def snapshot(self):
+        with self._changed:
+            self._roll_day(self._today())
+            counts = dict.fromkeys(self.locations, 0)
+            for location in self._sessions.values():
+                counts[location] = counts.get(location, 0) + 1
+            return {
+                'date': self._day.isoformat(),
+                'version': self._version,
+                'total': len(self._sessions),
+                'locations': [{'location': location, 'count': count} for location, count in counts.items()],
+                'updated_at': self._updated_at.isoformat(timespec='seconds') if self._updated_at else None,
+                'reconciled_at': self._reconciled_at.isoformat(timespec='seconds') if self._reconciled_at else None
+            }
+
+    def wait_for_change(self, version, timeout):
+        """Sürüm `version`dan farklı olana ya da süre dolana kadar bekle; güncel sürümü döndür"""
+        deadline = time.monotonic() + timeout
+        with self._changed:
+            while self._version == version:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._changed.wait(remaining)
+            return self._version
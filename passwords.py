@@ -0,0 +1,154 @@
+"""
+Şifre hash'leme.
+
+Hash dizeleri sürümlüdür: "<şema>$<parametreler>$<salt>$<hash>". Böylece maliyet
+sonradan artırılabilir; eski parametreli veya eski şemalı (tuzsuz SHA-256)
+hash'ler başarılı girişte needs_rehash() ile tespit edilip yenilenir.
+
+scrypt hesaplaması GIL'i bırakır; işler sınırlı bir thread havuzunda yapılır,
+havuz ve kuyruğu doluysa HashingBusy fırlatılır (istek 503 ile reddedilir),
+böylece sabah yoğunluğunda worker'lar hash kuyruğunda sonsuza kadar beklemez.
+"""
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+PASSWORD_HASHER = os.getenv('PASSWORD_HASHER', 'scrypt')
+# N=2^14, r=8 → ~16 MB bellek, tek çekirdekte ~40-60 ms
+PASSWORD_SCRYPT_N = int(os.getenv('PASSWORD_SCRYPT_N', 2 ** 14))
+PASSWORD_SCRYPT_R = int(os.getenv('PASSWORD_SCRYPT_R', 8))
+PASSWORD_SCRYPT_P = int(os.getenv('PASSWORD_SCRYPT_P', 1))
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', 2))
+PASSWORD_HASH_QUEUE = int(os.getenv('PASSWORD_HASH_QUEUE', 16))
+PASSWORD_HASH_TIMEOUT = float(os.getenv('PASSWORD_HASH_TIMEOUT', 5))
+
+
+class HashingBusy(Exception):
+    pass
+
+
+def _b64encode(data):
+    return base64.b64encode(data).decode('ascii').rstrip('=')
+
+
+def _b64decode(text):
+    return base64.b64decode(text + '=' * (-len(text) % 4))
+
+
+class ScryptHasher:
+    """scrypt (hashlib, OpenSSL); bellek-yoğun KDF"""
+    scheme = 'scrypt'
+
+    def __init__(self, n=PASSWORD_SCRYPT_N, r=PASSWORD_SCRYPT_R, p=PASSWORD_SCRYPT_P, salt_bytes=16, dklen=32):
+        self.n = n
+        self.r = r
+        self.p = p
+        self.salt_bytes = salt_bytes
+        self.dklen = dklen
+
+    def _derive(self, password, salt, n, r, p, dklen):
+        return hashlib.scrypt(
+            password.encode('utf-8'), salt=salt, n=n, r=r, p=p, dklen=dklen,
+            maxmem=128 * n * r * p + 1024 * 1024
+        )
+
+    def hash(self, password):
+        salt = secrets.token_bytes(self.salt_bytes)
+        derived = self._derive(password, salt, self.n, self.r, self.p, self.dklen)
+        return f'{self.scheme}${self.n}${self.r}${self.p}${_b64encode(salt)}${_b64encode(derived)}'
+
+    def verify(self, password, encoded):
+        try:
+            _, n, r, p, salt, expected = encoded.split('$')
+            n, r, p = int(n), int(r), int(p)
+            salt, expected = _b64decode(salt), _b64decode(expected)
+        except ValueError:
+            return False
+        derived = self._derive(password, salt, n, r, p, len(expected))
+        return hmac.compare_digest(derived, expected)
+
+    def needs_rehash(self, encoded):
+        try:
+            _, n, r, p, _, _ = encoded.split('$')
+        except ValueError:
+            return True
+        return (int(n), int(r), int(p)) != (self.n, self.r, self.p)
+
+    def matches(self, encoded):
+        return encoded.startswith(self.scheme + '$')
+
+
+class LegacySha256Hasher:
+    """Eski tuzsuz SHA-256 hex hash'ler; yalnızca doğrulama, her zaman yenilenir"""
+    scheme = 'sha256'
+
+    def hash(self, password):
+        return hashlib.sha256(password.encode()).hexdigest()
+
+    def verify(self, password, encoded):
+        return hmac.compare_digest(self.hash(password), encoded)
+
+    def needs_rehash(self, encoded):
+        return True
+
+    def matches(self, encoded):
+        return len(encoded) == 64 and all(c in '0123456789abcdef' for c in encoded)
+
+
+HASHERS = {
+    ScryptHasher.scheme: ScryptHasher(),
+    LegacySha256Hasher.scheme: LegacySha256Hasher()
+}
+
+
+def register_hasher(hasher):
+    """Yeni bir şema ekle (örn. argon2); PASSWORD_HASHER ile varsayılan yapılabilir"""
+    HASHERS[hasher.scheme] = hasher
+
+
+def default_hasher():
+    return HASHERS[PASSWORD_HASHER]
+
+
+def identify_hasher(encoded):
+    for hasher in HASHERS.values():
+        if hasher.matches(encoded):
+            return hasher
+    return None
+
+
+_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix='password-hash')
+_slots = threading.BoundedSemaphore(PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE)
+
+
+def _offload(func, *args):
+    """İşi hash havuzunda çalıştır; havuz + kuyruk doluysa HashingBusy"""
+    if not _slots.acquire(timeout=PASSWORD_HASH_TIMEOUT):
+        raise HashingBusy("Şifre hash kuyruğu dolu")
+    try:
+        future = _executor.submit(func, *args)
+    except BaseException:
+        _slots.release()
+        raise
+    future.add_done_callback(lambda _: _slots.release())
+    return future.result()
+
+
+def hash_password(password):
+    """Şifreyi varsayılan şemayla hash'le"""
+    return _offload(default_hasher().hash, password)
+
+
+def verify_password(password, encoded):
+    """(doğru mu, yeni hash veya None) döndür; eski/zayıf hash'ler doğruysa yeniden hash'lenir"""
+    hasher = identify_hasher(encoded or '')
+    if hasher is None or not _offload(hasher.verify, password, encoded):
+        return False, None
+
+    if hasher is not default_hasher() or hasher.needs_rehash(encoded):
+        return True, hash_password(password)
+    return True, None
@@ -0,0 +1,186 @@
+"""
+Kaba kuvvet / credential stuffing koruması için kayan pencere hız sınırı.
+
+Her anahtar (ör. 'login:ip:1.2.3.4') için iki sabit pencerenin sayacı
+tutulur; tahmini istek sayısı önceki pencerenin kalan kısmıyla ağırlıklı
+toplamdır (sliding window counter). Anahtar başına sabit bellek: pencere
+numarası ve iki sayaç. Süreç içi arka uç (LocalWindow) en fazla maxsize
+anahtarı LRU ile tutar, en eski kullanılan düşer.
+
+REDIS_URL tanımlı ve redis kuruluysa sayaçlar Redis'te tutulur (RedisWindow),
+sınır tüm worker'lar için ortaktır. Reddedilen istekler sayılmaz; sınırın
+altına inilince istemci tekrar deneyebilir. Limitler 'sayı/saniye' biçimindedir
+(ör. '10/300'); boş, '0' ya da 'off' sınırı kapatır (yük/kabul testleri için).
+
+İstemci IP'si: TRUSTED_PROXY_HOPS > 0 ise X-Forwarded-For başlığının sağdan
+o kadar önceki girdisi, yoksa soket adresi. Varsayılan 1: uygulama Render'da tek
+bir proxy arkasında çalışır; aksi halde tüm istemciler proxy'nin adresini paylaşır.
+Proxy'siz (doğrudan açık) kurulumda 0 olmalı, yoksa istemci başlığı kendisi yazar.
+"""
+import hashlib
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from logs import get_logger
+from metrics import Counter
+
+try:
+    import redis
+except ImportError:  # redis kurulu değilse yalnızca süreç içi sayaçlar kullanılır
+    redis = None
+
+log = get_logger('ratelimit')
+
+RATE_LIMIT_MAX_KEYS = int(os.getenv('RATE_LIMIT_MAX_KEYS', 100000))
+TRUSTED_PROXY_HOPS = int(os.getenv('TRUSTED_PROXY_HOPS', 1))
+
+RATE_LIMITED = Counter('rate_limited_total', 'Hız sınırına takılan istekler', ('endpoint', 'key'))
+
+
+def parse_limit(spec):
+    """'10/300' → (10, 300.0); boş, '0' ya da 'off' → None"""
+    spec = (spec or '').strip()
+    if not spec or spec.lower() in ('0', 'off'):
+        return None
+    count, _, window = spec.partition('/')
+    try:
+        limit, seconds = int(count), float(window or 60)
+    except ValueError:
+        raise ValueError(f"Geçersiz hız sınırı: {spec!r} (ör. 10/300)")
+    if limit <= 0 or seconds <= 0:
+        raise ValueError(f"Geçersiz hız sınırı: {spec!r} (ör. 10/300)")
+    return limit, seconds
+
+
+def retry_after(previous, current, position, limit, window):
+    """Tahmin limit - 1'in altına (bir istek daha sığacak kadar) inene dek beklenecek saniye"""
+    room = limit - 1
+    if current <= room and previous > 0:
+        # Bu pencere içinde önceki pencerenin ağırlığı yeterince azalınca
+        wait = window * (1 - (room - current) / previous) - position
+    elif current <= room:
+        wait = 0.0
+    else:
+        # Ancak sonraki pencerede: bu pencerenin sayacı önceki olur
+        wait = window - position + max(0.0, window * (1 - room / current))
+    return max(1, math.ceil(wait))
+
+
+class LocalWindow:
+    """Süreç içi kayan pencere sayaçları; thread-safe, en fazla maxsize anahtar"""
+
+    def __init__(self, limit, window, maxsize=RATE_LIMIT_MAX_KEYS):
+        self.limit = limit
+        self.window = window
+        self.maxsize = maxsize
+        self._counters = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key, now=None):
+        """İzin verildiyse 0 (ve sayılır), yoksa Retry-After saniyesi"""
+        now = time.time() if now is None else now
+        index, position = divmod(now, self.window)
+        with self._lock:
+            entry = self._counters.get(key)
+            if entry is None or entry[0] < index - 1:
+                previous, current = 0, 0
+            elif entry[0] == index - 1:
+                previous, current = entry[2], 0
+            else:
+                previous, current = entry[1], entry[2]
+            if previous * (1 - position / self.window) + current >= self.limit:
+                return retry_after(previous, current, position, self.limit, self.window)
+            self._counters[key] = (index, previous, current + 1)
+            self._counters.move_to_end(key)
+            while len(self._counters) > self.maxsize:
+                self._counters.popitem(last=False)
+            return 0
+
+    def __len__(self):
+        return len(self._counters)
+
+
+class RedisWindow:
+    """Worker'lar arası ortak sayaçlar: pencere başına bir INCR anahtarı (2 pencere ömürlü)"""
+
+    def __init__(self, client, limit, window, prefix='prospando:ratelimit:'):
+        self.limit = limit
+        self.window = window
+        self.prefix = prefix
+        self._client = client
+
+    def hit(self, key, now=None):
+        now = time.time() if now is None else now
+        index, position = divmod(now, self.window)
+        index = int(index)
+        current_key = f'{self.prefix}{key}:{index}'
+        pipe = self._client.pipeline()
+        pipe.incr(current_key)
+        pipe.pexpire(current_key, int(self.window * 2000))
+        pipe.get(f'{self.prefix}{key}:{index - 1}')
+        current, _, previous = pipe.execute()
+        previous = int(previous or 0)
+        if previous * (1 - position / self.window) + current > self.limit:
+            # Reddedilen istek sayılmaz
+            self._client.decr(current_key)
+            return retry_after(previous, current - 1, position, self.limit, self.window)
+        return 0
+
+
+_redis_client = None
+
+
+def make_window(spec, maxsize=RATE_LIMIT_MAX_KEYS):
+    """Limit tanımından pencere nesnesi; sınır kapalıysa None"""
+    global _redis_client
+    limit = parse_limit(spec)
+    if limit is None:
+        return None
+    url = os.getenv('REDIS_URL')
+    if url and redis is not None:
+        if _redis_client is None:
+            _redis_client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        return RedisWindow(_redis_client, *limit)
+    if url:
+        log.warning('REDIS_URL tanımlı ama redis paketi kurulu değil; hız sınırı worker başına uygulanıyor')
+    return LocalWindow(*limit, maxsize=maxsize)
+
+
+class RateLimiter:
+    """Bir uç nokta için IP ve email anahtarlı sınırlar"""
+
+    def __init__(self, endpoint, ip_spec, email_spec):
+        self.endpoint = endpoint
+        self.windows = {'ip': make_window(ip_spec), 'email': make_window(email_spec)}
+
+    def check(self, ip=None, email=None):
+        """İzin verildiyse 0, yoksa Retry-After saniyesi. Arka uç hatası isteği engellemez."""
+        values = {'ip': ip, 'email': email}
+        for kind, window in self.windows.items():
+            value = values[kind]
+            if window is None or not value:
+                continue
+            if kind == 'email':
+                # Redis anahtarlarında email açık yazılmaz
+                value = hashlib.sha256(value.strip().lower().encode('utf-8')).hexdigest()[:32]
+            try:
+                wait = window.hit(f'{self.endpoint}:{kind}:{value}')
+            except Exception as e:
+                log.warning('Hız sınırı kontrol edilemedi: %s', e, extra={'error_type': type(e).__name__})
+                continue
+            if wait:
+                RATE_LIMITED.inc(self.endpoint, kind)
+                return wait
+        return 0
+
+
+def client_address(remote_addr, forwarded_for=None, trusted_hops=TRUSTED_PROXY_HOPS):
+    """Güvenilen proxy sayısına göre istemci IP'si"""
+    if trusted_hops > 0 and forwarded_for:
+        hops = [part.strip() for part in forwarded_for.split(',') if part.strip()]
+        if len(hops) >= trusted_hops:
+            return hops[-trusted_hops]
+    return remote_addr
@@ -0,0 +1,64 @@
+"""
+Önceden sıkıştırılmış, ETag'li statik sayfalar.
+
+Sayfalar başlangıçta bir kez okunur ve gzip/brotli ile sıkıştırılır. Yanıtlar
+"Cache-Control: no-cache" ile gider: tarayıcı her açılışta If-None-Match ile
+sorar, sayfa değişmediyse gövdesiz 304 döner.
+"""
+import gzip
+import hashlib
+import os
+
+from flask import Response, request
+
+try:
+    import brotli
+except ImportError:  # brotli kurulu değilse yalnızca gzip sunulur
+    brotli = None
+
+PAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pages')
+# Tercih sırası: eşit kalitede önce daha küçük olan
+ENCODINGS = ('br', 'gzip', 'identity')
+
+
+class StaticPage:
+    def __init__(self, filename, content_type='text/html; charset=utf-8', cache_control='no-cache'):
+        with open(os.path.join(PAGES_DIR, filename), 'rb') as f:
+            body = f.read()
+
+        self.content_type = content_type
+        self.cache_control = cache_control
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        # Güçlü ETag her kodlama için ayrı olmalı (RFC 9110 §8.8.3)
+        self.variants = {'identity': (body, digest)}
+        self.variants['gzip'] = (gzip.compress(body, compresslevel=9, mtime=0), f'{digest}-gz')
+        if brotli is not None:
+            self.variants['br'] = (brotli.compress(body, quality=11), f'{digest}-br')
+        self.etags = [etag for _, etag in self.variants.values()]
+
+    def _choose_encoding(self):
+        accepted = request.accept_encodings
+        best, best_quality = 'identity', 0
+        for encoding in ENCODINGS:
+            if encoding not in self.variants:
+                continue
+            quality = 1 if encoding == 'identity' and not accepted.best else accepted.quality(encoding)
+            if quality > best_quality:
+                best, best_quality = encoding, quality
+        return best
+
+    def response(self):
+        encoding = self._choose_encoding()
+        body, etag = self.variants[encoding]
+
+        if any(request.if_none_match.contains(candidate) for candidate in self.etags):
+            response = Response(status=304)
+        else:
+            response = Response(body, content_type=self.content_type)
+            if encoding != 'identity':
+                response.headers['Content-Encoding'] = encoding
+
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = self.cache_control
+        response.headers['Vary'] = 'Accept-Encoding'
+        return response
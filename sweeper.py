@@ -0,0 +1,85 @@
+"""
+Unutulmuş açık oturumların otomatik kapatılması.
+
+Çıkış yapmayı unutan personelin oturumu end_time IS NULL olarak kalır;
+check_in() yalnızca son 24 saatte açılmış oturuma baktığı için daha eskiler
+hiç kapanmaz. Periyodik süpürücü (bkz. app.sweep_stale_sessions) bölge başına
+kurallara göre vakti geçmiş oturumları kapatır.
+
+Kurallar SESSION_AUTOCLOSE ile verilir: 'bölge=kural' çiftleri ';' ile
+ayrılır, '*' diğer tüm bölgeler içindir. Kural 'SS:DD' (oturumun günü o
+saatte kapat) ya da '12h' / '90m' (açılıştan bu kadar sonra kapat)
+biçimindedir; boşlukla ayrılmış birden fazla kural varsa en erken olanı
+uygulanır. Örnek: '*=23:59; Mitte=12h; Spandau=10h 23:59'.
+"""
+import re
+from datetime import datetime, time, timedelta
+
+from metrics import Counter
+
+DEFAULT_POLICY = '*=23:59'
+# Bir oturumun açık kalabileceği en uzun süre: kurallar bunu aşamaz, çıkış dokunuşu yalnızca
+# bu pencere içinde açılmış oturumu kapatır (bkz. attendance_check_in, migrations/0017)
+MAX_SESSION = timedelta(days=1)
+
+SESSIONS_AUTO_CLOSED = Counter('attendance_auto_closed_total', 'Süpürücünün kapattığı oturumlar', ('policy',))
+
+_DURATION = re.compile(r'^(\d+)([hm])$')
+
+
+def parse_rule(text):
+    """'23:59' → ('at', time) | '12h' / '90m' → ('after', timedelta)"""
+    text = text.strip().lower()
+    match = _DURATION.match(text)
+    if match:
+        amount = int(match.group(1))
+        delta = timedelta(hours=amount) if match.group(2) == 'h' else timedelta(minutes=amount)
+        # Oturum en geç MAX_SESSION içinde kapanmalı (çıkış dokunuşu daha eskisini bulmaz)
+        if not timedelta(0) < delta < MAX_SESSION:
+            raise ValueError(f"Süre 0 ile 24 saat arasında olmalıdır: {text}")
+        return 'after', delta
+    try:
+        return 'at', datetime.strptime(text, '%H:%M').time()
+    except ValueError:
+        raise ValueError(f"Geçersiz kapatma kuralı: {text!r} (ör. 23:59 ya da 12h)")
+
+
+class SweepPolicies:
+    def __init__(self, spec=DEFAULT_POLICY):
+        self.rules = {}
+        for part in spec.split(';'):
+            if not part.strip():
+                continue
+            location, sep, rules = part.partition('=')
+            if not sep or not location.strip() or not rules.split():
+                raise ValueError(f"Geçersiz SESSION_AUTOCLOSE girdisi: {part.strip()!r} (ör. Mitte=12h)")
+            self.rules[location.strip()] = [(rule, parse_rule(rule)) for rule in rules.split()]
+
+    def close_at(self, location, day, start):
+        """(kapanış anı, kural) ya da bölge için kural yoksa (None, None)"""
+        rules = self.rules.get(location, self.rules.get('*'))
+        if not rules:
+            return None, None
+        opened = datetime.combine(day, start)
+        candidates = []
+        for text, (kind, value) in rules:
+            if kind == 'after':
+                at = opened + value
+            else:
+                # Kapanış saatinden sonra açılan oturum ertesi günün aynı saatinde kapanır
+                at = datetime.combine(day, value)
+                if at <= opened:
+                    at += timedelta(days=1)
+            candidates.append((at, text))
+        return min(candidates)
+
+    def due(self, rows, now):
+        """(id, employee_id, location, date, start_time) satırlarından vakti geçenler:
+        (id, employee_id, date, end_time, dakika, kural) listesi"""
+        due = []
+        for att_id, employee_id, location, day, start in rows:
+            at, rule = self.close_at(location, day, start)
+            if at is not None and at <= now:
+                minutes = int((at - datetime.combine(day, start)).total_seconds() // 60)
+                due.append((att_id, employee_id, day, time(at.hour, at.minute), minutes, rule))
+        return due
@@ -0,0 +1,66 @@
+"""
+İmzalı, süreli oturum token'ları.
+
+login()/signup() personel id'sini ve ismini taşıyan bir token verir; check_in()
+bunu süreç içinde HMAC ile doğrular, veritabanına sormaz. itsdangerous
+(Flask ile birlikte gelir) URLSafeTimedSerializer kullanılır.
+
+Anahtar rotasyonu: TOKEN_KEYS virgülle ayrılmış anahtar listesidir, en yenisi
+başta. Yeni token'lar ilk anahtarla imzalanır; listedeki tüm anahtarlarla
+imzalanmış token'lar kabul edilir. Rotasyon: yeni anahtarı başa ekle, eski
+token'lar TOKEN_MAX_AGE kadar sonra düşer, sonra eski anahtarı çıkar.
+TOKEN_KEYS yoksa SECRET_KEY kullanılır.
+"""
+import os
+
+from itsdangerous import BadSignature, SignatureExpired, URLSafeTimedSerializer
+
+TOKEN_MAX_AGE = int(os.getenv('TOKEN_MAX_AGE', 12 * 3600))
+TOKEN_SALT = 'prospando.session'
+
+
+def load_keys():
+    """TOKEN_KEYS (en yenisi başta) ya da SECRET_KEY"""
+    keys = [key.strip() for key in os.getenv('TOKEN_KEYS', '').split(',') if key.strip()]
+    return keys or [os.getenv('SECRET_KEY', 'change-this-in-production')]
+
+
+_serializer = None
+
+
+def serializer():
+    """Anahtar listesinden bir kez kurulan serializer (itsdangerous son anahtarla imzalar)"""
+    global _serializer
+    if _serializer is None:
+        _serializer = URLSafeTimedSerializer(list(reversed(load_keys())), salt=TOKEN_SALT)
+    return _serializer
+
+
+def issue_token(employee_id, name, user_id=None):
+    """employee_id None olabilir (personel kaydı bağlı olmayan kullanıcı); böyle token check-in'de reddedilir"""
+    return serializer().dumps({'emp': employee_id, 'name': name, 'uid': user_id})
+
+
+def verify_token(token):
+    """({'employee_id', 'name', 'user_id'}, None) ya da (None, 'expired' | 'invalid')"""
+    try:
+        claims = serializer().loads(token, max_age=TOKEN_MAX_AGE)
+    except SignatureExpired:
+        return None, 'expired'
+    except BadSignature:
+        return None, 'invalid'
+    if not isinstance(claims, dict) or not claims.get('name'):
+        return None, 'invalid'
+    if claims.get('emp') is not None and not isinstance(claims.get('emp'), int):
+        return None, 'invalid'
+    return {'employee_id': claims.get('emp'), 'name': claims['name'], 'user_id': claims.get('uid')}, None
+
+
+def bearer_token(authorization):
+    """'Authorization: Bearer <token>' başlığından token'ı çıkar"""
+    if not authorization:
+        return None
+    scheme, _, token = authorization.partition(' ')
+    if scheme.lower() != 'bearer' or not token.strip():
+        return None
+    return token.strip()